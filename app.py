@@ -2,12 +2,24 @@
 """
 Simple Flask UI for the LangGraph AI Agent
 """
+import io
 import json
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from src.core.graph import compiled_graph
+import time
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
+from src.core.metrics import metrics_exposition
+from src.core.checkpoint import (
+    ensure_new_thread, get_checkpointed_graph, new_thread_id, resume_run, run_config, ThreadInUseError, UnknownRunError
+)
 from src.core.state import TestAgentState
-from langfuse.langchain import CallbackHandler
+from src.api.test_case_loader import load_test_cases, validate_test_cases, InvalidTestCaseError
+from src.utils.scoring import rank_test_cases, reweight_rubric
+from src.core import config
+from src.jobs.runner import JobRunner, get_job_store
+from src.jobs.batch import run_query_batch
+from src.jobs.store import QueueFullError
+from src.api.tracing import get_langfuse_handler
+from src.retrieval.impact import parse_changes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -15,28 +27,37 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-def create_initial_test_state(query: str) -> TestAgentState:
+def create_initial_test_state(query: str, changes=None, suite_id=None) -> TestAgentState:
     """Helper function to create a new TestAgentState with sensible defaults"""
+    # A unified diff or list of changed files narrows the run to the affected test cases
+    changed_files, changed_symbols = parse_changes(changes)
     return {
         "query": query,
+        "changed_files": changed_files,
+        "changed_symbols": changed_symbols,
         "test_cases": [],
+        # Names the suite across runs, so its stored clusters are reused after test cases are added or deleted
+        "suite_id": str(suite_id or '').strip() or None,
         "is_clustering_needed": False,
         "clusters": None,
         "relevant_clusters": [],
+        "relevant_test_ids": None,
         "rubric": [],
         "evaluated_test_cases": [],
         "sorted_test_cases": []
     }
 
-def parse_test_cases(test_cases_text: str):
-    """Parse test cases from text input. Expects JSON format."""
+def parse_test_cases(test_cases_text: str, test_cases_file=None):
+    """Parse test cases from an uploaded file or text input. Expects a JSON array or JSONL/NDJSON."""
+    if test_cases_file is not None and test_cases_file.filename:
+        # Uploaded suites are streamed and validated record by record instead of being read as one blob
+        return load_test_cases(test_cases_file.stream)
+
     try:
-        # Try to parse as JSON first
-        test_cases = json.loads(test_cases_text)
-        if isinstance(test_cases, list):
-            return test_cases
-        else:
-            return [test_cases]
+        # Plain text that merely starts with a number or a quoted word is not a test suite
+        if not test_cases_text.lstrip().startswith(("[", "{")):
+            raise json.JSONDecodeError("Not a JSON test suite", test_cases_text, 0)
+        return load_test_cases(io.StringIO(test_cases_text))
     except json.JSONDecodeError:
         # If not valid JSON, treat as plain text and create a simple test case
         if test_cases_text.strip():
@@ -49,60 +70,334 @@ def parse_test_cases(test_cases_text: str):
             }]
         return []
 
+def parse_int_field(payload, name: str, minimum: int, maximum=None):
+    """An optional integer field of a JSON body; raises ValueError when it is not a whole number in range"""
+    value = payload.get(name)
+    if value is None:
+        return None
+    try:
+        number = int(value) if not isinstance(value, (bool, float)) else None
+    except (TypeError, ValueError):
+        number = None
+    if number is None or number < minimum or (maximum is not None and number > maximum):
+        bounds = f"between {minimum} and {maximum}" if maximum is not None else f"of at least {minimum}"
+        raise ValueError(f"{name} must be an integer {bounds}")
+    return number
+
 @app.route('/')
 def index():
     """Main page with the form"""
     return render_template('index.html')
 
+def format_result(result, thread_id: str):
+    """JSON response of a finished run, shared by /run_agent and /runs/<thread_id>/resume"""
+    final_test_cases = result.get('sorted_test_cases', [])
+    logger.info(f"Final result: {len(final_test_cases)} test cases prioritized")
+    return jsonify({
+        'success': True,
+        'message': f'Agent execution completed successfully. {len(final_test_cases)} test cases prioritized.',
+        'thread_id': thread_id,
+        'result': {
+            'query': result.get('query'),
+            'total_test_cases': len(result.get('test_cases', [])),
+            'sorted_test_cases_count': len(final_test_cases),
+            'sorted_test_cases': final_test_cases[:5],  # Return first 5 for preview
+            # Needed by /rerank to re-order with new weights without calling the LLM again
+            'rubric': result.get('rubric', []),
+            'evaluated_test_cases': result.get('evaluated_test_cases', [])
+        }
+    })
+
 @app.route('/run_agent', methods=['POST'])
 def run_agent():
     """Process the form submission and run the AI agent"""
+    # A failed run can be continued from its last checkpoint with POST /runs/<thread_id>/resume
+    thread_id = request.form.get('thread_id', '').strip() or new_thread_id()
     try:
         query = request.form.get('query', '').strip()
         test_cases_text = request.form.get('test_cases', '').strip()
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
+
+        graph = get_checkpointed_graph()
+        try:
+            ensure_new_thread(graph, thread_id)
+        except ThreadInUseError as e:
+            return jsonify({'error': str(e), 'thread_id': thread_id}), 409
         
         logger.info(f"Received query: '{query}'")
         logger.info(f"Received test cases: {test_cases_text[:100]}...")
         
         # Parse test cases
-        test_cases = parse_test_cases(test_cases_text)
+        try:
+            test_cases = parse_test_cases(test_cases_text, request.files.get('test_cases_file'))
+        except InvalidTestCaseError as e:
+            return jsonify({'error': str(e)}), 400
         logger.info(f"Parsed {len(test_cases)} test cases")
         
         # Create initial state
-        initial_state = create_initial_test_state(query)
+        initial_state = create_initial_test_state(query, request.form.get('changes'), request.form.get('suite_id'))
         initial_state["test_cases"] = test_cases
         
         # Initialize Langfuse CallbackHandler
-        langfuse_handler = CallbackHandler()
+        langfuse_handler = get_langfuse_handler()
         
         # Run the agent
-        logger.info("Starting graph execution...")
-        result = compiled_graph.invoke(
+        logger.info(f"Starting graph execution with thread id {thread_id}...")
+        result = graph.invoke(
             input=initial_state,
-            config={"callbacks": [langfuse_handler]}
+            config=run_config(thread_id, callbacks=[langfuse_handler])
         )
         
         logger.info("--- AGENT EXECUTION COMPLETED ---")
-        final_test_cases = result.get('sorted_test_cases', [])
-        logger.info(f"Final result: {len(final_test_cases)} test cases prioritized")
+        return format_result(result, thread_id)
         
+    except Exception as e:
+        logger.error(f"Error running agent: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error running agent: {str(e)}', 'thread_id': thread_id}), 500
+
+@app.route('/runs/<thread_id>/resume', methods=['POST'])
+def resume_agent(thread_id):
+    """Continue a failed or killed run from its last checkpoint, without redoing finished steps"""
+    try:
+        result = resume_run(get_checkpointed_graph(), thread_id, callbacks=[get_langfuse_handler()])
+        logger.info("--- AGENT EXECUTION COMPLETED ---")
+        return format_result(result, thread_id)
+
+    except UnknownRunError:
+        return jsonify({'error': f'No checkpoint for thread id {thread_id}'}), 404
+    except Exception as e:
+        logger.error(f"Error resuming run {thread_id}: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error running agent: {str(e)}', 'thread_id': thread_id}), 500
+
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/run_agent_stream', methods=['POST'])
+def run_agent_stream():
+    """Run the AI agent and stream node progress and a provisional top-N ranking as Server-Sent Events"""
+    query = request.form.get('query', '').strip()
+    test_cases_text = request.form.get('test_cases', '').strip()
+    top_n = request.form.get('top_n', 5, type=int)
+    thread_id = request.form.get('thread_id', '').strip() or new_thread_id()
+
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+
+    graph = get_checkpointed_graph()
+    try:
+        ensure_new_thread(graph, thread_id)
+    except ThreadInUseError as e:
+        return jsonify({'error': str(e), 'thread_id': thread_id}), 409
+
+    logger.info(f"Received streaming query: '{query}'")
+    try:
+        test_cases = parse_test_cases(test_cases_text, request.files.get('test_cases_file'))
+    except InvalidTestCaseError as e:
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Parsed {len(test_cases)} test cases")
+
+    initial_state = create_initial_test_state(query, request.form.get('changes'), request.form.get('suite_id'))
+    initial_state["test_cases"] = test_cases
+
+    def generate():
+        start_time = time.time()
+        rubric = []
+        evaluated_test_cases = []
+        result = dict(initial_state)
+
+        try:
+            langfuse_handler = get_langfuse_handler()
+            yield format_sse('started', {'query': query, 'total_test_cases': len(test_cases), 'thread_id': thread_id})
+
+            for mode, chunk in graph.stream(
+                input=initial_state,
+                config=run_config(thread_id, callbacks=[langfuse_handler]),
+                stream_mode=["updates", "custom"]
+            ):
+                if mode == "updates":
+                    for node_name, update in chunk.items():
+                        update = update or {}
+                        result.update(update)
+                        if update.get("rubric"):
+                            rubric = update["rubric"]
+                        yield format_sse('node', {'node': node_name, 'elapsed': round(time.time() - start_time, 2)})
+
+                elif mode == "custom" and chunk.get("type") == "evaluation_progress":
+                    # Re-rank everything scored so far, without waiting for the remaining batches
+                    evaluated_test_cases.extend(chunk["results"])
+                    yield format_sse('ranking', {
+                        'evaluated': chunk["evaluated"],
+                        'total': chunk["total"],
+                        'elapsed': round(time.time() - start_time, 2),
+                        'top': rank_test_cases(evaluated_test_cases, rubric)[:top_n]
+                    })
+
+            final_test_cases = result.get('sorted_test_cases', [])
+            logger.info(f"Streaming run completed: {len(final_test_cases)} test cases prioritized")
+            yield format_sse('done', {
+                'message': f'Agent execution completed successfully. {len(final_test_cases)} test cases prioritized.',
+                'query': query,
+                'total_test_cases': len(test_cases),
+                'sorted_test_cases_count': len(final_test_cases),
+                'sorted_test_cases': final_test_cases[:top_n],
+                'rubric': result.get('rubric', []),
+                'evaluated_test_cases': result.get('evaluated_test_cases', []),
+                'elapsed': round(time.time() - start_time, 2)
+            })
+
+        except Exception as e:
+            logger.error(f"Error in streaming agent run: {str(e)}", exc_info=True)
+            yield format_sse('error', {'error': f'Error running agent: {str(e)}', 'thread_id': thread_id})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/rerank', methods=['POST'])
+def rerank():
+    """Re-rank already evaluated test cases with new rubric weights, without any LLM call"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        evaluated_test_cases = payload.get('evaluated_test_cases')
+        rubric = payload.get('rubric')
+
+        if not evaluated_test_cases or not rubric:
+            return jsonify({'error': 'evaluated_test_cases and rubric are required'}), 400
+        try:
+            limit = parse_int_field(payload, 'limit', 0)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # weights maps dimension id -> new weight, e.g. {"1": 5, "3": 0}
+        rubric = reweight_rubric(rubric, payload.get('weights'))
+        sorted_test_cases = rank_test_cases(evaluated_test_cases, rubric)
+        logger.info(f"Re-ranked {len(sorted_test_cases)} test cases with weights {[dimension.get('weight') for dimension in rubric]}")
+
         return jsonify({
             'success': True,
-            'message': f'Agent execution completed successfully. {len(final_test_cases)} test cases prioritized.',
-            'result': {
-                'query': result.get('query'),
-                'total_test_cases': len(result.get('test_cases', [])),
-                'sorted_test_cases_count': len(final_test_cases),
-                'sorted_test_cases': final_test_cases[:5]  # Return first 5 for preview
-            }
+            'rubric': rubric,
+            'sorted_test_cases': sorted_test_cases[:limit] if limit else sorted_test_cases
         })
-        
+
     except Exception as e:
-        logger.error(f"Error running agent: {str(e)}", exc_info=True)
-        return jsonify({'error': f'Error running agent: {str(e)}'}), 500
+        logger.error(f"Error re-ranking test cases: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error re-ranking test cases: {str(e)}'}), 500
+
+_job_runner = None
+
+def get_job_runner() -> JobRunner:
+    """Start this process's job workers on first use"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner(
+            store=get_job_store(),
+            graph=get_checkpointed_graph(),
+            max_workers=config.JOBS_MAX_WORKERS,
+            config_factory=lambda: {"callbacks": [get_langfuse_handler()]}
+        )
+        _job_runner.start()
+    return _job_runner
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an agent run and return its job id right away"""
+    payload = request.get_json(silent=True) or request.form
+    query = (payload.get('query') or '').strip()
+    test_cases = payload.get('test_cases')
+
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+
+    # JSON clients can send the list directly, form clients send the same text or file as /run_agent
+    try:
+        if isinstance(test_cases, list):
+            test_cases = list(validate_test_cases(test_cases))
+        else:
+            test_cases = parse_test_cases((test_cases or '').strip(), request.files.get('test_cases_file'))
+    except InvalidTestCaseError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # A diff or file list as text, or (JSON clients) a list of changed files
+    initial_state = create_initial_test_state(query, payload.get('changes'), payload.get('suite_id'))
+    initial_state["test_cases"] = test_cases
+
+    runner = get_job_runner()
+    try:
+        job_id = runner.store.submit(initial_state, max_queued=config.JOBS_MAX_QUEUED)
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
+
+    runner.notify()
+    logger.info(f"Queued job {job_id} for query '{query}' with {len(test_cases)} test cases")
+    return jsonify({'job_id': job_id, 'status': 'queued', 'url': url_for('get_job', job_id=job_id)}), 202
+
+@app.route('/batch', methods=['POST'])
+def run_batch():
+    """Answer several queries against one suite, clustering it once and sharing rubrics and evaluations"""
+    payload = request.get_json(silent=True) or {}
+    queries = [query.strip() for query in payload.get('queries') or [] if isinstance(query, str) and query.strip()]
+    if not queries:
+        return jsonify({'error': 'A non-empty list of queries is required'}), 400
+
+    try:
+        test_cases = list(validate_test_cases(payload.get('test_cases') or []))
+    except InvalidTestCaseError as e:
+        return jsonify({'error': str(e)}), 400
+    if not test_cases:
+        return jsonify({'error': 'Test cases are required'}), 400
+
+    try:
+        max_concurrency = parse_int_field(payload, 'max_concurrency', 1, config.BATCH_MAX_CONCURRENCY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        logger.info(f"Running a batch of {len(queries)} queries on {len(test_cases)} test cases")
+        summary, results = run_query_batch(
+            queries,
+            test_cases,
+            max_concurrency=max_concurrency,
+            suite_id=str(payload.get('suite_id') or '').strip() or None,
+            graph=get_checkpointed_graph(),
+            callbacks_factory=lambda: [get_langfuse_handler()],
+        )
+        return jsonify({'summary': summary, 'results': results})
+
+    except Exception as e:
+        logger.error(f"Error running batch: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error running batch: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress and (when finished) result of a job"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or stop a running job at its next graph step"""
+    status = get_job_store().cancel(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, 'status': status})
+
+@app.route('/jobs', methods=['GET'])
+def job_queue():
+    """Current queue depth across all workers"""
+    return jsonify({'queue': get_job_store().queue_depth(), 'max_queued': config.JOBS_MAX_QUEUED})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: node and LLM call durations, tokens, retries, batch sizes, cache hit rates"""
+    body, content_type = metrics_exposition()
+    return Response(body, content_type=content_type)
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the agent pipeline on synthetic suites, with the deterministic fake LLM.
+
+    python -m benchmarks.pipeline --sizes 25 100 1000 10000 --latency 0.2
+    python -m benchmarks.pipeline --compare benchmarks/results/pipeline-20250101-120000.json
+    python -m benchmarks.pipeline --sizes 1000 --latency 0.2 --model-tiers
+
+Reports per-node wall time, LLM calls, prompt/response sizes, peak memory and how each of
+them scales with the suite size, and saves everything as JSON so results of two versions
+can be compared. --model-tiers also scores every suite with the strong model, the fast
+model and the cascade of both, to weigh their calls and time against their top-K accuracy.
+--changes runs every suite with a diff or list of changed files, as `main.py --changes` does.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.synthetic import DEFAULT_QUERY, generate_suite
+
+DEFAULT_SIZES = [25, 100, 500, 1000, 2500, 5000, 10000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Metrics --compare checks for regressions
+COMPARED_METRICS = ("wall_seconds", "llm_calls", "prompt_tokens", "peak_memory_bytes")
+# Evaluation model tiers --model-tiers compares, the first one is the reference ranking
+EVALUATION_TIERS = ("strong", "fast", "cascade")
+
+
+class NodeProfiler(BaseCallbackHandler):
+    """Counts the LLM calls of a run and their prompt/response sizes per graph node and per model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running: Dict[Any, Tuple[str, str]] = {}
+        self.nodes: Dict[str, Dict[str, int]] = {}
+        self.models: Dict[str, Dict[str, int]] = {}
+
+    def _node_stats(self, node: str) -> Dict[str, int]:
+        return self.nodes.setdefault(node, {
+            "llm_calls": 0, "prompt_chars": 0, "response_chars": 0, "prompt_tokens": 0, "response_tokens": 0,
+        })
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        # LangGraph tags every call made inside a node with the node name
+        node = (metadata or {}).get("langgraph_node", "outside_graph")
+        invocation_params = kwargs.get("invocation_params") or {}
+        model = str(invocation_params.get("model_name") or invocation_params.get("model") or "unknown")
+        prompt_chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        with self._lock:
+            self._running[run_id] = (node, model)
+            stats = self._node_stats(node)
+            stats["llm_calls"] += 1
+            stats["prompt_chars"] += prompt_chars
+            model_stats = self.models.setdefault(model, {"llm_calls": 0, "prompt_tokens": 0, "response_tokens": 0})
+            model_stats["llm_calls"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        response_chars = prompt_tokens = response_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                response_chars += len(generation.text)
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                response_tokens += usage.get("output_tokens", 0)
+        with self._lock:
+            node, model = self._running.pop(run_id, ("outside_graph", "unknown"))
+            stats = self._node_stats(node)
+            stats["response_chars"] += response_chars
+            stats["prompt_tokens"] += prompt_tokens
+            stats["response_tokens"] += response_tokens
+            if model in self.models:
+                self.models[model]["prompt_tokens"] += prompt_tokens
+                self.models[model]["response_tokens"] += response_tokens
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._running.pop(run_id, None)
+
+
+def _initial_state(query: str, test_cases: List[Dict[str, Any]], changes: Optional[str] = None) -> Dict[str, Any]:
+    from src.retrieval.impact import parse_changes
+
+    changed_files, changed_symbols = parse_changes(changes)
+    return {
+        "query": query,
+        "changed_files": changed_files,
+        "changed_symbols": changed_symbols,
+        "test_cases": test_cases,
+        "suite_id": None,
+        "clusters": None,
+        "relevant_clusters": [],
+        "relevant_test_ids": None,
+        "rubric": [],
+        "evaluated_test_cases": [],
+        "sorted_test_cases": [],
+    }
+
+
+def run_once(
+    graph, query: str, test_cases: List[Dict[str, Any]], trace_memory: bool = False, changes: Optional[str] = None
+) -> Dict[str, Any]:
+    """One pipeline run: wall time per node from the streamed updates, LLM usage from the profiler."""
+    profiler = NodeProfiler()
+    node_seconds: Dict[str, float] = {}
+    ranking: List[str] = []
+
+    if trace_memory:
+        tracemalloc.start()
+    started = last = time.perf_counter()
+    try:
+        for update in graph.stream(
+            _initial_state(query, test_cases, changes),
+            config={"callbacks": [profiler], "recursion_limit": 1000 + len(test_cases)},
+            stream_mode="updates",
+        ):
+            now = time.perf_counter()
+            for node, values in update.items():
+                # The evaluation node can run several times in sequential mode
+                node_seconds[node] = node_seconds.get(node, 0.0) + (now - last)
+                if node == "sort_test_cases":
+                    ranking = [str(evaluation["test_id"]) for evaluation in (values or {}).get("sorted_test_cases", [])]
+            last = now
+        wall_seconds = time.perf_counter() - started
+    finally:
+        peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    nodes = {}
+    for node in sorted(set(node_seconds) | set(profiler.nodes)):
+        nodes[node] = {"wall_seconds": round(node_seconds.get(node, 0.0), 4), **profiler._node_stats(node)}
+    return {
+        "wall_seconds": round(wall_seconds, 4),
+        "llm_calls": sum(stats["llm_calls"] for stats in profiler.nodes.values()),
+        "prompt_tokens": sum(stats["prompt_tokens"] for stats in profiler.nodes.values()),
+        "response_tokens": sum(stats["response_tokens"] for stats in profiler.nodes.values()),
+        "sorted_test_cases": len(ranking),
+        "peak_memory_bytes": peak_memory,
+        "nodes": nodes,
+        "models": profiler.models,
+        "ranking": ranking,
+    }
+
+
+def benchmark_size(
+    graph, size: int, query: str, repeat: int, seed: int, trace_memory: bool, changes: Optional[str] = None
+) -> Dict[str, Any]:
+    test_cases = generate_suite(size, seed)
+    runs = [run_once(graph, query, test_cases, changes=changes) for _ in range(repeat)]
+    # Memory tracing slows the run down, so it gets a run of its own
+    peak_memory = run_once(graph, query, test_cases, trace_memory=True, changes=changes)["peak_memory_bytes"] if trace_memory else None
+
+    # Call counts and sizes are deterministic, only the times differ between repeats
+    median_run = sorted(runs, key=lambda run: run["wall_seconds"])[len(runs) // 2]
+    wall_times = [run["wall_seconds"] for run in runs]
+    result = {
+        "size": size,
+        "wall_seconds": round(statistics.median(wall_times), 4),
+        "wall_seconds_min": min(wall_times),
+        "wall_seconds_all": wall_times,
+        "llm_calls": median_run["llm_calls"],
+        "prompt_tokens": median_run["prompt_tokens"],
+        "response_tokens": median_run["response_tokens"],
+        "sorted_test_cases": median_run["sorted_test_cases"],
+        "peak_memory_bytes": peak_memory,
+        "nodes": median_run["nodes"],
+    }
+    print(
+        f"{size:>6} test cases: {result['wall_seconds']:8.3f}s, {result['llm_calls']:4} LLM calls, "
+        f"{result['prompt_tokens']:8} prompt tokens"
+        + (f", peak {peak_memory / 2 ** 20:7.1f} MiB" if peak_memory is not None else ""),
+        flush=True,
+    )
+    return result
+
+
+def compare_model_tiers(graph, size: int, query: str, seed: int, k: int) -> Dict[str, Any]:
+    """
+    Run the suite once per evaluation model tier, with the strong model's ranking as the reference.
+
+    Reports the wall time, the LLM calls and tokens per model, and the share of the strong
+    model's top k that each tier's top k recovers.
+    """
+    from src.core import config
+
+    test_cases = generate_suite(size, seed)
+    previous_tier = config.EVALUATION_MODEL_TIER
+    tiers = {}
+    try:
+        for tier in EVALUATION_TIERS:
+            config.EVALUATION_MODEL_TIER = tier
+            run = run_once(graph, query, test_cases)
+            tiers[tier] = {
+                "wall_seconds": run["wall_seconds"],
+                "llm_calls": run["llm_calls"],
+                "models": run["models"],
+                "top": run["ranking"][:k],
+            }
+    finally:
+        config.EVALUATION_MODEL_TIER = previous_tier
+
+    reference = set(tiers[EVALUATION_TIERS[0]]["top"])
+    for tier, result in tiers.items():
+        top = result.pop("top")
+        result["top_k_overlap"] = round(len(reference & set(top)) / len(reference), 3) if reference else None
+        calls = ", ".join(f"{model}: {stats['llm_calls']}" for model, stats in sorted(result["models"].items()))
+        print(
+            f"{size:>6} test cases, {tier:<8} {result['wall_seconds']:8.3f}s, {result['llm_calls']:4} LLM calls ({calls}), "
+            f"top {k} overlap {result['top_k_overlap']}",
+            flush=True,
+        )
+    return {"size": size, "k": k, "tiers": tiers}
+
+
+def _scaling_exponent(sizes: List[int], values: List[float]) -> Optional[float]:
+    """Slope of log(value) over log(size): 1 is linear, 2 quadratic."""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if value and value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / variance, 3)
+
+
+def scaling_curves(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    sizes = [result["size"] for result in results]
+    curves = {
+        metric: {
+            "points": [[result["size"], result[metric]] for result in results],
+            "exponent": _scaling_exponent(sizes, [result[metric] for result in results]),
+        }
+        for metric in ("wall_seconds", "llm_calls", "prompt_tokens", "peak_memory_bytes")
+    }
+    node_names = sorted({node for result in results for node in result["nodes"]})
+    curves["nodes"] = {
+        node: {
+            "wall_seconds_exponent": _scaling_exponent(
+                sizes, [result["nodes"].get(node, {}).get("wall_seconds", 0) for result in results]
+            ),
+        }
+        for node in node_names
+    }
+    return curves
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `threshold` (e.g. 0.2 for 20%)."""
+    baseline_by_size = {result["size"]: result for result in baseline["results"]}
+    regressions = []
+    print(f"\nCompared to {baseline.get('git_commit') or 'baseline'} ({baseline.get('created_at')}):")
+    for result in current["results"]:
+        previous = baseline_by_size.get(result["size"])
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if not result.get(metric) or not previous.get(metric):
+                continue
+            ratio = result[metric] / previous[metric]
+            marker = ""
+            if ratio > 1 + threshold:
+                marker = "  <-- regression"
+                regressions.append(f"{metric} at {result['size']} test cases: {previous[metric]} -> {result[metric]}")
+            print(f"  {result['size']:>6} {metric:<18} {previous[metric]:>14} -> {result[metric]:>14} ({ratio:5.2f}x){marker}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the agent pipeline offline with a fake LLM")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Suite sizes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size, the median is reported")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic suites")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--seconds-per-output-token", type=float, default=0.0, help="Simulated seconds per response token")
+    parser.add_argument("--changes", metavar="PATH", help="Unified diff or list of changed files to run every suite with")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the extra run per size that traces peak memory")
+    parser.add_argument(
+        "--model-tiers", action="store_true",
+        help="Also compare scoring with the strong model, the fast model and the cascade of both",
+    )
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown --compare reports as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # The pipeline reads these when it is imported: use the fake model and keep the runs
+    # independent of each other and of the caches of real runs
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN"] = str(args.seconds_per_output_token)
+    os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="test-agent-benchmark-"))
+    for setting in ("EVALUATION_CACHE_ENABLED", "RUBRIC_CACHE_ENABLED", "CLUSTERING_INCREMENTAL", "CHECKPOINT_ENABLED"):
+        os.environ.setdefault(setting, "false")
+    # Node logs would dominate the measured time
+    logging.disable(logging.INFO)
+
+    from src.core import config
+    from src.core.graph import get_compiled_graph
+
+    changes = None
+    if args.changes:
+        with open(args.changes, encoding="utf-8") as f:
+            changes = f.read()
+
+    print(f"Benchmarking {len(args.sizes)} suite sizes, {args.repeat} run(s) each, {args.latency}s simulated latency per call", flush=True)
+    results = [
+        benchmark_size(get_compiled_graph(), size, args.query, args.repeat, args.seed, not args.no_memory, changes)
+        for size in sorted(args.sizes)
+    ]
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": {
+            "query": args.query,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "latency_seconds": args.latency,
+            "seconds_per_output_token": args.seconds_per_output_token,
+            "evaluation_mode": config.EVALUATION_MODE,
+            "evaluation_batch_size": config.EVALUATION_BATCH_SIZE,
+            "evaluation_max_concurrency": config.EVALUATION_MAX_CONCURRENCY,
+            "clustering_backend": config.CLUSTERING_BACKEND,
+            "prompt_format": config.PROMPT_FORMAT,
+            "evaluation_model_tier": config.EVALUATION_MODEL_TIER,
+            "changes": args.changes,
+        },
+        "results": results,
+        "scaling": scaling_curves(results),
+    }
+    if args.model_tiers:
+        k = config.TOP_K or config.CASCADE_TOP_K
+        print(f"Comparing evaluation model tiers by their top {k}", flush=True)
+        report["model_tiers"] = [
+            compare_model_tiers(get_compiled_graph(), size, args.query, args.seed, k) for size in sorted(args.sizes)
+        ]
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Scaling exponent of the wall time: {report['scaling']['wall_seconds']['exponent']}")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Startup time of the entry points, measured in fresh interpreters.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --compare benchmarks/results/startup-20250101-120000.json
+
+Every command runs in a new process without OPENAI_API_KEY, so importing must neither
+create the model nor need credentials. Reports the median wall time of each command and
+saves it as JSON so results of two versions can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.pipeline import RESULTS_DIR, _git_commit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: arguments of the python interpreter
+COMMANDS = {
+    "cli_help": ["main.py", "--help"],
+    "import_graph": ["-c", "import src.core.graph"],
+    "import_app": ["-c", "import app"],
+}
+
+
+def _environment() -> Dict[str, str]:
+    return {name: value for name, value in os.environ.items() if name != "OPENAI_API_KEY"}
+
+
+def time_command(arguments: List[str], repeat: int) -> Dict[str, Any]:
+    """Median wall time of running `python <arguments>` in a fresh interpreter `repeat` times."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, *arguments], cwd=REPO_ROOT, env=_environment(), capture_output=True, text=True
+        )
+        timings.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            raise RuntimeError(f"python {' '.join(arguments)} failed:\n{completed.stderr[-2000:]}")
+    return {
+        "command": f"python {' '.join(arguments)}",
+        "median_seconds": round(statistics.median(timings), 3),
+        "min_seconds": round(min(timings), 3),
+        "max_seconds": round(max(timings), 3),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Commands that got slower than the baseline by more than `threshold` (e.g. 0.2 for 20%)."""
+    regressions = []
+    print(f"\nCompared to {baseline.get('git_commit') or 'baseline'} ({baseline.get('created_at')}):")
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous or not previous["median_seconds"]:
+            continue
+        ratio = result["median_seconds"] / previous["median_seconds"]
+        marker = ""
+        if ratio > 1 + threshold:
+            marker = "  <-- regression"
+            regressions.append(f"{name}: {previous['median_seconds']}s -> {result['median_seconds']}s")
+        print(f"  {name:<14} {previous['median_seconds']:>8}s -> {result['median_seconds']:>8}s ({ratio:5.2f}x){marker}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of the CLI and the web app")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command, the median is reported")
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown --compare reports as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    results = {}
+    for name, arguments in COMMANDS.items():
+        results[name] = time_command(arguments, args.repeat)
+        print(f"{name:<14} {results[name]['median_seconds']:>8}s  ({results[name]['command']})", flush=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
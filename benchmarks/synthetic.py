@@ -0,0 +1,53 @@
+import random
+from typing import Any, Dict, List
+
+# Functional areas of the synthetic suites: (area, vocabulary its test cases are written with)
+AREAS = [
+    ("url", "url_for routing endpoint server_name scheme redirect blueprint query_string"),
+    ("auth", "login password session token mfa reset logout permission"),
+    ("payment", "checkout card refund invoice charge currency tax receipt"),
+    ("cache", "cache invalidate ttl redis eviction warm stale key"),
+    ("upload", "file image upload resize storage bucket thumbnail quota"),
+    ("search", "query index ranking filter facet pagination suggest synonym"),
+    ("email", "email notification template smtp bounce unsubscribe digest queue"),
+    ("report", "export csv pdf report chart aggregate schedule dashboard"),
+    ("config", "config environment setting override default secret loader flag"),
+    ("database", "migration transaction rollback schema index constraint pool replica"),
+]
+
+DEFAULT_QUERY = "We updated the URL generation algorithm. What should we test?"
+
+
+def generate_suite(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Deterministic synthetic test suite of `size` test cases spread over the areas in AREAS.
+
+    Every area has several test files, more of them for larger suites, and every test case
+    mixes the vocabulary of its area with a few rare words, like a real suite where test
+    cases of one component share terms but are not identical.
+    """
+    rng = random.Random(seed)
+    rare_words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(max(200, size))]
+    files_per_area = max(1, size // (len(AREAS) * 25))
+
+    test_cases = []
+    for i in range(size):
+        area, vocabulary = AREAS[i % len(AREAS)]
+        words = vocabulary.split()
+
+        def pick(count):
+            return " ".join(rng.choice(words) for _ in range(count))
+
+        test_cases.append({
+            "id": str(i + 1),
+            "file_path": f"tests/{area}/test_{area}_{rng.randrange(files_per_area)}.py",
+            "test_name": f"test_{area}_{pick(2).replace(' ', '_')}_{i + 1}",
+            "summary": f"Verifies that {pick(3)} behaves correctly when {pick(2)} {rng.choice(rare_words)} is configured.",
+            "steps": [
+                f"Arrange: set up {pick(2)} with {rng.choice(rare_words)}",
+                f"Act: call {pick(2)}",
+                f"Assert: {pick(3)} matches the expected value",
+            ],
+            "notes": [f"Covers {area} {rng.choice(rare_words)}"] if rng.random() < 0.3 else [],
+        })
+    return test_cases
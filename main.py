@@ -1,57 +1,187 @@
+import argparse
 import logging
-from src.core.graph import compiled_graph
+import os
+import sys
+from src.core.graph import get_compiled_graph
 from src.core.state import TestAgentState
+from src.core.checkpoint import ensure_new_thread, get_checkpointed_graph, new_thread_id, resume_run, run_config
+from src.core.metrics import collect_run_metrics
 from src.api.tc_file import nl_test_cases
-from langfuse.langchain import CallbackHandler
+from src.api.test_case_loader import load_test_cases
+from src.jobs.batch import load_queries, run_query_batch, write_batch_results
+from src.utils.serialize import get_token_savings_report
+from src.api.tracing import get_langfuse_handler
+from src.retrieval.impact import parse_changes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def create_initial_test_state(query: str) -> TestAgentState:
+def create_initial_test_state(query: str, changes=None) -> TestAgentState:
     """Helper function to create a new TestAgentState with sensible defaults"""
+    # A unified diff or list of changed files narrows the run to the affected test cases
+    changed_files, changed_symbols = parse_changes(changes)
     return {
         "query": query,
+        "changed_files": changed_files,
+        "changed_symbols": changed_symbols,
         "test_cases": [],
+        "suite_id": None,
         "is_clustering_needed": False,
         "clusters": None,
         "relevant_clusters": [],
+        "relevant_test_ids": None,
         "rubric": [],
         "evaluated_test_cases": [],
         "sorted_test_cases": []
     }
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the test agent on a test suite")
+    parser.add_argument(
+        "--suite",
+        help="Path to a JSON array or JSONL/NDJSON file of test cases (defaults to the bundled sample suite)",
+    )
+    parser.add_argument(
+        "--changes",
+        metavar="PATH",
+        help="Unified diff or list of changed files ('-' reads stdin); only the test cases they affect are prioritized",
+    )
+    parser.add_argument("--thread-id", help="Id to checkpoint the run under (defaults to a new random id)")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Resume a failed or killed run from its last checkpoint")
+    parser.add_argument(
+        "--queries",
+        help="Answer every query of this file (one per line, or a JSON array) against the suite in one batch",
+    )
+    parser.add_argument("--output-dir", default="batch_results", help="Where --queries writes one result file per query and summary.json")
+    parser.add_argument("--max-concurrency", type=int, help="Queries of a batch run at once (defaults to BATCH_MAX_CONCURRENCY)")
+    parser.add_argument(
+        "--draw-graph",
+        nargs="?",
+        const="graph.png",
+        metavar="PATH",
+        help="Draw the agent graph to PATH (default graph.png) and exit; a .mmd path gets the Mermaid source, "
+        "anything else a PNG rendered by the mermaid.ink web service",
+    )
+    args = parser.parse_args()
+    if args.changes and args.queries:
+        parser.error("--changes applies to a single run, not to --queries batches")
+    return args
+
+
+def read_changes(path):
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def log_result(result):
+    logger.info("--- AGENT EXECUTION COMPLETED ---")
+    logger.info(f"Final result: {len(result.get('sorted_test_cases', []))} test cases prioritized")
+    for prompt_name, totals in get_token_savings_report().summary().items():
+        logger.info(f"Prompt {prompt_name}: {totals['calls']} call(s), {totals['serialized_tokens']} payload tokens, {totals['saved_tokens']} saved ({totals['saved_percent']}%)")
+
+
+def log_run_metrics(run_metrics):
+    """Per-run summary of the node and LLM call metrics, the slowest node first."""
+    summary = run_metrics.summary()
+    logger.info("--- RUN METRICS ---")
+    nodes = sorted(summary["nodes"].items(), key=lambda item: item[1]["runs"]["total_seconds"], reverse=True)
+    for node, stats in nodes:
+        llm_calls = stats["llm_calls"]
+        logger.info(
+            f"Node {node}: {stats['runs']['count']} run(s) in {stats['runs']['total_seconds']}s, "
+            f"{llm_calls['count']} LLM call(s) (p50 {llm_calls['p50_seconds']}s, p95 {llm_calls['p95_seconds']}s), "
+            f"{stats['prompt_tokens']} prompt + {stats['completion_tokens']} completion tokens, "
+            f"{stats['retries']} retries, {stats['llm_errors']} errors, {stats['parse_failures']} parse failures"
+        )
+    batches = summary["evaluation_batches"]
+    if batches["count"]:
+        logger.info(
+            f"Evaluation batches: {batches['count']}, mean size {batches['mean_size']}, max size {batches['max_size']}, "
+            f"{batches['failed_test_cases']} test case(s) without a valid evaluation, "
+            f"{batches['calls_avoided']} call(s) avoided by the top-K stop"
+        )
+    for cache, counts in summary["caches"].items():
+        logger.info(f"Cache {cache}: {counts.get('hit', 0)} hits, {counts.get('miss', 0)} misses (hit rate {counts['hit_rate']})")
+
+
 def main():
+    args = parse_args()
+
+    if args.draw_graph:
+        graph = get_compiled_graph().get_graph()
+        if args.draw_graph.endswith(".mmd"):
+            with open(args.draw_graph, "w", encoding="utf-8") as f:
+                f.write(graph.draw_mermaid())
+        else:
+            graph.draw_mermaid_png(output_file_path=args.draw_graph)
+        logger.info(f"Drew the agent graph to {args.draw_graph}")
+        return
+
     logger.info("--- STARTING TEST AGENT ---")
 
     # Initialize Langfuse CallbackHandler for LangGraph/Langchain (tracing)
-    langfuse_handler = CallbackHandler()
+    langfuse_handler = get_langfuse_handler()
+    graph = get_checkpointed_graph()
+
+    if args.resume:
+        logger.info(f"Resuming run {args.resume}...")
+        with collect_run_metrics() as run_metrics:
+            result = resume_run(graph, args.resume, callbacks=[langfuse_handler])
+        log_result(result)
+        log_run_metrics(run_metrics)
+        return
+
+    if args.queries:
+        test_cases = load_test_cases(args.suite) if args.suite else nl_test_cases
+        summary, results = run_query_batch(
+            load_queries(args.queries),
+            test_cases,
+            suite_id=os.path.abspath(args.suite) if args.suite else None,
+            max_concurrency=args.max_concurrency,
+            graph=graph,
+            callbacks_factory=lambda: [langfuse_handler],
+        )
+        summary_path = write_batch_results(args.output_dir, summary, results)
+        logger.info(f"Wrote {len(results)} query results and the batch summary to {summary_path}")
+        return
+
+    # A thread id that already has a checkpoint belongs to an earlier run, which can only be resumed
+    thread_id = args.thread_id or new_thread_id()
+    ensure_new_thread(graph, thread_id)
 
     # create an initial state
     query = "We updated the URL generation algorithm. What should we test?"
     logger.info(f"Initial query: '{query}'")
     
-    initial_state = create_initial_test_state(query)
-    initial_state["test_cases"] = nl_test_cases
+    initial_state = create_initial_test_state(query, read_changes(args.changes) if args.changes else None)
+    initial_state["test_cases"] = load_test_cases(args.suite) if args.suite else nl_test_cases
+    # The suite file identifies the suite for incremental clustering across runs
+    initial_state["suite_id"] = os.path.abspath(args.suite) if args.suite else None
     
-    logger.info(f"Loaded {len(nl_test_cases)} test cases")
+    logger.info(f"Loaded {len(initial_state['test_cases'])} test cases")
 
-    compiled_graph.get_graph().draw_mermaid_png(output_file_path="graph.png")
-    
     # run the agent
-    logger.info("Starting graph execution...")
-    result = compiled_graph.invoke(
-        input=initial_state,
-        config={"callbacks": [langfuse_handler]}
-    )
-    
-    logger.info("--- AGENT EXECUTION COMPLETED ---")
-    logger.info(f"Final result: {len(result.get('sorted_test_cases', []))} test cases prioritized")
+    logger.info(f"Starting graph execution with thread id {thread_id}...")
+    with collect_run_metrics() as run_metrics:
+        try:
+            result = graph.invoke(
+                input=initial_state,
+                config=run_config(thread_id, callbacks=[langfuse_handler])
+            )
+        except Exception:
+            log_run_metrics(run_metrics)
+            if graph.checkpointer is not None:
+                logger.error(f"Run failed, continue it from its last checkpoint with: python main.py --resume {thread_id}")
+            raise
+
+    log_result(result)
+    log_run_metrics(run_metrics)
 
 
 if __name__ == "__main__":
     main()
-
-main()
\ No newline at end of file
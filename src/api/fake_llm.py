@@ -0,0 +1,224 @@
+import json
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.utils.text import analyze, normalize_query
+from src.utils.tokens import count_tokens
+
+FAKE_MODEL_NAME = "fake-llm"
+
+
+def _stable_int(*parts: Any) -> int:
+    # hash() is salted per process, crc32 gives the same answer on every run
+    return zlib.crc32("|".join(str(part) for part in parts).encode("utf-8"))
+
+
+def _records(text: str) -> List[Dict[str, Any]]:
+    """Records a prompt embeds with serialize_records, as compact JSON or as a | table."""
+    start = text.find("[")
+    if start != -1:
+        try:
+            records, _ = json.JSONDecoder().raw_decode(text[start:])
+            if isinstance(records, list):
+                return [record for record in records if isinstance(record, dict)]
+        except json.JSONDecodeError:
+            pass
+
+    lines = [line.strip() for line in text.splitlines() if "|" in line]
+    if not lines:
+        return []
+    header = [field.strip() for field in lines[0].split("|")]
+    return [dict(zip(header, (cell.strip() for cell in line.split("|")))) for line in lines[1:]]
+
+
+def _terms(*values: Any) -> set:
+    return set(analyze(" ".join(json.dumps(value) if not isinstance(value, str) else value for value in values)))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic offline stand-in for the chat model, used by the benchmarks and tests.
+
+    It recognizes the prompt of every node by its system prompt and answers in the format
+    that node asks for, derived from the prompt content only: the same prompt always gets
+    the same answer. Each call sleeps `latency_seconds` plus `seconds_per_output_token` for
+    every token of the answer, and reports token usage like a real provider. A `response_format`
+    json_schema is honoured like OpenAI structured outputs do.
+
+    With `score_noise` it stands in for a cheaper model: the query relevance score of about a
+    third of the test cases is off by up to that much, and half of those come with a low confidence.
+    """
+
+    latency_seconds: float = 0.0
+    seconds_per_output_token: float = 0.0
+    score_noise: int = 0
+    # Usage is counted with the tokenizer of the model being simulated
+    model_name: str = "gpt-4o"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        system_prompt = str(messages[0].content) if len(messages) > 1 else ""
+        user_prompt = str(messages[-1].content)
+        answer = self._answer(system_prompt, user_prompt)
+        response_format = kwargs.get("response_format")
+        if response_format:
+            # Structured output is the bare JSON document, an array is wrapped in the schema's only field
+            if isinstance(answer, list):
+                answer = {next(iter(response_format["json_schema"]["schema"]["properties"])): answer}
+            content = json.dumps(answer, indent=1)
+        else:
+            # Fenced like most chat model answers to "return only JSON"
+            content = f"```json\n{json.dumps(answer, indent=1)}\n```"
+
+        input_tokens = sum(count_tokens(str(message.content), self.model_name) for message in messages)
+        output_tokens = count_tokens(content, self.model_name)
+        delay = self.latency_seconds + self.seconds_per_output_token * output_tokens
+        if delay > 0:
+            time.sleep(delay)
+
+        message = AIMessage(
+            content=content,
+            response_metadata={"finish_reason": "stop", "model_name": FAKE_MODEL_NAME},
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _answer(self, system_prompt: str, user_prompt: str) -> Any:
+        if "rubric generation assistant" in system_prompt:
+            return self._rubric(user_prompt)
+        if "scoring assistant" in system_prompt:
+            return self._scores(user_prompt)
+        if "Relevance Analyzer" in system_prompt:
+            return self._relevant_clusters(user_prompt)
+        if "clustering assistant" in system_prompt:
+            if "merged_keys" in system_prompt:
+                return self._merges(user_prompt)
+            if "already been grouped" in system_prompt:
+                return self._cluster_names(user_prompt)
+            return self._clusters(user_prompt)
+        return {}
+
+    def _rubric(self, user_prompt: str) -> Dict[str, Any]:
+        query = user_prompt.split("based on this query:", 1)[-1].strip()
+        dimensions = [
+            ("Query Relevance", f"How directly the test verifies: {query}", 5),
+            ("Failure Risk", "How likely the covered code breaks after the change", 3),
+            ("Business Impact", "How costly a failure of the covered functionality would be", 2),
+        ]
+        return {"rubric": [
+            {
+                "id": str(i),
+                "name": name,
+                "description": description,
+                "weight": weight,
+                "scoring_criteria": {str(score): f"{name} level {score}" for score in range(6)},
+            }
+            for i, (name, description, weight) in enumerate(dimensions, start=1)
+        ]}
+
+    def _scores(self, user_prompt: str) -> List[Dict[str, Any]]:
+        test_cases_text, _, rubric_text = user_prompt.partition("Rubric:")
+        test_cases = _records(test_cases_text.split("Test Cases:", 1)[-1])
+        rubric = _records(rubric_text)
+        results = []
+        for test_case in test_cases:
+            test_terms = _terms(test_case.get("test_name", ""), test_case.get("summary", ""), test_case.get("steps", ""))
+            noisy = self.score_noise > 0 and _stable_int("noise", test_case.get("id")) % 3 == 0
+            dimension_scores = []
+            for dimension in rubric:
+                if dimension is rubric[0]:
+                    # The first dimension follows the overlap with the query, so rankings are meaningful
+                    query_terms = set(normalize_query(str(dimension.get("description", "")).split(":", 1)[-1]).split())
+                    overlap = len(query_terms & test_terms) / len(query_terms) if query_terms else 0.0
+                    raw_score = min(5, round(10 * overlap))
+                    if noisy:
+                        offset = 1 + _stable_int("offset", test_case.get("id")) % self.score_noise
+                        raw_score = max(0, min(5, raw_score + (offset if raw_score < 3 else -offset)))
+                else:
+                    raw_score = _stable_int(test_case.get("id"), dimension.get("id")) % 6
+                dimension_scores.append({
+                    "dimension_id": str(dimension.get("id")),
+                    "name": dimension.get("name"),
+                    "raw_score": raw_score,
+                    "justification": f"{dimension.get('name')} scored {raw_score}",
+                })
+            results.append({
+                "test_id": test_case.get("id"),
+                "test_name": test_case.get("test_name"),
+                "dimension_scores": dimension_scores,
+                "explanation": f"Scored against {len(rubric)} dimensions",
+                "confidence": 0.4 if noisy and _stable_int("confidence", test_case.get("id")) % 2 == 0 else 0.9,
+            })
+        return results
+
+    def _relevant_clusters(self, user_prompt: str) -> Dict[str, Any]:
+        match = re.search(r'User Query: "(.*)"', user_prompt)
+        query_terms = set(normalize_query(match.group(1) if match else "").split())
+        clusters = _records(user_prompt.split("Available Clusters:", 1)[-1].split("Instructions:", 1)[0])
+        selected = [
+            cluster for cluster in clusters
+            if query_terms & _terms(cluster.get("name", ""), cluster.get("description", ""), cluster.get("keywords", ""))
+        ] or clusters
+        return {
+            "selected_clusters": [
+                {"cluster_id": cluster.get("cluster_id"), "relevance_level": "high", "justification": "Shares terms with the query"}
+                for cluster in selected
+            ],
+            "excluded_count": len(clusters) - len(selected),
+            "selection_summary": f"Selected {len(selected)} of {len(clusters)} clusters",
+        }
+
+    def _clusters(self, user_prompt: str) -> Dict[str, Any]:
+        groups: Dict[str, List[Any]] = {}
+        for test_case in _records(user_prompt):
+            group = test_case.get("file_path") or str(test_case.get("test_name", "")).split("_")[:2][-1]
+            groups.setdefault(str(group), []).append(test_case.get("id"))
+        return {"clusters": [
+            {
+                "cluster_id": i,
+                "name": f"Tests in {group}",
+                "description": f"Test cases of {group}",
+                "test_ids": test_ids,
+                "keywords": sorted(_terms(group))[:5],
+            }
+            for i, (group, test_ids) in enumerate(groups.items(), start=1)
+        ]}
+
+    def _merges(self, user_prompt: str) -> Dict[str, Any]:
+        merges: Dict[str, List[str]] = {}
+        for cluster in _records(user_prompt):
+            merges.setdefault(str(cluster.get("name")), []).append(str(cluster.get("key")))
+        return {"clusters": [
+            {"name": name, "description": f"Merged {name}", "keywords": [], "merged_keys": keys}
+            for name, keys in merges.items()
+        ]}
+
+    def _cluster_names(self, user_prompt: str) -> Dict[str, Any]:
+        clusters = []
+        for cluster in _records(user_prompt):
+            keywords = cluster.get("keywords") or []
+            if isinstance(keywords, str):
+                keywords = keywords.split("; ")
+            clusters.append({
+                "cluster_id": cluster.get("cluster_id"),
+                "name": " ".join(keywords[:2]).title() or f"Cluster {cluster.get('cluster_id')}",
+                "description": f"Test cases about {', '.join(keywords)}",
+            })
+        return {"clusters": clusters}
@@ -1,11 +1,276 @@
-import os
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
+import asyncio
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-# Get the project root directory (two levels up from this file)
-project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-dotenv_path = os.path.join(project_root, '.env')
-load_dotenv(dotenv_path)
+import httpx
+from src.core import config  # loads the .env file
+from src.api.fake_llm import FakeChatModel
+from src.api.rate_limit import TokenBucket
+from src.core.metrics import count_llm_retry, observe_llm_call
+from src.utils.tokens import count_tokens
 
-#this requires to have OPENAI_API_KEY env variable in .env file
-model = ChatOpenAI(model="gpt-4o", temperature=0)
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Model of the "strong" tier; prompts are sized and their tokens counted for it
+MODEL_NAME = config.LLM_STRONG_MODEL
+MODEL_TIERS = ("strong", "fast")
+# Limits of MODEL_NAME (the fast gpt-4o-mini has the same), token budgets of the nodes are capped to these
+MODEL_CONTEXT_WINDOW = 128000
+MODEL_MAX_OUTPUT_TOKENS = 16384
+
+# Request timeouts, throttling and server errors are worth another try; other errors are not
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    # The OpenAI SDK is slow to import, only failed calls need it here
+    import openai
+
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRY_STATUS_CODES
+    # Covers timeouts as well
+    return isinstance(error, openai.APIConnectionError)
+
+
+def truncated_response_text(error: Exception) -> Optional[str]:
+    """
+    What the model wrote before hitting its output token limit, if `error` is the error the
+    OpenAI SDK raises for a structured output response cut off there; None for other errors.
+    """
+    import openai
+
+    if not isinstance(error, openai.LengthFinishReasonError):
+        return None
+    try:
+        return error.completion.choices[0].message.content or ""
+    except (AttributeError, IndexError):
+        return ""
+
+
+def object_schema(**properties: Any) -> Dict[str, Any]:
+    """JSON schema of an object with exactly these properties, as strict structured output requires."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def structured_output(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keyword arguments for `invoke` that make the model answer with JSON matching `schema`,
+    or none when STRUCTURED_OUTPUT is disabled. The schema has to be an object at the top.
+    """
+    if not config.STRUCTURED_OUTPUT:
+        return {}
+    return {"response_format": {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}}
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Delay the server asked for in a Retry-After header, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """
+    Wraps a chat model with rate limiting and retries; nodes call `invoke` as on the model itself.
+
+    Every call first takes one request from the requests/minute bucket and its estimated tokens
+    (prompt plus expected output) from the tokens/minute bucket, then the estimate is corrected
+    with the usage the response reports. Throttling (429), server errors (5xx), timeouts and
+    connection errors are retried with jittered exponential backoff, honouring Retry-After.
+    Both buckets are shared by all threads and event loops using this client.
+    """
+
+    def __init__(
+        self,
+        chat_model: Any,
+        model_name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        expected_output_tokens: int = 1000,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.chat_model = chat_model
+        self.model_name = model_name
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.expected_output_tokens = expected_output_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def _estimate_tokens(self, messages: List[Any], kwargs: dict) -> int:
+        if not self.token_bucket.enabled:
+            return 0
+        prompt = "".join(str(getattr(message, "content", message)) for message in messages)
+        output = kwargs.get("max_tokens") or getattr(self.chat_model, "max_tokens", None) or self.expected_output_tokens
+        return count_tokens(prompt, self.model_name) + output
+
+    def _record_usage(self, response: Any, estimated_tokens: int):
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("total_tokens"):
+            self.token_bucket.adjust(usage["total_tokens"] - estimated_tokens)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _should_retry(self, attempt: int, error: Exception) -> Optional[float]:
+        """Delay before the next attempt, or None when the error has to be raised."""
+        if attempt >= self.max_retries or not _is_retryable(error):
+            return None
+        count_llm_retry()
+        delay = self._backoff(attempt, error)
+        logger.warning(f"LLM call failed ({type(error).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def invoke(self, messages: List[Any], **kwargs) -> Any:
+        estimated_tokens = self._estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated_tokens)
+            started = time.perf_counter()
+            try:
+                response = self.chat_model.invoke(messages, **kwargs)
+            except Exception as e:
+                observe_llm_call(time.perf_counter() - started, error=e)
+                delay = self._should_retry(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            observe_llm_call(time.perf_counter() - started, response)
+            self._record_usage(response, estimated_tokens)
+            return response
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        estimated_tokens = self._estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            await self.request_bucket.acquire_async(1)
+            await self.token_bucket.acquire_async(estimated_tokens)
+            started = time.perf_counter()
+            try:
+                response = await self.chat_model.ainvoke(messages, **kwargs)
+            except Exception as e:
+                observe_llm_call(time.perf_counter() - started, error=e)
+                delay = self._should_retry(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            observe_llm_call(time.perf_counter() - started, response)
+            self._record_usage(response, estimated_tokens)
+            return response
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=config.LLM_MAX_CONNECTIONS, max_keepalive_connections=config.LLM_MAX_CONNECTIONS)
+
+
+def _http_timeout() -> httpx.Timeout:
+    # Without a pool timeout, callers beyond the connection limit wait for a free connection
+    return httpx.Timeout(config.LLM_TIMEOUT_SECONDS, pool=None)
+
+
+@lru_cache(maxsize=None)
+def get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """One connection pool per process, shared by every model created here, created on first use."""
+    return (
+        httpx.Client(limits=_http_limits(), timeout=_http_timeout()),
+        httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout()),
+    )
+
+
+def create_llm_client(model_name: str = MODEL_NAME, base_url: Optional[str] = None, **model_kwargs) -> LLMClient:
+    """
+    ChatOpenAI on the shared connection pool, behind the configured rate limits and retries.
+    With LLM_PROVIDER=fake the deterministic offline FakeChatModel is used instead.
+    """
+    if config.LLM_PROVIDER == "fake":
+        # The fake fast model trades accuracy for speed, so the cascade can be benchmarked
+        fast = model_name == config.LLM_FAST_MODEL != config.LLM_STRONG_MODEL
+        speedup = config.FAKE_LLM_FAST_SPEEDUP if fast else 1.0
+        chat_model = FakeChatModel(
+            model_name=model_name,
+            latency_seconds=config.FAKE_LLM_LATENCY_SECONDS / speedup,
+            seconds_per_output_token=config.FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN / speedup,
+            score_noise=1 if fast else 0,
+        )
+    else:
+        # Imported here so that importing the nodes stays fast and needs no API key
+        from langchain_openai import ChatOpenAI
+
+        http_client, http_async_client = get_http_clients()
+        chat_model = ChatOpenAI(
+            model=model_name,
+            temperature=0,
+            base_url=base_url or config.LLM_BASE_URL,
+            # Retries are done by LLMClient, so they are rate limited too
+            max_retries=0,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **model_kwargs,
+        )
+    return LLMClient(
+        chat_model,
+        model_name,
+        requests_per_minute=config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=config.LLM_TOKENS_PER_MINUTE,
+        max_retries=config.LLM_MAX_RETRIES,
+        backoff_base=config.LLM_BACKOFF_BASE_SECONDS,
+        backoff_max=config.LLM_BACKOFF_MAX_SECONDS,
+    )
+
+
+def model_name_for(tier: str) -> str:
+    """Model of a tier, "strong" (LLM_STRONG_MODEL) or "fast" (LLM_FAST_MODEL)."""
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier '{tier}', expected one of {', '.join(MODEL_TIERS)}")
+    return config.LLM_FAST_MODEL if tier == "fast" else config.LLM_STRONG_MODEL
+
+
+# One shared client per tier
+_models: Dict[str, LLMClient] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(tier: str = "strong") -> LLMClient:
+    """
+    The shared client of the tier's model, created on its first LLM call rather than at import.
+    This requires to have OPENAI_API_KEY env variable in .env file (unless LLM_PROVIDER=fake).
+    """
+    model_name = model_name_for(tier)
+    with _models_lock:
+        if tier not in _models:
+            _models[tier] = create_llm_client(model_name)
+        return _models[tier]
+
+
+def __getattr__(name: str) -> Any:
+    # `from src.api.llm_client import model` keeps working, it just creates the client lazily
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
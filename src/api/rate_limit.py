@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` units per minute.
+
+    Used for both request and token limits: a request takes 1 unit from the request bucket
+    and its estimated token count from the token bucket. A limit of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Take `amount` if available and return 0, otherwise return the seconds to wait first."""
+        if not self.enabled:
+            return 0.0
+        # A request larger than the whole bucket would never fit, it waits for a full bucket instead
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._level >= amount:
+                self._level -= amount
+                return 0.0
+            return (amount - self._level) / self.rate
+
+    def acquire(self, amount: float = 1, sleep: Callable[[float], None] = time.sleep):
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return
+            sleep(wait)
+
+    async def acquire_async(self, amount: float = 1):
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def adjust(self, amount: float):
+        """
+        Correct an earlier estimate once the real usage is known: a positive amount takes more
+        (the level may go negative, delaying later requests), a negative one gives back.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
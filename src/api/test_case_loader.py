@@ -0,0 +1,136 @@
+import io
+import json
+from typing import Any, Dict, IO, Iterable, Iterator, List, Union
+
+REQUIRED_FIELDS = ("id", "test_name", "summary", "steps")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class InvalidTestCaseError(ValueError):
+    """Raised when a test case in the input is malformed or misses a required field."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"Test case #{position}: {message}")
+        self.position = position
+
+
+def validate_test_case(test_case: Any, position: int) -> Dict[str, Any]:
+    if not isinstance(test_case, dict):
+        raise InvalidTestCaseError(f"expected a JSON object, got {type(test_case).__name__}", position)
+
+    missing = [field for field in REQUIRED_FIELDS if field not in test_case]
+    if missing:
+        raise InvalidTestCaseError(f"missing required field(s) {', '.join(missing)}", position)
+
+    if not isinstance(test_case["steps"], (list, str)):
+        raise InvalidTestCaseError("'steps' must be a list or a string", position)
+
+    return test_case
+
+
+def validate_test_cases(test_cases: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Validate test cases one by one (required fields, unique ids) as they are consumed."""
+    seen_ids = set()
+    for position, test_case in enumerate(test_cases, start=1):
+        test_case = validate_test_case(test_case, position)
+        test_id = str(test_case["id"])
+        if test_id in seen_ids:
+            raise InvalidTestCaseError(f"duplicate id '{test_id}'", position)
+        seen_ids.add(test_id)
+        yield test_case
+
+
+def _iter_json_values(fp: IO[str], chunk_size: int) -> Iterator[Any]:
+    """
+    Decode JSON values from a text stream without reading it all into memory.
+
+    A top-level array is streamed element by element; otherwise the input is treated as a
+    sequence of whitespace separated values, which covers JSONL/NDJSON (and pretty-printed
+    objects one after another).
+    """
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array = None
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return
+        # Drop what is already decoded so the buffer stays around one value in size
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(characters):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in characters:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    while True:
+        skip(_WHITESPACE)
+        if pos >= len(buffer):
+            if in_array:
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            return
+
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            if in_array:
+                pos += 1
+                continue
+
+        if in_array:
+            skip(_WHITESPACE + ",")
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos >= len(buffer):
+                continue
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The value is not complete yet, read more of it
+                fill()
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(buffer) and not eof and not isinstance(value, (dict, list, str)):
+                fill()
+                continue
+            break
+
+        pos = end
+        yield value
+
+
+def iter_test_cases(source: Union[str, IO], chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    Stream validated test cases from a JSON array or JSONL/NDJSON file path or file object.
+
+    Test cases are validated as they are read, so a bad record fails fast with its position.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as fp:
+            yield from iter_test_cases(fp, chunk_size)
+        return
+
+    if isinstance(source.read(0), bytes):
+        # Binary streams such as uploaded files
+        source = io.TextIOWrapper(source, encoding="utf-8")
+
+    yield from validate_test_cases(_iter_json_values(source, chunk_size))
+
+
+def load_test_cases(source: Union[str, IO], chunk_size: int = 1 << 16) -> List[Dict[str, Any]]:
+    """Read all test cases from a file path or file object into a single list."""
+    return list(iter_test_cases(source, chunk_size))
@@ -0,0 +1,10 @@
+def get_langfuse_handler():
+    """
+    A new Langfuse callback handler for tracing one run (or one job) of the graph.
+
+    Langfuse is imported on the first call: it is slow to import and only runs need it,
+    so `--help`, the web server's startup and the tests do not pay for it.
+    """
+    from langfuse.langchain import CallbackHandler
+
+    return CallbackHandler()
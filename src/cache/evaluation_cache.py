@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core import config
+from src.core.metrics import count_cache_lookups
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def stable_hash(*parts: Any) -> str:
+    """Hash JSON-serializable values independently of dict key order."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Disk-backed (SQLite) cache of test case evaluations.
+
+    Entries are keyed by a stable hash of the test case, the rubric and the model name,
+    so a test case is only re-scored when one of those changes. Entries older than
+    max_age_seconds are dropped, and the least recently used entries are dropped once
+    the cache holds more than max_entries.
+    """
+
+    def __init__(self, path: str, max_entries: int, max_age_seconds: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    key           TEXT PRIMARY KEY,
+                    value         TEXT NOT NULL,
+                    created_at    REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_last_accessed ON evaluations (last_accessed)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per operation keeps the cache safe to share across threads and processes.
+        # The connection's own context manager only commits, closing() releases it.
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    @staticmethod
+    def make_key(test_case: Dict[str, Any], rubric: List[Dict[str, Any]], model_name: str) -> str:
+        return stable_hash(test_case, rubric, model_name)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached evaluations for the given keys, skipping misses and expired entries."""
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        min_created_at = time.time() - self.max_age_seconds
+
+        with self._lock, self._connect() as conn:
+            # Stay well below SQLite's bound parameter limit
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM evaluations WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*chunk, min_created_at),
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = json.loads(value)
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE evaluations SET last_accessed = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+            self.hits += len(found)
+            self.misses += len(unique_keys) - len(found)
+        count_cache_lookups("evaluation", len(found), len(unique_keys) - len(found))
+
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]):
+        """Store evaluations and apply age/size based eviction."""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO evaluations (key, value, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()],
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM evaluations WHERE created_at < ?", (now - self.max_age_seconds,))
+
+        (count,) = conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM evaluations WHERE key IN (SELECT key FROM evaluations ORDER BY last_accessed ASC LIMIT ?)",
+                (overflow,),
+            )
+            logger.info(f"Evicted {overflow} least recently used evaluations from the cache")
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM evaluations")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+_evaluation_cache: Optional[EvaluationCache] = None
+_evaluation_cache_lock = threading.Lock()
+
+
+def get_evaluation_cache() -> Optional[EvaluationCache]:
+    """Return the shared evaluation cache, or None when caching is disabled."""
+    global _evaluation_cache
+
+    if not config.EVALUATION_CACHE_ENABLED:
+        return None
+
+    with _evaluation_cache_lock:
+        if _evaluation_cache is None:
+            _evaluation_cache = EvaluationCache(
+                path=os.path.join(config.CACHE_DIR, "evaluations.sqlite"),
+                max_entries=config.EVALUATION_CACHE_MAX_ENTRIES,
+                max_age_seconds=config.EVALUATION_CACHE_MAX_AGE_SECONDS,
+            )
+        return _evaluation_cache
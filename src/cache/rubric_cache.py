@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core import config
+from src.core.metrics import count_cache_lookups
+from src.utils.text import build_tfidf, normalize_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class RubricCache:
+    """
+    Disk-backed (SQLite) cache of generated rubrics with fuzzy query matching.
+
+    Queries are normalized (lowercased, stopwords and generic words like "test"/"updated"
+    removed, stemmed). An exact normalized match is reused directly; otherwise the stored
+    query with the highest TF-IDF cosine similarity is reused when it reaches the threshold.
+    """
+
+    def __init__(self, path: str, similarity_threshold: float, max_entries: int, max_age_seconds: int):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rubrics (
+                    model            TEXT NOT NULL,
+                    normalized_query TEXT NOT NULL,
+                    query            TEXT NOT NULL,
+                    rubric           TEXT NOT NULL,
+                    created_at       REAL NOT NULL,
+                    last_accessed    REAL NOT NULL,
+                    PRIMARY KEY (model, normalized_query)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # The connection's own context manager only commits, closing() releases it
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def get(self, query: str, model_name: str) -> Optional[List[Dict[str, Any]]]:
+        """Return a stored rubric for this query or a near-duplicate of it."""
+        normalized = normalize_query(query)
+        if not normalized:
+            # Nothing distinctive left to match on (e.g. "What should we test?")
+            with self._lock:
+                self.misses += 1
+            count_cache_lookups("rubric", 0, 1)
+            return None
+        min_created_at = time.time() - self.max_age_seconds
+
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT normalized_query, query, rubric FROM rubrics WHERE model = ? AND created_at >= ?",
+                (model_name, min_created_at),
+            ).fetchall()
+
+            match = None
+            for row in rows:
+                if row[0] == normalized:
+                    match, similarity = row, 1.0
+                    break
+
+            if match is None and rows:
+                documents = [normalized.split()] + [row[0].split() for row in rows]
+                matrix, _, _ = build_tfidf(documents)
+                similarities = matrix[1:] @ matrix[0]
+                best = int(similarities.argmax())
+                if similarities[best] >= self.similarity_threshold:
+                    match, similarity = rows[best], float(similarities[best])
+
+            if match is None:
+                self.misses += 1
+                count_cache_lookups("rubric", 0, 1)
+                return None
+
+            conn.execute(
+                "UPDATE rubrics SET last_accessed = ? WHERE model = ? AND normalized_query = ?",
+                (time.time(), model_name, match[0]),
+            )
+            self.hits += 1
+        count_cache_lookups("rubric", 1, 0)
+
+        logger.info(f"Reusing cached rubric of query '{match[1]}' (similarity {similarity:.2f})")
+        return json.loads(match[2])
+
+    def put(self, query: str, model_name: str, rubric: List[Dict[str, Any]]):
+        if not normalize_query(query):
+            return
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rubrics (model, normalized_query, query, rubric, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (model_name, normalize_query(query), query, json.dumps(rubric, ensure_ascii=False), now, now),
+            )
+            conn.execute("DELETE FROM rubrics WHERE created_at < ?", (now - self.max_age_seconds,))
+            conn.execute(
+                "DELETE FROM rubrics WHERE rowid NOT IN (SELECT rowid FROM rubrics ORDER BY last_accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_rubric_cache: Optional[RubricCache] = None
+_rubric_cache_lock = threading.Lock()
+
+
+def get_rubric_cache() -> Optional[RubricCache]:
+    """Return the shared rubric cache, or None when caching is disabled."""
+    global _rubric_cache
+
+    if not config.RUBRIC_CACHE_ENABLED:
+        return None
+
+    with _rubric_cache_lock:
+        if _rubric_cache is None:
+            _rubric_cache = RubricCache(
+                path=os.path.join(config.CACHE_DIR, "rubrics.sqlite"),
+                similarity_threshold=config.RUBRIC_CACHE_SIMILARITY_THRESHOLD,
+                max_entries=config.RUBRIC_CACHE_MAX_ENTRIES,
+                max_age_seconds=config.RUBRIC_CACHE_MAX_AGE_SECONDS,
+            )
+        return _rubric_cache
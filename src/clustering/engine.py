@@ -0,0 +1,164 @@
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.utils.text import analyze, build_tfidf, stem, tokenize, transform_tfidf, STOPWORDS
+
+# Path, naming and step-structure words that every test case shares
+_NOISE_WORDS = frozenset({"test", "tests", "py", "src", "arrange", "act", "assert", "verifies", "verify", "confirm", "ensure"})
+
+
+def test_case_document(test_case: Dict[str, Any]) -> List[str]:
+    """
+    Analyzed terms of a test case used for clustering.
+
+    test_name and file_path are repeated so they weigh more than the longer free-text fields.
+    """
+    steps = test_case.get("steps") or []
+    if isinstance(steps, str):
+        steps = [steps]
+
+    name_terms = analyze(test_case.get("test_name", ""), _NOISE_WORDS)
+    path_terms = analyze(test_case.get("file_path", ""), _NOISE_WORDS)
+    text_terms = analyze(" ".join([test_case.get("summary", "")] + [str(step) for step in steps]), _NOISE_WORDS)
+
+    # Bare numbers (ids, counters, status codes) mostly make every test look unique
+    return [term for term in name_terms * 2 + path_terms * 2 + text_terms if not term.isdigit()]
+
+
+def _kmeans_plus_plus(vectors: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ seeding on L2-normalized rows, using cosine distance."""
+    n = vectors.shape[0]
+    centroids = np.empty((k, vectors.shape[1]), dtype=vectors.dtype)
+    centroids[0] = vectors[rng.integers(n)]
+    closest = 1.0 - vectors @ centroids[0]
+
+    for i in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        index = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids[i] = vectors[index]
+        closest = np.minimum(closest, 1.0 - vectors @ centroids[i])
+
+    return centroids
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, max_iter: int = 50, tolerance: float = 0.001, seed: int = 0):
+    """
+    k-means on the unit sphere (cosine similarity), fully vectorized with NumPy.
+
+    Returns:
+        (labels, centroids) with empty clusters removed and labels renumbered 0..k'-1
+    """
+    rng = np.random.default_rng(seed)
+    centroids = _kmeans_plus_plus(vectors, k, rng)
+    labels = np.full(vectors.shape[0], -1)
+
+    for _ in range(max_iter):
+        similarities = vectors @ centroids.T
+        new_labels = similarities.argmax(axis=1)
+        changed = np.count_nonzero(new_labels != labels)
+        labels = new_labels
+        # Stop once (almost) no test case moves between clusters anymore
+        if changed <= tolerance * vectors.shape[0]:
+            break
+
+        # Sum the members of every cluster in a single matrix product
+        membership = np.zeros((k, vectors.shape[0]), dtype=vectors.dtype)
+        membership[labels, np.arange(vectors.shape[0])] = 1
+        centroids = membership @ vectors
+
+        empty = np.flatnonzero(membership.sum(axis=1) == 0)
+        if len(empty):
+            # Re-seed empty clusters with the points that fit their current cluster worst
+            worst = np.argsort(similarities.max(axis=1))[: len(empty)]
+            centroids[empty] = vectors[worst]
+
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+
+    used = np.unique(labels)
+    remap = np.full(k, -1)
+    remap[used] = np.arange(len(used))
+    return remap[labels], centroids[used]
+
+
+def default_num_clusters(num_test_cases: int, max_clusters: int = 50) -> int:
+    return max(1, min(max_clusters, num_test_cases, round(math.sqrt(num_test_cases / 2))))
+
+
+class ClusterModel:
+    """A fitted clustering: vocabulary/idf to vectorize test cases plus one centroid per cluster."""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, centroids: np.ndarray):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.centroids = centroids
+
+    @property
+    def num_clusters(self) -> int:
+        return self.centroids.shape[0]
+
+    def vectorize(self, test_cases: List[Dict[str, Any]]) -> np.ndarray:
+        return transform_tfidf([test_case_document(test_case) for test_case in test_cases], self.vocabulary, self.idf)
+
+    def assign(self, test_cases: List[Dict[str, Any]]) -> np.ndarray:
+        """Index of the nearest centroid for each test case."""
+        if not test_cases:
+            return np.zeros(0, dtype=int)
+        return (self.vectorize(test_cases) @ self.centroids.T).argmax(axis=1)
+
+    def top_terms(self, cluster: int, n: int = 5) -> List[str]:
+        """Highest weighted (stemmed) terms of a cluster centroid."""
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        weights = self.centroids[cluster]
+        return [terms[column] for column in np.argsort(-weights)[:n] if weights[column] > 0]
+
+
+def fit_clusters(test_cases: List[Dict[str, Any]], num_clusters: Optional[int] = None, max_features: int = 2048, seed: int = 0):
+    """
+    Vectorize test cases with TF-IDF and group them with spherical k-means.
+
+    Returns:
+        (model, labels) where labels[i] is the cluster index of test_cases[i]
+    """
+    documents = [test_case_document(test_case) for test_case in test_cases]
+    vectors, vocabulary, idf = build_tfidf(documents, max_features=max_features)
+
+    k = num_clusters or default_num_clusters(len(test_cases))
+    k = max(1, min(k, len(test_cases)))
+    labels, centroids = spherical_kmeans(vectors, k, seed=seed)
+
+    return ClusterModel(vocabulary, idf, centroids), labels
+
+
+def surface_forms(test_cases: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Map each stem to its most common original word, so keywords read naturally."""
+    counts = defaultdict(Counter)
+    for test_case in test_cases:
+        for token in tokenize(f"{test_case.get('test_name', '')} {test_case.get('summary', '')}"):
+            if token not in STOPWORDS and len(token) > 1:
+                counts[stem(token)][token] += 1
+    return {term: counter.most_common(1)[0][0] for term, counter in counts.items()}
+
+
+def build_clusters(
+    test_cases: List[Dict[str, Any]], model: ClusterModel, labels: np.ndarray, num_keywords: int = 6
+) -> List[Dict[str, Any]]:
+    """Turn cluster labels into the {"cluster_id", "test_ids", "keywords"} records used in the state."""
+    forms = surface_forms(test_cases)
+    test_ids = defaultdict(list)
+    for test_case, label in zip(test_cases, labels):
+        test_ids[int(label)].append(test_case["id"])
+
+    clusters = []
+    for cluster in sorted(test_ids):
+        keywords = [forms.get(term, term) for term in model.top_terms(cluster, num_keywords)]
+        clusters.append({
+            "cluster_id": len(clusters) + 1,
+            "test_ids": test_ids[cluster],
+            "keywords": list(dict.fromkeys(keywords)),
+        })
+    return clusters
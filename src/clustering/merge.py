@@ -0,0 +1,126 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+UNCLUSTERED_NAME = "Other Test Cases"
+
+
+def clean_clusters(clusters: Optional[List[Dict[str, Any]]], test_ids: Iterable[Any], assigned: Set[str]) -> List[Dict[str, Any]]:
+    """
+    Turn LLM produced clusters into groups that only hold known, not yet assigned test ids.
+
+    Ids are matched as strings and returned as they appear in the suite. An id listed twice
+    stays in the first cluster that claimed it, unknown ids are dropped, and so are clusters
+    left without test cases. `assigned` is updated with the ids handed out.
+    """
+    known = {str(test_id): test_id for test_id in test_ids}
+    groups = []
+    for cluster in clusters or []:
+        members = []
+        for test_id in cluster.get("test_ids") or []:
+            key = str(test_id)
+            if key in known and key not in assigned:
+                assigned.add(key)
+                members.append(known[key])
+        if members:
+            groups.append({
+                "name": cluster.get("name") or f"Cluster {len(groups) + 1}",
+                "description": cluster.get("description") or "",
+                "keywords": list(cluster.get("keywords") or []),
+                "test_ids": members,
+            })
+    return groups
+
+
+def apply_merges(groups: List[Dict[str, Any]], merges: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Combine groups as the reduce step asked: every merge lists the keys of the groups it joins.
+
+    A group claimed by several merges stays in the first one, and groups no merge mentions
+    are carried over unchanged, so no test case is lost when the LLM skips a group.
+    """
+    by_key = {str(group["key"]): group for group in groups}
+    used = set()
+    merged = []
+    for merge in merges or []:
+        members = []
+        for key in merge.get("merged_keys") or []:
+            key = str(key)
+            if key in by_key and key not in used:
+                used.add(key)
+                members.append(by_key[key])
+        if not members:
+            continue
+        keywords = list(merge.get("keywords") or [])
+        if not keywords:
+            for member in members:
+                keywords.extend(keyword for keyword in member["keywords"] if keyword not in keywords)
+        merged.append({
+            "name": merge.get("name") or members[0]["name"],
+            "description": merge.get("description") or members[0]["description"],
+            "keywords": keywords,
+            "test_ids": [test_id for member in members for test_id in member["test_ids"]],
+        })
+
+    merged.extend(
+        {key: value for key, value in group.items() if key != "key"}
+        for group in groups
+        if str(group["key"]) not in used
+    )
+    return merged
+
+
+def coverage_errors(clusters: List[Dict[str, Any]], test_ids: Iterable[Any]) -> Tuple[List[str], List[str], List[str]]:
+    """Missing, duplicated and unknown test ids of a clustering, compared as strings."""
+    expected = {str(test_id) for test_id in test_ids}
+    seen = set()
+    duplicated, unknown = [], []
+    for cluster in clusters:
+        for test_id in cluster.get("test_ids", []):
+            key = str(test_id)
+            if key not in expected:
+                unknown.append(key)
+            elif key in seen:
+                duplicated.append(key)
+            seen.add(key)
+    missing = [test_id for test_id in expected if test_id not in seen]
+    return missing, duplicated, unknown
+
+
+def finalize_clusters(groups: List[Dict[str, Any]], test_cases: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Number the groups and verify that every test case is in exactly one cluster.
+
+    Test cases no cluster claimed are collected in one extra cluster rather than dropped,
+    because pick_relevant_clusters can only select test cases that are in some cluster.
+    """
+    assigned = {str(test_id) for group in groups for test_id in group["test_ids"]}
+    unclustered = []
+    for test_case in test_cases:
+        if str(test_case["id"]) not in assigned:
+            assigned.add(str(test_case["id"]))
+            unclustered.append(test_case["id"])
+    if unclustered:
+        groups = groups + [{
+            "name": UNCLUSTERED_NAME,
+            "description": "Test cases that were not assigned to any other cluster",
+            "keywords": [],
+            "test_ids": unclustered,
+        }]
+
+    clusters = [
+        {
+            "cluster_id": cluster_id,
+            "name": group["name"],
+            "description": group["description"],
+            "test_ids": group["test_ids"],
+            "keywords": group["keywords"],
+        }
+        for cluster_id, group in enumerate(groups, start=1)
+    ]
+
+    missing, duplicated, unknown = coverage_errors(clusters, (test_case["id"] for test_case in test_cases))
+    if missing or duplicated or unknown:
+        raise ValueError(
+            f"Clustering does not cover the suite exactly once: {len(missing)} missing, "
+            f"{len(duplicated)} duplicated, {len(unknown)} unknown test ids"
+        )
+    return {"clusters": clusters}
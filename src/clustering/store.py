@@ -0,0 +1,215 @@
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.cache.evaluation_cache import stable_hash
+from src.clustering.engine import ClusterModel
+from src.core import config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def content_hash(test_case: Dict[str, Any]) -> str:
+    return stable_hash(test_case)
+
+
+def default_suite_id(test_cases: List[Dict[str, Any]]) -> str:
+    """Suite id of a run that names no suite: suites with the same test ids share one snapshot."""
+    return "ids-" + stable_hash(sorted(str(test_case["id"]) for test_case in test_cases))[:16]
+
+
+def _array_to_blob(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _blob_to_array(blob: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+class ClusterSnapshot:
+    """Everything persisted for one suite: the fitted model, cluster metadata and per-test assignments."""
+
+    def __init__(
+        self,
+        model: ClusterModel,
+        clusters: List[Dict[str, Any]],
+        assignments: Dict[str, Tuple[str, int]],
+        baseline_size: int,
+        changes_since_fit: int,
+    ):
+        self.model = model
+        # cluster_id, name, description and keywords per cluster; cluster_id N belongs to centroid N - 1
+        self.clusters = clusters
+        # test id -> (content hash, cluster_id)
+        self.assignments = assignments
+        self.baseline_size = baseline_size
+        self.changes_since_fit = changes_since_fit
+
+
+class ClusterStore:
+    """SQLite persistence of cluster assignments per suite, so unchanged test cases never need re-clustering."""
+
+    def __init__(self, path: str, max_age_seconds: int = 0, max_suites: int = 0):
+        self.path = path
+        # Suites without a suite_id get one from their test ids, so every added or deleted test
+        # case leaves a snapshot behind; 0 disables either limit
+        self.max_age_seconds = max_age_seconds
+        self.max_suites = max_suites
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS suites (
+                    suite_id          TEXT PRIMARY KEY,
+                    vocabulary        TEXT NOT NULL,
+                    idf               BLOB NOT NULL,
+                    centroids         BLOB NOT NULL,
+                    clusters          TEXT NOT NULL,
+                    baseline_size     INTEGER NOT NULL,
+                    changes_since_fit INTEGER NOT NULL,
+                    updated_at        REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS assignments (
+                    suite_id     TEXT NOT NULL,
+                    test_id      TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    cluster_id   INTEGER NOT NULL,
+                    PRIMARY KEY (suite_id, test_id)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # The connection's own context manager only commits, closing() releases it
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def load(self, suite_id: str) -> Optional[ClusterSnapshot]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT vocabulary, idf, centroids, clusters, baseline_size, changes_since_fit FROM suites WHERE suite_id = ?",
+                (suite_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            # Snapshots are dropped least recently used first
+            conn.execute("UPDATE suites SET updated_at = ? WHERE suite_id = ?", (time.time(), suite_id))
+            assignments = {
+                test_id: (test_hash, cluster_id)
+                for test_id, test_hash, cluster_id in conn.execute(
+                    "SELECT test_id, content_hash, cluster_id FROM assignments WHERE suite_id = ?", (suite_id,)
+                )
+            }
+
+        vocabulary, idf, centroids, clusters, baseline_size, changes_since_fit = row
+        model = ClusterModel(json.loads(vocabulary), _blob_to_array(idf), _blob_to_array(centroids))
+        return ClusterSnapshot(model, json.loads(clusters), assignments, baseline_size, changes_since_fit)
+
+    def save(self, suite_id: str, snapshot: ClusterSnapshot):
+        """Replace everything stored for a suite (after a full clustering run)."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO suites VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    suite_id,
+                    json.dumps(snapshot.model.vocabulary),
+                    _array_to_blob(snapshot.model.idf),
+                    _array_to_blob(snapshot.model.centroids),
+                    json.dumps(snapshot.clusters, ensure_ascii=False),
+                    snapshot.baseline_size,
+                    snapshot.changes_since_fit,
+                    time.time(),
+                ),
+            )
+            conn.execute("DELETE FROM assignments WHERE suite_id = ?", (suite_id,))
+            conn.executemany(
+                "INSERT INTO assignments VALUES (?, ?, ?, ?)",
+                [(suite_id, test_id, test_hash, cluster_id) for test_id, (test_hash, cluster_id) in snapshot.assignments.items()],
+            )
+            self._prune(conn)
+
+    def update_assignments(
+        self,
+        suite_id: str,
+        upserts: Dict[str, Tuple[str, int]],
+        deleted_ids: List[str],
+        changes_since_fit: int,
+    ):
+        """Apply an incremental run: store added/modified assignments and drop deleted test cases."""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO assignments VALUES (?, ?, ?, ?)",
+                [(suite_id, test_id, test_hash, cluster_id) for test_id, (test_hash, cluster_id) in upserts.items()],
+            )
+            conn.executemany(
+                "DELETE FROM assignments WHERE suite_id = ? AND test_id = ?",
+                [(suite_id, test_id) for test_id in deleted_ids],
+            )
+            conn.execute(
+                "UPDATE suites SET changes_since_fit = ?, updated_at = ? WHERE suite_id = ?",
+                (changes_since_fit, time.time(), suite_id),
+            )
+
+    def prune(self) -> int:
+        """Drop the suites not used for max_age_seconds and all but the max_suites most recently used ones."""
+        with self._lock, self._connect() as conn:
+            return self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        suite_ids = set()
+        if self.max_age_seconds:
+            cutoff = time.time() - self.max_age_seconds
+            suite_ids.update(suite_id for (suite_id,) in conn.execute("SELECT suite_id FROM suites WHERE updated_at < ?", (cutoff,)))
+        if self.max_suites > 0:
+            suite_ids.update(
+                suite_id for (suite_id,) in conn.execute(
+                    "SELECT suite_id FROM suites ORDER BY updated_at DESC LIMIT -1 OFFSET ?", (self.max_suites,)
+                )
+            )
+        if not suite_ids:
+            return 0
+        for table in ("assignments", "suites"):
+            conn.executemany(f"DELETE FROM {table} WHERE suite_id = ?", [(suite_id,) for suite_id in suite_ids])
+        logger.info(f"Dropped {len(suite_ids)} stored cluster snapshots")
+        return len(suite_ids)
+
+
+_cluster_store: Optional[ClusterStore] = None
+_cluster_store_lock = threading.Lock()
+
+
+def get_cluster_store() -> Optional[ClusterStore]:
+    """Return the shared cluster store, or None when incremental clustering is disabled."""
+    global _cluster_store
+
+    if not config.CLUSTERING_INCREMENTAL:
+        return None
+
+    with _cluster_store_lock:
+        if _cluster_store is None:
+            _cluster_store = ClusterStore(
+                os.path.join(config.CACHE_DIR, "clusters.sqlite"),
+                max_age_seconds=config.CLUSTERING_SNAPSHOT_MAX_AGE_SECONDS,
+                max_suites=config.CLUSTERING_MAX_SNAPSHOTS,
+            )
+        return _cluster_store
@@ -0,0 +1,284 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.constants import START
+
+from src.cache.evaluation_cache import stable_hash
+from src.core import config
+from src.core.graph import agent_graph, get_compiled_graph
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class UnknownRunError(KeyError):
+    """Raised when resuming a thread id that has no checkpoint."""
+
+
+class ThreadInUseError(ValueError):
+    """Raised when a new run is started under a thread id that already has a checkpoint."""
+
+
+# State key holding the test suite, and the marker a checkpoint keeps in its place
+SUITE_KEY = "test_cases"
+SUITE_REF = "__suite_hash__"
+
+
+class SuiteStoringSaver(SqliteSaver):
+    """
+    SQLite checkpointer that stores each test suite once instead of in every checkpoint.
+
+    LangGraph saves every state key at every step, but the suite never changes during a run,
+    so checkpoints keep its content hash instead and the suite itself goes into the suites
+    table the first time it is seen. Loading a checkpoint puts the suite back. Threads not
+    updated for max_age_seconds are dropped together with the suites no thread refers to.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_age_seconds: int, max_cached_suites: int = 4):
+        super().__init__(conn)
+        self.max_age_seconds = max_age_seconds
+        self.max_cached_suites = max_cached_suites
+        # Hash of a suite list by its id; a run hands the very same list to every step
+        self._suite_hashes: "OrderedDict[int, tuple]" = OrderedDict()
+        self._suites_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS suites (
+                suite_hash TEXT PRIMARY KEY,
+                type TEXT,
+                test_cases BLOB
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                suite_hash TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_threads_updated_at ON threads(updated_at);
+            """
+        )
+
+    def _remember(self, suite: List[Dict[str, Any]], suite_hash: str):
+        with self._suites_lock:
+            # The list itself is kept in the entry, so its id cannot be reused while it is cached
+            self._suite_hashes[id(suite)] = (suite, suite_hash)
+            self._suite_hashes.move_to_end(id(suite))
+            while len(self._suite_hashes) > self.max_cached_suites:
+                self._suite_hashes.popitem(last=False)
+
+    def _suite_hash(self, suite: List[Dict[str, Any]]) -> str:
+        with self._suites_lock:
+            known = self._suite_hashes.get(id(suite))
+        if known is not None and known[0] is suite:
+            return known[1]
+        suite_hash = stable_hash(suite)
+        self._remember(suite, suite_hash)
+        return suite_hash
+
+    def _load_suite(self, suite_hash: str) -> List[Dict[str, Any]]:
+        with self._suites_lock:
+            for suite, known_hash in self._suite_hashes.values():
+                if known_hash == suite_hash:
+                    return suite
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT type, test_cases FROM suites WHERE suite_hash = ?", (suite_hash,))
+            row = cur.fetchone()
+        if row is None:
+            raise UnknownRunError(f"Test suite {suite_hash} of this checkpoint is no longer stored")
+        suite = self.serde.loads_typed(row)
+        self._remember(suite, suite_hash)
+        return suite
+
+    def _swap_suite(self, values: Dict[str, Any], swap) -> Dict[str, Any]:
+        """Copy of a state dict with swap applied to its suite, also inside the run input it may hold."""
+        swapped = dict(values)
+        if SUITE_KEY in swapped:
+            swapped[SUITE_KEY] = swap(swapped[SUITE_KEY])
+        if isinstance(swapped.get(START), dict) and SUITE_KEY in swapped[START]:
+            swapped[START] = {**swapped[START], SUITE_KEY: swap(swapped[START][SUITE_KEY])}
+        return swapped
+
+    def _store_suites(self, thread_id: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the suite of a state dict (if new) and return the dict with its hash in its place."""
+        suite_hashes = []
+
+        def to_ref(suite):
+            if not isinstance(suite, list):
+                return suite
+            suite_hash = self._suite_hash(suite)
+            suite_hashes.append((suite_hash, suite))
+            return {SUITE_REF: suite_hash}
+
+        values = self._swap_suite(values, to_ref)
+        with self.cursor() as cur:
+            # Suite and thread are recorded together, so pruning never sees the suite unreferenced
+            suite_hash = None
+            for suite_hash, suite in suite_hashes:
+                cur.execute("SELECT 1 FROM suites WHERE suite_hash = ?", (suite_hash,))
+                if cur.fetchone() is None:
+                    cur.execute(
+                        "INSERT INTO suites (suite_hash, type, test_cases) VALUES (?, ?, ?)",
+                        (suite_hash, *self.serde.dumps_typed(suite)),
+                    )
+            cur.execute(
+                "INSERT INTO threads (thread_id, suite_hash, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                "suite_hash = COALESCE(excluded.suite_hash, threads.suite_hash)",
+                (thread_id, suite_hash, time.time()),
+            )
+        return values
+
+    def _load_suites(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        def from_ref(suite):
+            if isinstance(suite, dict) and SUITE_REF in suite:
+                return self._load_suite(suite[SUITE_REF])
+            return suite
+
+        return self._swap_suite(values, from_ref)
+
+    def _with_suite(self, checkpoint_tuple):
+        checkpoint = checkpoint_tuple.checkpoint
+        checkpoint["channel_values"] = self._load_suites(checkpoint.get("channel_values", {}))
+        pending_writes = [
+            (task_id, channel, self._load_suites({channel: value})[channel])
+            for task_id, channel, value in checkpoint_tuple.pending_writes or []
+        ]
+        return checkpoint_tuple._replace(pending_writes=pending_writes)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        if metadata.get("source") == "input":
+            # Once per run is often enough to drop old threads
+            self.prune()
+        thread_id = str(config["configurable"]["thread_id"])
+        channel_values = self._store_suites(thread_id, checkpoint.get("channel_values", {}))
+        return super().put(config, {**checkpoint, "channel_values": channel_values}, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        # The run input and its suite are also written once as the writes of the first step
+        thread_id = str(config["configurable"]["thread_id"])
+        writes = [
+            (channel, self._store_suites(thread_id, {channel: value})[channel] if channel in (SUITE_KEY, START) else value)
+            for channel, value in writes
+        ]
+        super().put_writes(config, writes, task_id, task_path)
+
+    def get_tuple(self, config):
+        checkpoint_tuple = super().get_tuple(config)
+        return self._with_suite(checkpoint_tuple) if checkpoint_tuple is not None else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        # The parent holds the connection lock while it yields, so read everything first
+        checkpoint_tuples = list(super().list(config, filter=filter, before=before, limit=limit))
+        for checkpoint_tuple in checkpoint_tuples:
+            yield self._with_suite(checkpoint_tuple)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM threads WHERE thread_id = ?", (str(thread_id),))
+            self._delete_unused_suites(cur)
+
+    def prune(self) -> int:
+        """Drop the threads not updated for max_age_seconds; returns how many were dropped."""
+        with self.cursor() as cur:
+            cur.execute("SELECT thread_id FROM threads WHERE updated_at < ?", (time.time() - self.max_age_seconds,))
+            thread_ids = [(thread_id,) for (thread_id,) in cur.fetchall()]
+            if not thread_ids:
+                return 0
+            for table in ("checkpoints", "writes", "threads"):
+                cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", thread_ids)
+            self._delete_unused_suites(cur)
+        logger.info(f"Dropped {len(thread_ids)} checkpointed runs older than {self.max_age_seconds}s")
+        return len(thread_ids)
+
+    @staticmethod
+    def _delete_unused_suites(cur: sqlite3.Cursor):
+        cur.execute(
+            "DELETE FROM suites WHERE suite_hash NOT IN (SELECT suite_hash FROM threads WHERE suite_hash IS NOT NULL)"
+        )
+
+
+_checkpointed_graph = None
+_checkpointed_graph_lock = threading.Lock()
+
+
+def get_checkpointed_graph():
+    """
+    The agent graph compiled with the SQLite checkpointer, so every finished step is persisted
+    under the run's thread id. Falls back to the plain graph unless checkpointing is enabled.
+    """
+    global _checkpointed_graph
+    if not config.CHECKPOINT_ENABLED:
+        return get_compiled_graph()
+    with _checkpointed_graph_lock:
+        if _checkpointed_graph is None:
+            directory = os.path.dirname(config.CHECKPOINT_DB_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # The saver serializes access to the connection itself, so it can be shared by threads
+            connection = sqlite3.connect(config.CHECKPOINT_DB_PATH, check_same_thread=False)
+            saver = SuiteStoringSaver(connection, max_age_seconds=config.CHECKPOINT_MAX_AGE_SECONDS)
+            _checkpointed_graph = agent_graph.compile(checkpointer=saver)
+            logger.info(f"Checkpointing agent runs to {config.CHECKPOINT_DB_PATH}")
+        return _checkpointed_graph
+
+
+def new_thread_id() -> str:
+    return uuid.uuid4().hex
+
+
+def run_config(thread_id: str, callbacks: Optional[List[Any]] = None, **extra) -> Dict[str, Any]:
+    """Graph config of a run; the thread id is what a failed run is resumed by."""
+    run_config = {"configurable": {"thread_id": thread_id}, **extra}
+    if callbacks:
+        run_config["callbacks"] = callbacks
+    return run_config
+
+
+def run_status(graph, thread_id: str) -> Optional[str]:
+    """"finished", "interrupted" (failed or killed before the end) or None for an unknown thread."""
+    if graph.checkpointer is None:
+        # Without a checkpointer no run is ever persisted
+        return None
+    snapshot = graph.get_state(run_config(thread_id))
+    if not snapshot.values:
+        return None
+    return "interrupted" if snapshot.next else "finished"
+
+
+def ensure_new_thread(graph, thread_id: str):
+    """
+    A new run must not start from another run's checkpoint: its state (working set, clusters,
+    evaluations) would be merged into the new input. A used thread id can only be resumed.
+    """
+    if run_status(graph, thread_id) is not None:
+        raise ThreadInUseError(f"Thread id '{thread_id}' already has a checkpoint; resume that run or use a new thread id")
+
+
+def resume_run(graph, thread_id: str, callbacks: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Continue a run from its last checkpoint: completed nodes (and, in sequential mode, completed
+    evaluation batches) are not executed again. A finished run just returns its final state.
+    """
+    status = run_status(graph, thread_id)
+    if status is None:
+        raise UnknownRunError(f"No checkpoint for thread id '{thread_id}'")
+    if status == "finished":
+        logger.info(f"Run {thread_id} already finished, returning its final state")
+        return graph.get_state(run_config(thread_id)).values
+
+    next_nodes = graph.get_state(run_config(thread_id)).next
+    logger.info(f"Resuming run {thread_id} at {', '.join(next_nodes)}")
+    return graph.invoke(None, config=run_config(thread_id, callbacks))
@@ -0,0 +1,153 @@
+import os
+from dotenv import load_dotenv
+
+# Get the project root directory (two levels up from this file)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+dotenv_path = os.path.join(project_root, '.env')
+load_dotenv(dotenv_path)
+
+
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# LLM client settings
+# "openai", or "fake" for the deterministic offline model used by the benchmarks
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+# Simulated latency of the fake model: a fixed delay per call plus a delay per response token
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN = float(os.getenv("FAKE_LLM_SECONDS_PER_OUTPUT_TOKEN", "0"))
+# The fake fast tier model is this many times faster than the strong one, and its scores are noisier
+FAKE_LLM_FAST_SPEEDUP = float(os.getenv("FAKE_LLM_FAST_SPEEDUP", "4"))
+# Model tiers: every LLM node uses the "strong" or the "fast" model
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "gpt-4o")
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")
+CLUSTERING_MODEL_TIER = os.getenv("CLUSTERING_MODEL_TIER", "strong")
+CLUSTER_PICK_MODEL_TIER = os.getenv("CLUSTER_PICK_MODEL_TIER", "strong")
+RUBRIC_MODEL_TIER = os.getenv("RUBRIC_MODEL_TIER", "strong")
+# "strong", "fast", or "cascade": the fast model scores every test case and the strong model
+# re-scores the ones the ranking is unsure about (see the CASCADE_* settings)
+EVALUATION_MODEL_TIER = os.getenv("EVALUATION_MODEL_TIER", "strong")
+# Alternative OpenAI compatible endpoint, e.g. a proxy or a local stub server (default: OpenAI)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+# Client side rate limits, 0 disables a limit; set them a bit below the limits of your API tier
+LLM_REQUESTS_PER_MINUTE = _get_int("LLM_REQUESTS_PER_MINUTE", 500)
+LLM_TOKENS_PER_MINUTE = _get_int("LLM_TOKENS_PER_MINUTE", 0)
+LLM_MAX_RETRIES = _get_int("LLM_MAX_RETRIES", 5)
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# Size of the HTTP connection pool shared by all LLM calls of the process
+LLM_MAX_CONNECTIONS = _get_int("LLM_MAX_CONNECTIONS", 20)
+# Ask the model for JSON matching each node's schema (OpenAI structured outputs); disable it
+# for OpenAI compatible endpoints that do not support json_schema response formats
+STRUCTURED_OUTPUT = _get_bool("STRUCTURED_OUTPUT", True)
+
+# Evaluation settings
+# "parallel" scores all batches concurrently in one node run,
+# "sequential" scores one batch per node run (the original self-loop)
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "parallel")
+# Batches are packed up to these token budgets; the batch size is only an upper bound
+EVALUATION_BATCH_SIZE = _get_int("EVALUATION_BATCH_SIZE", 20)
+EVALUATION_INPUT_TOKEN_BUDGET = _get_int("EVALUATION_INPUT_TOKEN_BUDGET", 8000)
+EVALUATION_OUTPUT_TOKEN_BUDGET = _get_int("EVALUATION_OUTPUT_TOKEN_BUDGET", 4000)
+EVALUATION_MAX_CONCURRENCY = _get_int("EVALUATION_MAX_CONCURRENCY", 4)
+# Extra LLM calls a batch may spend re-scoring the test cases its response missed or garbled;
+# test cases without a valid result after that are recorded with an error instead
+EVALUATION_RETRY_BUDGET = _get_int("EVALUATION_RETRY_BUDGET", 8)
+
+# Prompt settings
+# "json" renders prompt data as compact JSON, "table" as a terse | separated table
+PROMPT_FORMAT = os.getenv("PROMPT_FORMAT", "json")
+# Log and total the tokens each prompt saves compared to the plain Python repr.
+# Off by default: it tokenizes every prompt payload twice.
+PROMPT_TOKEN_REPORT = _get_bool("PROMPT_TOKEN_REPORT", False)
+
+# Caching settings
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(project_root, ".cache"))
+EVALUATION_CACHE_ENABLED = _get_bool("EVALUATION_CACHE_ENABLED", True)
+EVALUATION_CACHE_MAX_ENTRIES = _get_int("EVALUATION_CACHE_MAX_ENTRIES", 50000)
+EVALUATION_CACHE_MAX_AGE_SECONDS = _get_int("EVALUATION_CACHE_MAX_AGE_SECONDS", 7 * 24 * 60 * 60)
+RUBRIC_CACHE_ENABLED = _get_bool("RUBRIC_CACHE_ENABLED", True)
+# Minimum TF-IDF cosine similarity between normalized queries to reuse a stored rubric
+RUBRIC_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("RUBRIC_CACHE_SIMILARITY_THRESHOLD", "0.65"))
+RUBRIC_CACHE_MAX_ENTRIES = _get_int("RUBRIC_CACHE_MAX_ENTRIES", 1000)
+RUBRIC_CACHE_MAX_AGE_SECONDS = _get_int("RUBRIC_CACHE_MAX_AGE_SECONDS", 30 * 24 * 60 * 60)
+
+# Clustering settings
+# "local" clusters with TF-IDF + k-means and only asks the LLM to name the clusters,
+# "llm" sends the whole suite to the LLM in one prompt
+CLUSTERING_BACKEND = os.getenv("CLUSTERING_BACKEND", "local")
+# 0 picks the number of clusters from the suite size
+CLUSTERING_NUM_CLUSTERS = _get_int("CLUSTERING_NUM_CLUSTERS", 0)
+CLUSTERING_MAX_FEATURES = _get_int("CLUSTERING_MAX_FEATURES", 2048)
+# "llm" backend: suites larger than one chunk are clustered chunk by chunk, then merged
+CLUSTERING_CHUNK_TOKENS = _get_int("CLUSTERING_CHUNK_TOKENS", 12000)
+CLUSTERING_MAX_CONCURRENCY = _get_int("CLUSTERING_MAX_CONCURRENCY", 4)
+# Keep cluster assignments per suite and only assign added/modified test cases on later runs
+CLUSTERING_INCREMENTAL = _get_bool("CLUSTERING_INCREMENTAL", True)
+# Share of the suite that may change since the last full clustering before re-clustering from scratch
+CLUSTERING_DRIFT_THRESHOLD = float(os.getenv("CLUSTERING_DRIFT_THRESHOLD", "0.2"))
+# Stored suites not used for this long are dropped, and only the most recently used ones are kept
+CLUSTERING_SNAPSHOT_MAX_AGE_SECONDS = _get_int("CLUSTERING_SNAPSHOT_MAX_AGE_SECONDS", 30 * 24 * 60 * 60)
+CLUSTERING_MAX_SNAPSHOTS = _get_int("CLUSTERING_MAX_SNAPSHOTS", 200)
+
+# Diff-aware prefilter: when a run names its changed files (or a diff), only the test cases
+# they affect are kept and clustering is skipped
+# Match changed functions and classes against the text of the test cases
+IMPACT_MATCH_SYMBOLS = _get_bool("IMPACT_MATCH_SYMBOLS", True)
+# Shorter symbol names are too generic to match
+IMPACT_MIN_SYMBOL_LENGTH = _get_int("IMPACT_MIN_SYMBOL_LENGTH", 3)
+# Optional precomputed impact map (JSON: source file or symbol -> test files, test ids or pytest node ids)
+IMPACT_MAP_PATH = os.getenv("IMPACT_MAP_PATH", "")
+
+# Lexical (BM25) shortlist before evaluation, disabled when both are 0
+# Keep at most this many best matching test cases
+SHORTLIST_SIZE = _get_int("SHORTLIST_SIZE", 0)
+# Drop test cases whose BM25 score against the query and rubric is below this
+SHORTLIST_MIN_SCORE = float(os.getenv("SHORTLIST_MIN_SCORE", "0"))
+
+# Cascade scoring: test cases scored by the fast model are re-scored by the strong model when
+# their normalized score is within CASCADE_MARGIN of the K-th best (K is TOP_K, or CASCADE_TOP_K
+# when top-K mode is off), when the fast model's confidence is below CASCADE_MIN_CONFIDENCE,
+# or when the fast model could not score them
+CASCADE_TOP_K = _get_int("CASCADE_TOP_K", 20)
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "0.1"))
+CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.6"))
+
+# Top-K mode, disabled when 0: the working set is pre-ranked with BM25 and scored best first,
+# evaluation stops once the K best test cases are settled and only those K are returned
+TOP_K = _get_int("TOP_K", 0)
+# Stop once this many scored candidates in a row did not make it into the top K
+TOP_K_PATIENCE = _get_int("TOP_K_PATIENCE", 20)
+
+# Checkpoint settings
+# Persist the state after every graph step, so failed or killed runs can be resumed by thread id.
+# Off by default: every step of every run is written to disk.
+CHECKPOINT_ENABLED = _get_bool("CHECKPOINT_ENABLED", False)
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(CACHE_DIR, "checkpoints.sqlite"))
+# Checkpointed runs not updated for this long are dropped
+CHECKPOINT_MAX_AGE_SECONDS = _get_int("CHECKPOINT_MAX_AGE_SECONDS", 7 * 24 * 60 * 60)
+
+# Batch settings (main.py --queries, POST /batch)
+# Maximum number of rubric calls or query runs of a batch in flight at once
+BATCH_MAX_CONCURRENCY = _get_int("BATCH_MAX_CONCURRENCY", 4)
+
+# Background job settings (POST /jobs)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite"))
+# Worker threads per web worker process
+JOBS_MAX_WORKERS = _get_int("JOBS_MAX_WORKERS", 2)
+# Maximum number of queued plus running jobs across all processes
+JOBS_MAX_QUEUED = _get_int("JOBS_MAX_QUEUED", 20)
+# Running jobs without progress for this long are marked as failed
+JOBS_STALE_AFTER_SECONDS = _get_int("JOBS_STALE_AFTER_SECONDS", 15 * 60)
+# Finished jobs (with their input and result) are deleted this long after they finished
+JOBS_RETENTION_SECONDS = _get_int("JOBS_RETENTION_SECONDS", 24 * 60 * 60)
@@ -1,5 +1,8 @@
 import logging
+import threading
 from src.core.state import TestAgentState
+from src.core.test_case_store import get_test_case_store
+from src.core.metrics import instrument_node
 from langgraph.graph import StateGraph, START, END
 from src.nodes import *
 
@@ -9,11 +12,14 @@ logger = logging.getLogger(__name__)
 
 agent_graph = StateGraph(TestAgentState)
 
-agent_graph.add_node("create_clusters", create_clusters)
-agent_graph.add_node("create_rubric", create_rubric)
-agent_graph.add_node("evaluate_test_cases", evaluate_test_cases)
-agent_graph.add_node("pick_relevant_clusters", pick_relevant_clusters)
-agent_graph.add_node("sort_test_cases", sort_test_cases)
+# Every node is timed and its LLM calls are attributed to it (see src/core/metrics.py)
+agent_graph.add_node("create_clusters", instrument_node("create_clusters", create_clusters))
+agent_graph.add_node("create_rubric", instrument_node("create_rubric", create_rubric))
+agent_graph.add_node("evaluate_test_cases", instrument_node("evaluate_test_cases", evaluate_test_cases))
+agent_graph.add_node("pick_relevant_clusters", instrument_node("pick_relevant_clusters", pick_relevant_clusters))
+agent_graph.add_node("prefilter_changed_tests", instrument_node("prefilter_changed_tests", prefilter_changed_tests))
+agent_graph.add_node("shortlist_test_cases", instrument_node("shortlist_test_cases", shortlist_test_cases))
+agent_graph.add_node("sort_test_cases", instrument_node("sort_test_cases", sort_test_cases))
 
 
 def is_clustering_needed(state: TestAgentState):
@@ -29,17 +35,26 @@ def is_clustering_needed(state: TestAgentState):
         logger.info(f"Clustering not needed (<={clustering_treshold} test cases)")
         return "clustering_is_not_needed"
 
+def route_after_prefilter(state: TestAgentState):
+    # The prefilter only sets a working set when the changed files or symbols affect test cases
+    if state.get("relevant_test_ids") is not None and (state.get("changed_files") or state.get("changed_symbols")):
+        logger.info(f"Working set of {len(state['relevant_test_ids'])} test cases taken from the changes, no clustering needed")
+        return "changes_mapped"
+    return is_clustering_needed(state)
+
 def are_all_tc_evaluated(state: TestAgentState):
     num_evaluated_tc = len(state["evaluated_test_cases"])
+    store = get_test_case_store(state["test_cases"])
     
     # Determine the total number of test cases to evaluate
-    if state.get("relevant_test_cases") is not None:
-        # When clustering is applied, use relevant test cases count
-        num_tc = len(state["relevant_test_cases"])
+    if state.get("relevant_test_ids") is not None:
+        # When clustering is applied, use relevant test cases count.
+        # Ids the suite does not contain are never evaluated, so they must not be waited for.
+        num_tc = sum(1 for test_id in state["relevant_test_ids"] if test_id in store)
         logger.info(f"Checking evaluation progress: {num_evaluated_tc}/{num_tc} relevant test cases evaluated")
     else:
-        # When no clustering, use all test cases
-        num_tc = len(state["test_cases"])
+        # When no clustering, use all test cases (as indexed, i.e. without duplicate ids)
+        num_tc = len(store)
         logger.info(f"Checking evaluation progress: {num_evaluated_tc}/{num_tc} test cases evaluated")
 
     if num_evaluated_tc < num_tc:
@@ -51,18 +66,22 @@ def are_all_tc_evaluated(state: TestAgentState):
 
 
 
+agent_graph.add_edge(START, "prefilter_changed_tests")
+
 agent_graph.add_conditional_edges(
-    START,
-    is_clustering_needed,
+    "prefilter_changed_tests",
+    route_after_prefilter,
     {
+        "changes_mapped": "create_rubric",
         "clustering_is_needed": "create_clusters",
         "clustering_is_not_needed": "create_rubric"
-    }                         
+    }
 )
 
 agent_graph.add_edge("create_clusters", "pick_relevant_clusters")
 agent_graph.add_edge("pick_relevant_clusters", "create_rubric")
-agent_graph.add_edge("create_rubric", "evaluate_test_cases")
+agent_graph.add_edge("create_rubric", "shortlist_test_cases")
+agent_graph.add_edge("shortlist_test_cases", "evaluate_test_cases")
 
 agent_graph.add_conditional_edges(
     "evaluate_test_cases",
@@ -75,4 +94,14 @@ agent_graph.add_conditional_edges(
 
 agent_graph.add_edge("sort_test_cases", END)
 
-compiled_graph = agent_graph.compile()
\ No newline at end of file
+_compiled_graph = None
+_compiled_graph_lock = threading.Lock()
+
+
+def get_compiled_graph():
+    """The agent graph without a checkpointer, compiled on first use rather than at import."""
+    global _compiled_graph
+    with _compiled_graph_lock:
+        if _compiled_graph is None:
+            _compiled_graph = agent_graph.compile()
+        return _compiled_graph
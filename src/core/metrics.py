@@ -0,0 +1,221 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+NODE_DURATION = Histogram(
+    "test_agent_node_duration_seconds", "Wall time of one graph node run", ["node"], buckets=DURATION_BUCKETS
+)
+LLM_CALL_DURATION = Histogram(
+    "test_agent_llm_call_duration_seconds", "Duration of one LLM request attempt", ["node", "outcome"], buckets=DURATION_BUCKETS
+)
+LLM_TOKENS = Counter("test_agent_llm_tokens_total", "Tokens reported by the LLM provider", ["node", "kind"])
+LLM_RETRIES = Counter("test_agent_llm_retries_total", "LLM requests retried after a retryable error", ["node"])
+LLM_PARSE_FAILURES = Counter("test_agent_llm_parse_failures_total", "LLM responses that were not valid JSON", ["node"])
+EVALUATION_BATCH_SIZE = Histogram(
+    "test_agent_evaluation_batch_size", "Test cases sent in one evaluation call", buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+LLM_CALLS_AVOIDED = Counter("test_agent_llm_calls_avoided_total", "Evaluation calls skipped because the top K was settled")
+EVALUATION_ERRORS = Counter("test_agent_evaluation_errors_total", "Test cases left without a valid evaluation after retries")
+CACHE_LOOKUPS = Counter("test_agent_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+
+# Graph node being executed, so LLM calls and parse failures are attributed to it
+_current_node: ContextVar[str] = ContextVar("current_node", default="none")
+# Collector of the run being executed, if the caller asked for a per-run summary
+_run_metrics: ContextVar[Optional["RunMetrics"]] = ContextVar("run_metrics", default=None)
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))]
+
+
+def _durations(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "total_seconds": round(sum(values), 3),
+        "p50_seconds": round(_percentile(values, 50), 3),
+        "p95_seconds": round(_percentile(values, 95), 3),
+        "max_seconds": round(max(values, default=0.0), 3),
+    }
+
+
+class RunMetrics:
+    """The same measurements as the Prometheus metrics, collected for a single run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.node_seconds: Dict[str, List[float]] = {}
+        self.llm_seconds: Dict[str, List[float]] = {}
+        self.llm_errors: Dict[str, int] = {}
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.retries: Dict[str, int] = {}
+        self.parse_failures: Dict[str, int] = {}
+        self.batch_sizes: List[int] = []
+        self.evaluation_errors = 0
+        self.llm_calls_avoided = 0
+        self.cache_lookups: Dict[str, Dict[str, int]] = {}
+
+    def _add(self, counts: Dict[str, int], key: str, amount: int = 1):
+        counts[key] = counts.get(key, 0) + amount
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {}
+            for node in sorted(set(self.node_seconds) | set(self.llm_seconds)):
+                tokens = self.tokens.get(node, {})
+                nodes[node] = {
+                    "runs": _durations(self.node_seconds.get(node, [])),
+                    "llm_calls": _durations(self.llm_seconds.get(node, [])),
+                    "llm_errors": self.llm_errors.get(node, 0),
+                    "retries": self.retries.get(node, 0),
+                    "parse_failures": self.parse_failures.get(node, 0),
+                    "prompt_tokens": tokens.get("prompt", 0),
+                    "completion_tokens": tokens.get("completion", 0),
+                }
+            caches = {
+                cache: {**counts, "hit_rate": round(counts.get("hit", 0) / max(1, sum(counts.values())), 3)}
+                for cache, counts in self.cache_lookups.items()
+            }
+            return {
+                "nodes": nodes,
+                "evaluation_batches": {
+                    "count": len(self.batch_sizes),
+                    "mean_size": round(sum(self.batch_sizes) / len(self.batch_sizes), 1) if self.batch_sizes else 0,
+                    "max_size": max(self.batch_sizes, default=0),
+                    "failed_test_cases": self.evaluation_errors,
+                    "calls_avoided": self.llm_calls_avoided,
+                },
+                "caches": caches,
+            }
+
+
+@contextmanager
+def collect_run_metrics() -> Iterator[RunMetrics]:
+    """Also collect the measurements of everything run inside the block (and its threads) for a summary."""
+    run_metrics = RunMetrics()
+    token = _run_metrics.set(run_metrics)
+    try:
+        yield run_metrics
+    finally:
+        _run_metrics.reset(token)
+
+
+def _record(update: Callable[[RunMetrics], None]):
+    run_metrics = _run_metrics.get()
+    if run_metrics is not None:
+        with run_metrics._lock:
+            update(run_metrics)
+
+
+def current_node() -> str:
+    return _current_node.get()
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Wrap a graph node to time it and attribute the LLM calls made inside it to `name`."""
+
+    @functools.wraps(node)
+    def instrumented(state):
+        token = _current_node.set(name)
+        started = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_node.reset(token)
+            NODE_DURATION.labels(node=name).observe(elapsed)
+            _record(lambda run: run.node_seconds.setdefault(name, []).append(elapsed))
+
+    return instrumented
+
+
+def observe_llm_call(seconds: float, response: Any = None, error: Optional[Exception] = None):
+    """Record one LLM request attempt with the token usage its response reports."""
+    node = current_node()
+    LLM_CALL_DURATION.labels(node=node, outcome="error" if error is not None else "success").observe(seconds)
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    if prompt_tokens:
+        LLM_TOKENS.labels(node=node, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(node=node, kind="completion").inc(completion_tokens)
+
+    def update(run):
+        run.llm_seconds.setdefault(node, []).append(seconds)
+        if error is not None:
+            run._add(run.llm_errors, node)
+        tokens = run.tokens.setdefault(node, {})
+        run._add(tokens, "prompt", prompt_tokens)
+        run._add(tokens, "completion", completion_tokens)
+
+    _record(update)
+
+
+def count_llm_retry():
+    node = current_node()
+    LLM_RETRIES.labels(node=node).inc()
+    _record(lambda run: run._add(run.retries, node))
+
+
+def count_parse_failure():
+    node = current_node()
+    LLM_PARSE_FAILURES.labels(node=node).inc()
+    _record(lambda run: run._add(run.parse_failures, node))
+
+
+def observe_evaluation_batch(size: int):
+    EVALUATION_BATCH_SIZE.observe(size)
+    _record(lambda run: run.batch_sizes.append(size))
+
+
+def count_evaluation_errors(count: int):
+    EVALUATION_ERRORS.inc(count)
+
+    def update(run):
+        run.evaluation_errors += count
+
+    _record(update)
+
+
+def count_llm_calls_avoided(count: int):
+    LLM_CALLS_AVOIDED.inc(count)
+
+    def update(run):
+        run.llm_calls_avoided += count
+
+    _record(update)
+
+
+def count_cache_lookups(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE_LOOKUPS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache=cache, result="miss").inc(misses)
+
+    def update(run):
+        counts = run.cache_lookups.setdefault(cache, {})
+        run._add(counts, "hit", hits)
+        run._add(counts, "miss", misses)
+
+    _record(update)
+
+
+def metrics_exposition() -> Tuple[bytes, str]:
+    """Prometheus text format of all metrics, merged over the worker processes in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
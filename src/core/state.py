@@ -2,10 +2,13 @@ from typing import TypedDict, List, Dict, Any, Optional
 
 class TestAgentState(TypedDict):
   query:                     str
+  suite_id:                  Optional[str]
+  changed_files:             Optional[List[str]]
+  changed_symbols:           Optional[List[str]]
   test_cases:                List[Dict[str,Any]]
   clusters:                  Optional[List[Dict[str,Any]]]
   relevant_clusters:         Optional[List[int]]
-  relevant_test_cases:       Optional[List[Dict[str,Any]]]
+  relevant_test_ids:         Optional[List[str]]
   rubric:                    List[Dict[str,Any]]
   evaluated_test_cases:      List[Dict[str,Any]]
   sorted_test_cases:         List[Dict[str,Any]]
\ No newline at end of file
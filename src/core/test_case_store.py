@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.cache.evaluation_cache import stable_hash
+
+
+def _freeze(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+class TestCaseRecord:
+    """
+    Compact in-memory form of one test case.
+
+    The fields every test case has live in slots; anything else is kept in `extra`, which
+    stays None for the usual test case, so a record costs a fraction of the source dict.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    __slots__ = ("id", "file_path", "test_name", "summary", "steps", "notes", "extra")
+
+    FIELDS = ("id", "file_path", "test_name", "summary", "steps", "notes")
+
+    def __init__(self, test_case: Dict[str, Any]):
+        self.id = test_case["id"]
+        self.file_path = test_case.get("file_path")
+        self.test_name = test_case.get("test_name")
+        self.summary = test_case.get("summary")
+        # Tuples instead of lists: smaller, and safe to share between concurrent runs
+        self.steps = _freeze(test_case.get("steps"))
+        self.notes = _freeze(test_case.get("notes"))
+        extra = {key: value for key, value in test_case.items() if key not in self.FIELDS}
+        self.extra = extra or None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The test case as the plain dict that prompts and API responses use."""
+        test_case = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                test_case[field] = list(value) if isinstance(value, tuple) else value
+        if self.extra:
+            test_case.update(self.extra)
+        return test_case
+
+
+class TestCaseStore:
+    """
+    Read-only, indexed view of a test suite.
+
+    Records are kept in suite order and looked up through hash indexes by id and by file
+    path. Ids are always compared as strings, so "7" and 7 refer to the same test case no
+    matter how the suite or an LLM response spelled them. Graph nodes keep lists of ids in
+    the state and resolve them here instead of copying test case dicts around.
+    """
+
+    __test__ = False
+
+    def __init__(self, test_cases: Iterable[Dict[str, Any]]):
+        self.records: List[TestCaseRecord] = []
+        self._by_id: Dict[str, int] = {}
+        self._by_file: Dict[str, List[int]] = {}
+
+        for test_case in test_cases:
+            record = TestCaseRecord(test_case)
+            test_id = str(record.id)
+            if test_id in self._by_id:
+                # The loader rejects duplicate ids; for hand-built suites the first definition wins
+                continue
+            position = len(self.records)
+            self.records.append(record)
+            self._by_id[test_id] = position
+            if record.file_path:
+                self._by_file.setdefault(record.file_path, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, test_id: Any) -> bool:
+        return str(test_id) in self._by_id
+
+    def ids(self) -> List[str]:
+        """Every test id, in suite order."""
+        return list(self._by_id)
+
+    def get(self, test_id: Any) -> Optional[TestCaseRecord]:
+        position = self._by_id.get(str(test_id))
+        return self.records[position] if position is not None else None
+
+    def get_many(self, test_ids: Iterable[Any]) -> List[TestCaseRecord]:
+        """Records for the given ids in the given order; unknown ids are skipped."""
+        records = []
+        for test_id in test_ids:
+            position = self._by_id.get(str(test_id))
+            if position is not None:
+                records.append(self.records[position])
+        return records
+
+    def to_dicts(self, test_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self.get_many(test_ids)]
+
+    def file_paths(self) -> List[str]:
+        return list(self._by_file)
+
+    def ids_for_files(self, file_paths: Iterable[str]) -> List[str]:
+        """Ids of the test cases defined in any of the given files, in suite order."""
+        positions = set()
+        for file_path in file_paths:
+            positions.update(self._by_file.get(file_path, ()))
+        return [str(self.records[position].id) for position in sorted(positions)]
+
+    def ids_in_clusters(self, clusters: List[Dict[str, Any]], cluster_ids: Iterable[Any]) -> List[str]:
+        """
+        Ids of the test cases in the given clusters, in suite order and without duplicates.
+
+        Clusters come from the state (their membership can change from run to run), so they
+        are passed in rather than indexed up front; each member is resolved in O(1).
+        """
+        selected = {str(cluster_id) for cluster_id in cluster_ids}
+        positions = set()
+        for cluster in clusters:
+            if str(cluster.get("cluster_id")) not in selected:
+                continue
+            for test_id in cluster.get("test_ids", []):
+                position = self._by_id.get(str(test_id))
+                if position is not None:
+                    positions.add(position)
+        return [str(self.records[position].id) for position in sorted(positions)]
+
+
+_store_cache: "OrderedDict[str, TestCaseStore]" = OrderedDict()
+_recent_suites: Dict[int, tuple] = {}
+_store_cache_lock = threading.Lock()
+
+
+def get_test_case_store(test_cases: List[Dict[str, Any]], max_cached: int = 4) -> TestCaseStore:
+    """
+    Return the store for this suite, building it only the first time the suite is seen.
+
+    Nodes of the same run receive the very same list object, which is recognised without
+    hashing the suite again; other lists are matched by content so separate runs on the same
+    suite share one store.
+
+    A suite list must therefore not be modified once it was passed in: an edit that keeps its
+    length returns the store of the old content. The graph never changes the suite of a run;
+    code that edits a suite passes a new list.
+    """
+    with _store_cache_lock:
+        recent = _recent_suites.get(id(test_cases))
+        # The list itself is kept in the entry, so its id cannot be reused while it is cached.
+        # The length check only catches appends and removals, not edits in place (see above).
+        if recent is not None and recent[0] is test_cases and len(test_cases) == recent[1]:
+            store = _store_cache.get(recent[2])
+            if store is not None:
+                _store_cache.move_to_end(recent[2])
+                return store
+
+    key = stable_hash(test_cases)
+    with _store_cache_lock:
+        store = _store_cache.get(key)
+    if store is None:
+        store = TestCaseStore(test_cases)
+
+    with _store_cache_lock:
+        _store_cache[key] = store
+        _store_cache.move_to_end(key)
+        _recent_suites.pop(id(test_cases), None)
+        _recent_suites[id(test_cases)] = (test_cases, len(test_cases), key)
+        while len(_store_cache) > max_cached:
+            _store_cache.popitem(last=False)
+        while len(_recent_suites) > max_cached:
+            del _recent_suites[next(iter(_recent_suites))]
+    return store
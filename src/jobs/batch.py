@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from src.cache.evaluation_cache import get_evaluation_cache, stable_hash
+from src.core import config
+from src.core.checkpoint import get_checkpointed_graph, run_config
+from src.core.graph import is_clustering_needed
+from src.jobs.runner import summarize_result
+from src.nodes import create_clusters, create_rubric
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE_NAME = "summary.json"
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Totals the LLM calls and token usage reported by the chat model responses of a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": self.input_tokens + self.output_tokens,
+            }
+
+
+def _add_usage(*usages: Dict[str, int]) -> Dict[str, int]:
+    total = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for usage in usages:
+        for key in total:
+            total[key] += usage.get(key, 0)
+    return total
+
+
+def _same_query_key(query: str) -> str:
+    """Queries that only differ in case or whitespace are run once."""
+    return " ".join(query.lower().split())
+
+
+def load_queries(path: str) -> List[str]:
+    """
+    Read a batch of queries: a JSON array of strings or of objects with a "query" field,
+    otherwise one query per line (blank lines and lines starting with # are skipped).
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        items = json.loads(text)
+        queries = [item.get("query", "") if isinstance(item, dict) else str(item) for item in items]
+    else:
+        queries = [line for line in text.splitlines() if not line.lstrip().startswith("#")]
+    queries = [query.strip() for query in queries if query and query.strip()]
+    if not queries:
+        raise ValueError(f"No queries found in {path}")
+    return queries
+
+
+def _run_node(node: Callable, state: Dict[str, Any], handler: TokenUsageHandler) -> Dict[str, Any]:
+    # Run as a runnable, so the model calls of the node report their usage to the handler
+    return RunnableLambda(node).invoke(state, config={"callbacks": [handler]})
+
+
+def run_query_batch(
+    queries: List[str],
+    test_cases: List[Dict[str, Any]],
+    max_concurrency: int = None,
+    suite_id: Optional[str] = None,
+    graph: Any = None,
+    callbacks_factory: Optional[Callable[[], List[Any]]] = None,
+) -> Tuple[Dict[str, Any], List[Optional[Dict[str, Any]]]]:
+    """
+    Answer several queries against one suite, sharing the work they have in common.
+
+    - The suite is clustered once and every query starts from those clusters.
+    - Queries that only differ in case or whitespace are run once.
+    - Rubrics are created up front; queries that got the same rubric form a group that runs
+      one query after the other, so later queries of a group find the scores of the earlier
+      ones in the evaluation cache. Different groups run concurrently.
+    - At most `max_concurrency` rubric calls or query runs are in flight at once.
+
+    A failing query does not stop the others. Returns a summary of the time and tokens spent
+    and the result of every query (None for failed ones), in the order of `queries`.
+    """
+    max_concurrency = max(1, max_concurrency or config.BATCH_MAX_CONCURRENCY)
+    graph = graph or get_checkpointed_graph()
+    callbacks_factory = callbacks_factory or list
+    batch_id = uuid.uuid4().hex[:12]
+    started = time.perf_counter()
+
+    logger.info(f"--- STARTING QUERY BATCH {batch_id}: {len(queries)} queries, {len(test_cases)} test cases ---")
+
+    entries = [
+        {"index": index, "query": query, "status": "pending", "elapsed_seconds": 0.0, "usage": _add_usage()}
+        for index, query in enumerate(queries)
+    ]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+
+    # Identical queries: only the first one of each is run
+    first_by_key = {}
+    for entry in entries:
+        key = _same_query_key(entry["query"])
+        if key in first_by_key:
+            entry["duplicate_of"] = first_by_key[key]
+        else:
+            first_by_key[key] = entry["index"]
+    unique_entries = [entry for entry in entries if "duplicate_of" not in entry]
+
+    # Cluster the suite once for all queries
+    clusters = None
+    clustering = {"elapsed_seconds": 0.0, "usage": _add_usage()}
+    base_state = {"query": "", "suite_id": suite_id, "test_cases": test_cases, "clusters": None, "rubric": []}
+    if is_clustering_needed(base_state) == "clustering_is_needed":
+        handler = TokenUsageHandler()
+        clustering_started = time.perf_counter()
+        clusters = _run_node(create_clusters, base_state, handler)["clusters"]
+        clustering = {
+            "clusters": len(clusters.get("clusters", [])),
+            "elapsed_seconds": round(time.perf_counter() - clustering_started, 3),
+            "usage": handler.totals(),
+        }
+        logger.info(f"Clustered the suite once into {clustering['clusters']} clusters for all queries")
+
+    def fail(entry, error):
+        logger.error(f"Query {entry['index'] + 1} failed: {error}")
+        entry["status"] = "failed"
+        entry["error"] = str(error)
+
+    # Create the rubrics up front, so queries can be grouped by rubric
+    def make_rubric(entry):
+        handler = TokenUsageHandler()
+        entry_started = time.perf_counter()
+        try:
+            entry["rubric"] = _run_node(create_rubric, {**base_state, "query": entry["query"]}, handler)["rubric"]
+        finally:
+            entry["elapsed_seconds"] += time.perf_counter() - entry_started
+            entry["usage"] = _add_usage(entry["usage"], handler.totals())
+
+    with ContextThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique_entries)))) as executor:
+        futures = {executor.submit(make_rubric, entry): entry for entry in unique_entries}
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                fail(futures[future], future.exception())
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in unique_entries:
+        if entry["status"] != "failed":
+            entry["rubric_group"] = stable_hash(entry["rubric"])[:12]
+            groups.setdefault(entry["rubric_group"], []).append(entry)
+    logger.info(f"{len(unique_entries)} distinct queries share {len(groups)} distinct rubrics")
+
+    def run_query(entry):
+        handler = TokenUsageHandler()
+        entry_started = time.perf_counter()
+        entry["thread_id"] = f"batch-{batch_id}-{entry['index'] + 1}"
+        initial_state = {
+            "query": entry["query"],
+            "suite_id": suite_id,
+            "test_cases": test_cases,
+            "changed_files": [],
+            "changed_symbols": [],
+            "clusters": clusters,
+            "relevant_clusters": [],
+            "relevant_test_ids": None,
+            "rubric": entry["rubric"],
+            "evaluated_test_cases": [],
+            "sorted_test_cases": [],
+        }
+        try:
+            result = graph.invoke(
+                initial_state,
+                config=run_config(entry["thread_id"], callbacks=[handler, *callbacks_factory()]),
+            )
+            results[entry["index"]] = summarize_result(result)
+            entry["status"] = "succeeded"
+            entry["sorted_test_cases_count"] = len(result.get("sorted_test_cases", []))
+        except Exception as e:
+            fail(entry, e)
+        finally:
+            entry["elapsed_seconds"] += time.perf_counter() - entry_started
+            entry["usage"] = _add_usage(entry["usage"], handler.totals())
+
+    def run_group(group):
+        for entry in group:
+            run_query(entry)
+
+    if groups:
+        with ContextThreadPoolExecutor(max_workers=min(max_concurrency, len(groups))) as executor:
+            for future in as_completed([executor.submit(run_group, group) for group in groups.values()]):
+                future.result()
+
+    for entry in entries:
+        entry.pop("rubric", None)
+        entry["elapsed_seconds"] = round(entry["elapsed_seconds"], 3)
+        if "duplicate_of" in entry:
+            original = entries[entry["duplicate_of"]]
+            entry["status"] = original["status"]
+            results[entry["index"]] = results[original["index"]]
+            if "error" in original:
+                entry["error"] = original["error"]
+
+    summary = {
+        "batch_id": batch_id,
+        "queries": len(queries),
+        "distinct_queries": len(unique_entries),
+        "distinct_rubrics": len(groups),
+        "test_cases": len(test_cases),
+        "succeeded": sum(entry["status"] == "succeeded" for entry in entries),
+        "failed": sum(entry["status"] == "failed" for entry in entries),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "usage": _add_usage(clustering["usage"], *(entry["usage"] for entry in entries)),
+        "clustering": clustering,
+        "results": entries,
+    }
+    cache = get_evaluation_cache()
+    if cache is not None:
+        summary["evaluation_cache"] = cache.stats()
+
+    logger.info(
+        f"--- COMPLETED QUERY BATCH {batch_id}: {summary['succeeded']} succeeded, {summary['failed']} failed "
+        f"in {summary['elapsed_seconds']}s, {summary['usage']['total_tokens']} tokens in {summary['usage']['calls']} LLM calls ---"
+    )
+    return summary, results
+
+
+def write_batch_results(output_dir: str, summary: Dict[str, Any], results: List[Optional[Dict[str, Any]]]) -> str:
+    """Write one result file per query plus the summary; returns the path of the summary."""
+    os.makedirs(output_dir, exist_ok=True)
+    for entry, result in zip(summary["results"], results):
+        file_name = f"query_{entry['index'] + 1:03d}.json"
+        entry["result_file"] = file_name
+        with open(os.path.join(output_dir, file_name), "w", encoding="utf-8") as f:
+            json.dump({**entry, "result": result}, f, indent=2)
+    summary_path = os.path.join(output_dir, SUMMARY_FILE_NAME)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary_path
@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.core import config
+from src.jobs.store import JobStore, CANCELLED, FAILED, SUCCEEDED
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a final graph state returned to API clients."""
+    sorted_test_cases = result.get("sorted_test_cases", [])
+    return {
+        "query": result.get("query"),
+        "total_test_cases": len(result.get("test_cases", [])),
+        "sorted_test_cases_count": len(sorted_test_cases),
+        "sorted_test_cases": sorted_test_cases,
+        "rubric": result.get("rubric", []),
+    }
+
+
+class JobRunner:
+    """
+    Bounded pool of worker threads executing graph runs from a JobStore.
+
+    Every web worker process runs its own pool; the workers pick queued jobs from the shared
+    store, so any process can execute a job submitted through any other process.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        graph: Any,
+        max_workers: int,
+        config_factory: Optional[Callable[[], Dict[str, Any]]] = None,
+        poll_interval: float = 1.0,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.store = store
+        self.graph = graph
+        self.max_workers = max_workers
+        self.config_factory = config_factory or dict
+        self.poll_interval = poll_interval
+        # Several heartbeats fit into the stale timeout, so one slow write does not fail a live job
+        self.heartbeat_interval = heartbeat_interval or max(store.stale_after_seconds / 3, 1.0)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Started {self.max_workers} job workers")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def notify(self):
+        """Wake up idle workers, e.g. right after a job was submitted."""
+        self._wakeup.set()
+
+    def _work(self):
+        worker = f"{os.getpid()}-{threading.current_thread().name}"
+        while not self._stopped.is_set():
+            job = self.store.claim_next(worker)
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _heartbeat(self, job_id: str, done: threading.Event):
+        # A single graph step (clustering, a large evaluation batch) can outlast the stale timeout
+        while not done.wait(self.heartbeat_interval):
+            try:
+                self.store.heartbeat(job_id)
+            except Exception as e:
+                logger.warning(f"Job {job_id}: heartbeat failed: {str(e)}")
+
+    def _finish(self, job_id: str, status: str, **kwargs) -> bool:
+        if self.store.finish(job_id, status, **kwargs):
+            return True
+        job = self.store.get(job_id)
+        # Lost the race, e.g. against _fail_stale_jobs in another process; its status is kept
+        logger.warning(f"Job {job_id}: finished as {status}, but it was already {job['status'] if job else 'deleted'}")
+        return False
+
+    def _run(self, job: Dict[str, Any]):
+        job_id = job["job_id"]
+        logger.info(f"Job {job_id}: starting graph execution")
+        start_time = time.time()
+        progress = {"node": None, "evaluated": 0, "total": None, "elapsed": 0.0}
+        result = dict(job["input"])
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, done), name=f"job-heartbeat-{job_id}", daemon=True)
+        heartbeat.start()
+        try:
+            # The job id doubles as the checkpoint thread id, so a failed job can be resumed
+            run_config = {**self.config_factory(), "configurable": {"thread_id": job_id}}
+            for mode, chunk in self.graph.stream(
+                input=job["input"],
+                config=run_config,
+                stream_mode=["updates", "custom"],
+            ):
+                if mode == "updates":
+                    for node_name, update in chunk.items():
+                        result.update(update or {})
+                        progress["node"] = node_name
+                elif mode == "custom" and chunk.get("type") == "evaluation_progress":
+                    progress["evaluated"] = chunk["evaluated"]
+                    progress["total"] = chunk["total"]
+
+                progress["elapsed"] = round(time.time() - start_time, 2)
+                # Cancellation is checked between graph steps and evaluation batches
+                if self.store.update_progress(job_id, progress):
+                    raise JobCancelled()
+
+            if self._finish(job_id, SUCCEEDED, result=summarize_result(result)):
+                logger.info(f"Job {job_id}: completed in {time.time() - start_time:.1f}s")
+
+        except JobCancelled:
+            if self._finish(job_id, CANCELLED):
+                logger.info(f"Job {job_id}: cancelled")
+
+        except Exception as e:
+            logger.error(f"Job {job_id}: failed: {str(e)}", exc_info=True)
+            self._finish(job_id, FAILED, error=str(e))
+
+        finally:
+            done.set()
+            heartbeat.join()
+
+
+_job_store: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            _job_store = JobStore(
+                config.JOBS_DB_PATH,
+                stale_after_seconds=config.JOBS_STALE_AFTER_SECONDS,
+                retention_seconds=config.JOBS_RETENTION_SECONDS,
+            )
+        return _job_store
@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class JobStore:
+    """
+    SQLite-backed job state shared by every web worker process.
+
+    Jobs are claimed with an IMMEDIATE transaction, so two processes never run the same job.
+    Finished jobs are deleted retention_seconds after they finished.
+    """
+
+    def __init__(self, path: str, stale_after_seconds: int, retention_seconds: int):
+        self.path = path
+        self.stale_after_seconds = stale_after_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id           TEXT PRIMARY KEY,
+                    status           TEXT NOT NULL,
+                    input            TEXT NOT NULL,
+                    progress         TEXT,
+                    result           TEXT,
+                    error            TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker           TEXT,
+                    created_at       REAL NOT NULL,
+                    started_at       REAL,
+                    heartbeat_at     REAL,
+                    finished_at      REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit connection (transactions are explicit); closing() releases it after each operation
+        with closing(sqlite3.connect(self.path, timeout=30, isolation_level=None)) as conn:
+            yield conn
+
+    def submit(self, job_input: Dict[str, Any], max_queued: int) -> str:
+        """Queue a new job; raises QueueFullError when max_queued jobs are already queued or running."""
+        job_id = uuid.uuid4().hex
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._fail_stale_jobs(conn)
+                self._delete_finished_jobs(conn)
+                (active,) = conn.execute(
+                    f"SELECT COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                    ACTIVE_STATUSES,
+                ).fetchone()
+                if active >= max_queued:
+                    raise QueueFullError(f"Job queue is full ({active} queued or running jobs)")
+                conn.execute(
+                    "INSERT INTO jobs (job_id, status, input, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, QUEUED, json.dumps(job_input, ensure_ascii=False), time.time()),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim_next(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it (with its input)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, input FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                        (RUNNING, worker, now, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        return {"job_id": row[0], "input": json.loads(row[1])}
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> bool:
+        """Store progress and refresh the heartbeat. Returns True when cancellation was requested."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE job_id = ?",
+                (json.dumps(progress, ensure_ascii=False), time.time(), job_id),
+            )
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, job_id: str):
+        """Tell other processes that the job's worker is still alive, also while a graph step takes long."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = ?", (time.time(), job_id, RUNNING)
+            )
+
+    def finish(
+        self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None
+    ) -> bool:
+        """
+        Move a running job to its final status. Returns False when the job was no longer running,
+        e.g. because it was already failed as stale, and leaves it unchanged then.
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    RUNNING,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job. Queued jobs are cancelled right away; running jobs are flagged and stop at
+        their next progress update. Returns the resulting status, or None for an unknown job.
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                status = row[0]
+                if status == QUEUED:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE job_id = ?",
+                        (CANCELLED, time.time(), job_id),
+                    )
+                    status = CANCELLED
+                elif status == RUNNING:
+                    conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, status, progress, result, error, cancel_requested, created_at, started_at, finished_at "
+                "FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, progress, result, error, cancel_requested, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "progress": json.loads(progress) if progress else None,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "cancel_requested": bool(cancel_requested),
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))}) GROUP BY status",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        depth = {status: 0 for status in ACTIVE_STATUSES}
+        depth.update(dict(rows))
+        return depth
+
+    def _fail_stale_jobs(self, conn: sqlite3.Connection):
+        """Running jobs without a heartbeat for too long belonged to a worker that died."""
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND heartbeat_at < ?",
+            (FAILED, "Worker stopped responding", time.time(), RUNNING, time.time() - self.stale_after_seconds),
+        )
+
+    def _delete_finished_jobs(self, conn: sqlite3.Connection):
+        """Finished jobs keep their input and result, so they are only kept for retention_seconds."""
+        conn.execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+            (*FINISHED_STATUSES, time.time() - self.retention_seconds),
+        )
@@ -2,6 +2,8 @@ from .create_clusters import create_clusters
 from .create_rubric import create_rubric
 from .evaluate_test_cases import evaluate_test_cases
 from .pick_relevant_clusters import pick_relevant_clusters
+from .prefilter_changed_tests import prefilter_changed_tests
+from .shortlist_test_cases import shortlist_test_cases
 from .sort_test_cases import sort_test_cases
 
-__all__ = ['create_clusters', 'create_rubric', 'evaluate_test_cases', 'pick_relevant_clusters', 'sort_test_cases']
+__all__ = ['create_clusters', 'create_rubric', 'evaluate_test_cases', 'pick_relevant_clusters', 'prefilter_changed_tests', 'shortlist_test_cases', 'sort_test_cases']
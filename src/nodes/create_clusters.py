@@ -1,19 +1,50 @@
 import logging
+from collections import defaultdict
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.api.llm_client import model
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from src.api.llm_client import get_model, object_schema, structured_output, MODEL_NAME, MODEL_MAX_OUTPUT_TOKENS
 from src.utils.parse_llm import parse_llm_json_response
+from src.utils.tokens import count_tokens, pack_batches
+from src.utils.serialize import CLUSTERING_TEST_CASE_FIELDS, report_token_savings, serialize_records, serialize_test_cases
 from src.core.state import TestAgentState
+from src.core import config
+from src.clustering.engine import fit_clusters, build_clusters
+from src.clustering.store import ClusterSnapshot, content_hash, default_suite_id, get_cluster_store
+from src.clustering.merge import apply_merges, clean_clusters, finalize_clusters
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def create_clusters(state: TestAgentState):
-    logger.info("--- STARTING CREATE_CLUSTERS NODE ---")
-    
-    test_cases = state["test_cases"]
-    logger.info(f"Processing {len(test_cases)} test cases for clustering")
+# Estimated response tokens per test case of a chunk: its id plus a share of the cluster texts
+CLUSTERING_OUTPUT_TOKENS_PER_TEST = 12
+# Estimated response tokens per cluster in a merge call
+MERGE_OUTPUT_TOKENS_PER_CLUSTER = 40
+MERGE_FIELDS = ("key", "name", "description", "keywords", "size")
 
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+CLUSTERS_SCHEMA = object_schema(clusters={"type": "array", "items": object_schema(
+    cluster_id={"type": "integer"},
+    name={"type": "string"},
+    description={"type": "string"},
+    test_ids=_STRINGS,
+    keywords=_STRINGS,
+)})
+MERGES_SCHEMA = object_schema(clusters={"type": "array", "items": object_schema(
+    name={"type": "string"},
+    description={"type": "string"},
+    keywords=_STRINGS,
+    merged_keys=_STRINGS,
+)})
+CLUSTER_NAMES_SCHEMA = object_schema(clusters={"type": "array", "items": object_schema(
+    cluster_id={"type": "integer"},
+    name={"type": "string"},
+    description={"type": "string"},
+)})
+
+
+def _cluster_with_llm(test_cases):
+    """Let the LLM group the whole suite in a single prompt."""
     system_prompt = """
             You are a test case clustering assistant.
 
@@ -46,9 +77,12 @@ def create_clusters(state: TestAgentState):
 
       """
 
+    test_cases_text = serialize_test_cases(test_cases, CLUSTERING_TEST_CASE_FIELDS)
+    report_token_savings("create_clusters", test_cases, test_cases_text, MODEL_NAME)
+
     user_prompt = f"""
           Analyze the following test cases and group them into semantic clusters.
-            {test_cases}
+            {test_cases_text}
     """
 
         
@@ -57,10 +91,317 @@ def create_clusters(state: TestAgentState):
         HumanMessage(content=user_prompt)
     ]
 
+    logger.info("Calling LLM to create clusters...")
+    response = get_model(config.CLUSTERING_MODEL_TIER).invoke(messages, **structured_output("clusters", CLUSTERS_SCHEMA))
+    return parse_llm_json_response(response.content)
+
+
+def _map_concurrently(function, items):
+    if len(items) <= 1:
+        return [function(item) for item in items]
+    max_workers = max(1, min(config.CLUSTERING_MAX_CONCURRENCY, len(items)))
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(function, items))
+
+
+def _chunk_test_cases(test_cases):
+    """Split the suite into chunks that fit one clustering prompt, keeping test files together."""
+    ordered = sorted(test_cases, key=lambda test_case: str(test_case.get("file_path") or ""))
+    token_counts = (
+        count_tokens(serialize_test_cases([test_case], CLUSTERING_TEST_CASE_FIELDS), MODEL_NAME)
+        for test_case in ordered
+    )
+    return list(pack_batches(
+        ordered, token_counts, 0, config.CLUSTERING_CHUNK_TOKENS, MODEL_MAX_OUTPUT_TOKENS, CLUSTERING_OUTPUT_TOKENS_PER_TEST
+    ))
+
+
+def _merge_clusters(clusters):
+    """Reduce step: let the LLM merge clusters of different chunks that cover the same functionality."""
+    system_prompt = """
+            You are a test case clustering assistant.
+
+            A large test suite was split into parts and each part was clustered on its own, so several
+            clusters can describe the same functionality. For each cluster you get its key, name,
+            description, keywords and size.
+
+            Merge the clusters that verify the same functionality or component:
+            1. Give each merged cluster a descriptive name
+            2. Write a brief description of what its tests cover
+            3. Include a list of relevant keywords
+            4. List the "key" values of the clusters it merges
+
+            Rules:
+            - Every input key must appear in exactly one output cluster
+            - A cluster unrelated to all others is output on its own
+            - Output must be a clean JSON object only
+
+            Format:
+            {
+            "clusters": [
+                {
+                "name": "CLUSTER_NAME",
+                "description": "DESCRIPTION",
+                "keywords": ["KEYWORD1", "KEYWORD2"],
+                "merged_keys": ["KEY1", "KEY2"]
+                },
+                ...
+            ]
+            }
+      """
+
+    user_prompt = f"""
+          Merge the following test case clusters.
+            {serialize_records(clusters, MERGE_FIELDS)}
+    """
+
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_prompt)
+    ]
+
+    try:
+        response = get_model(config.CLUSTERING_MODEL_TIER).invoke(messages, **structured_output("cluster_merges", MERGES_SCHEMA))
+        parsed_response = parse_llm_json_response(response.content)
+        merges = parsed_response.get("clusters") if isinstance(parsed_response, dict) else None
+    except Exception as e:
+        # Unmerged clusters are still a valid clustering, only with some near-duplicates
+        logger.warning(f"Could not merge {len(clusters)} clusters with the LLM, keeping them as they are: {str(e)}")
+        merges = None
+    return apply_merges(clusters, merges)
+
+
+def _reduce_clusters(clusters):
+    """Merge the per-chunk clusters level by level, until a single merge call covers all of them."""
+    level = 1
+    while len(clusters) > 1:
+        keyed = [{**cluster, "key": str(i)} for i, cluster in enumerate(clusters)]
+        token_counts = (count_tokens(serialize_records([cluster], MERGE_FIELDS), MODEL_NAME) for cluster in keyed)
+        batches = list(pack_batches(
+            keyed, token_counts, 0, config.CLUSTERING_CHUNK_TOKENS, MODEL_MAX_OUTPUT_TOKENS, MERGE_OUTPUT_TOKENS_PER_CLUSTER
+        ))
+        logger.info(f"Reduce level {level}: merging {len(clusters)} clusters in {len(batches)} call(s)")
+        merged = [cluster for batch_clusters in _map_concurrently(_merge_clusters, batches) for cluster in batch_clusters]
+
+        # Stop once everything went through one call, or when a level no longer merges anything
+        if len(batches) == 1 or len(merged) >= len(clusters):
+            return merged
+        clusters = merged
+        level += 1
+    return clusters
+
+
+def _cluster_with_llm_map_reduce(test_cases):
+    """
+    Cluster the suite with the LLM, chunk by chunk when it does not fit a single prompt.
+
+    Chunks are clustered concurrently (map), their clusters are merged (reduce), and the result
+    is checked to hold every test case in exactly one cluster.
+    """
+    chunks = _chunk_test_cases(test_cases)
+    if len(chunks) > 1:
+        logger.info(f"Suite does not fit one prompt, clustering {len(test_cases)} test cases in {len(chunks)} chunks")
+
+    chunk_results = _map_concurrently(_cluster_with_llm, chunks)
+
+    assigned = set()
+    clusters = []
+    for chunk, result in zip(chunks, chunk_results):
+        chunk_clusters = result.get("clusters") if isinstance(result, dict) else None
+        clusters.extend(clean_clusters(chunk_clusters, (test_case["id"] for test_case in chunk), assigned))
+    logger.info(f"{len(chunks)} chunk(s) produced {len(clusters)} clusters covering {len(assigned)} of {len(test_cases)} test cases")
+
+    if len(chunks) > 1:
+        clusters = _reduce_clusters(clusters)
+
+    return finalize_clusters(clusters, test_cases)
+
+
+def _name_clusters(clusters, test_cases):
+    """Ask the LLM only for a name and description of each locally computed cluster."""
+    test_names = {test_case["id"]: test_case.get("test_name", "") for test_case in test_cases}
+    cluster_summaries = [
+        {
+            "cluster_id": cluster["cluster_id"],
+            "size": len(cluster["test_ids"]),
+            "keywords": cluster["keywords"],
+            "sample_test_names": [test_names[test_id] for test_id in cluster["test_ids"][:8]],
+        }
+        for cluster in clusters
+    ]
+
+    system_prompt = """
+            You are a test case clustering assistant.
+
+            Test cases have already been grouped into clusters. For each cluster you get its id, size,
+            characteristic keywords and a sample of test names.
+
+            For each cluster:
+            1. Give a short descriptive name
+            2. Write a one sentence description of what the tests cover
+
+            Output must be a clean JSON object only:
+            {
+            "clusters": [
+                {"cluster_id": 1, "name": "CLUSTER_NAME", "description": "DESCRIPTION"},
+                ...
+            ]
+            }
+      """
+
+    cluster_summaries_text = serialize_records(cluster_summaries, ("cluster_id", "size", "keywords", "sample_test_names"))
+    report_token_savings("name_clusters", cluster_summaries, cluster_summaries_text, MODEL_NAME)
+
+    user_prompt = f"""
+          Name and describe the following test case clusters.
+            {cluster_summaries_text}
+    """
+
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_prompt)
+    ]
+
+    names = {}
+    try:
+        logger.info(f"Calling LLM to name {len(clusters)} clusters...")
+        response = get_model(config.CLUSTERING_MODEL_TIER).invoke(messages, **structured_output("cluster_names", CLUSTER_NAMES_SCHEMA))
+        parsed_response = parse_llm_json_response(response.content) or {}
+        names = {str(named["cluster_id"]): named for named in parsed_response.get("clusters", [])}
+    except Exception as e:
+        # Names are only descriptive, the keywords still let pick_relevant_clusters do its job
+        logger.warning(f"Could not name clusters with the LLM, falling back to keywords: {str(e)}")
+
+    named_clusters = []
+    for cluster in clusters:
+        named = names.get(str(cluster["cluster_id"]), {})
+        # Same shape as the clusters the LLM backend produces
+        named_clusters.append({
+            "cluster_id": cluster["cluster_id"],
+            "name": named.get("name") or " / ".join(cluster["keywords"][:3]).title() or f"Cluster {cluster['cluster_id']}",
+            "description": named.get("description") or f"Test cases about {', '.join(cluster['keywords'])}",
+            "test_ids": cluster["test_ids"],
+            "keywords": cluster["keywords"],
+        })
+
+    return named_clusters
+
+
+def _fit_and_store(test_cases, suite_id, store, hashes):
+    """Full clustering run; the result becomes the new baseline for incremental runs."""
+    logger.info("Vectorizing and clustering test cases locally...")
+    cluster_model, labels = fit_clusters(
+        test_cases,
+        num_clusters=config.CLUSTERING_NUM_CLUSTERS or None,
+        max_features=config.CLUSTERING_MAX_FEATURES,
+    )
+    clusters = _name_clusters(build_clusters(test_cases, cluster_model, labels), test_cases)
+
+    if store is not None:
+        # build_clusters numbers clusters by centroid index, cluster_id N is centroid N - 1
+        snapshot = ClusterSnapshot(
+            model=cluster_model,
+            clusters=[{key: value for key, value in cluster.items() if key != "test_ids"} for cluster in clusters],
+            assignments={
+                str(test_case["id"]): (hashes[str(test_case["id"])], int(label) + 1)
+                for test_case, label in zip(test_cases, labels)
+            },
+            baseline_size=len(test_cases),
+            changes_since_fit=0,
+        )
+        store.save(suite_id, snapshot)
+
+    return clusters
+
+
+def _cluster_incrementally(test_cases, suite_id, store, snapshot, hashes):
+    """
+    Reuse stored assignments: only added or modified test cases are assigned to the nearest
+    existing cluster and deleted ones are dropped. Returns None when the suite drifted too far.
+    """
+    current_ids = set(hashes)
+    changed = [
+        test_case for test_case in test_cases
+        if snapshot.assignments.get(str(test_case["id"]), (None, None))[0] != hashes[str(test_case["id"])]
+    ]
+    deleted_ids = [test_id for test_id in snapshot.assignments if test_id not in current_ids]
+
+    changes_since_fit = snapshot.changes_since_fit + len(changed) + len(deleted_ids)
+    drift = changes_since_fit / max(snapshot.baseline_size, 1)
+    logger.info(f"Suite '{suite_id}': {len(changed)} added/modified, {len(deleted_ids)} deleted test cases, drift {drift:.1%}")
+
+    if drift > config.CLUSTERING_DRIFT_THRESHOLD:
+        logger.info(f"Drift is above {config.CLUSTERING_DRIFT_THRESHOLD:.0%}, re-clustering the whole suite")
+        return None
+
+    upserts = {}
+    if changed:
+        for test_case, label in zip(changed, snapshot.model.assign(changed)):
+            upserts[str(test_case["id"])] = (hashes[str(test_case["id"])], int(label) + 1)
+    if upserts or deleted_ids:
+        store.update_assignments(suite_id, upserts, deleted_ids, changes_since_fit)
+
+    assignments = {**snapshot.assignments, **upserts}
+    test_ids = defaultdict(list)
+    for test_case in test_cases:
+        test_ids[assignments[str(test_case["id"])][1]].append(test_case["id"])
+
+    # Clusters that lost all their test cases are left out
+    return [
+        {**cluster, "test_ids": test_ids[cluster["cluster_id"]]}
+        for cluster in snapshot.clusters
+        if test_ids[cluster["cluster_id"]]
+    ]
+
+
+def _cluster_locally(test_cases, suite_id):
+    """Group the suite with TF-IDF vectors and k-means, then let the LLM name the groups."""
+    store = get_cluster_store()
+    hashes = {str(test_case["id"]): content_hash(test_case) for test_case in test_cases}
+
+    clusters = None
+    if store is not None:
+        snapshot = store.load(suite_id)
+        if snapshot is not None:
+            clusters = _cluster_incrementally(test_cases, suite_id, store, snapshot, hashes)
+        else:
+            logger.info(f"No stored clusters for suite '{suite_id}' yet")
+
+    if clusters is None:
+        clusters = _fit_and_store(test_cases, suite_id, store, hashes)
+
+    # Same key order as the clusters the LLM backend produces
+    return {"clusters": [
+        {
+            "cluster_id": cluster["cluster_id"],
+            "name": cluster["name"],
+            "description": cluster["description"],
+            "test_ids": cluster["test_ids"],
+            "keywords": cluster["keywords"],
+        }
+        for cluster in clusters
+    ]}
+
+
+def create_clusters(state: TestAgentState):
+    logger.info("--- STARTING CREATE_CLUSTERS NODE ---")
+    
+    test_cases = state["test_cases"]
+
+    # Batch runs cluster the suite once and pass the clusters to every query
+    if state.get("clusters"):
+        logger.info(f"Using {len(state['clusters'].get('clusters', []))} precomputed clusters")
+        logger.info("--- COMPLETED CREATE_CLUSTERS NODE ---")
+        return {"clusters": state["clusters"]}
+
+    logger.info(f"Processing {len(test_cases)} test cases for clustering with the '{config.CLUSTERING_BACKEND}' backend")
+
     try:
-        logger.info("Calling LLM to create clusters...")
-        response = model.invoke(messages)
-        clusters_dict = parse_llm_json_response(response.content)
+        if config.CLUSTERING_BACKEND == "llm":
+            clusters_dict = _cluster_with_llm_map_reduce(test_cases)
+        else:
+            # Without a suite id, a shared fallback would make unrelated suites overwrite each other's snapshot
+            clusters_dict = _cluster_locally(test_cases, state.get("suite_id") or default_suite_id(test_cases))
         
         num_clusters = len(clusters_dict.get("clusters", []))
         logger.info(f"Successfully created {num_clusters} clusters")
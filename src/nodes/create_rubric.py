@@ -1,13 +1,26 @@
 import logging
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.api.llm_client import model
+from src.api.llm_client import get_model, model_name_for, object_schema, structured_output
+from src.cache.rubric_cache import get_rubric_cache
 from src.utils.parse_llm import parse_llm_json_response
 from src.core.state import TestAgentState
+from src.core import config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+RUBRIC_SCHEMA = object_schema(rubric={
+    "type": "array",
+    "items": object_schema(
+        id={"type": "string"},
+        name={"type": "string"},
+        description={"type": "string"},
+        weight={"type": "integer"},
+        scoring_criteria=object_schema(**{str(score): {"type": "string"} for score in range(6)}),
+    ),
+})
+
 
 def create_rubric(state: TestAgentState):
     logger.info("--- STARTING CREATE_RUBRIC NODE ---")
@@ -15,6 +28,21 @@ def create_rubric(state: TestAgentState):
     query = state["query"]
     logger.info(f"Creating rubric for query: '{query}'")
 
+    # Batch runs create the rubrics up front to group queries that share one
+    if state.get("rubric"):
+        logger.info(f"Using precomputed rubric with {len(state['rubric'])} dimensions")
+        logger.info("--- COMPLETED CREATE_RUBRIC NODE ---")
+        return {"rubric": state["rubric"]}
+
+    # Near-duplicate phrasings of an earlier query reuse its rubric, which also keeps evaluation cache keys stable
+    rubric_cache = get_rubric_cache()
+    if rubric_cache is not None:
+        cached_rubric = rubric_cache.get(query, model_name_for(config.RUBRIC_MODEL_TIER))
+        if cached_rubric is not None:
+            logger.info(f"Using cached rubric with {len(cached_rubric)} dimensions")
+            logger.info("--- COMPLETED CREATE_RUBRIC NODE ---")
+            return {"rubric": cached_rubric}
+
     system_prompt = """
             You are a test rubric generation assistant.
 
@@ -89,11 +117,16 @@ def create_rubric(state: TestAgentState):
 
     try:
         logger.info("Calling LLM to create rubric...")
-        response = model.invoke(messages)
+        response = get_model(config.RUBRIC_MODEL_TIER).invoke(messages, **structured_output("rubric", RUBRIC_SCHEMA))
         parsed_response = parse_llm_json_response(response.content)
+        if not isinstance(parsed_response, dict) or not parsed_response.get("rubric"):
+            raise ValueError("The LLM response holds no rubric")
         
         rubric_dimensions = len(parsed_response.get("rubric", []))
         logger.info(f"Successfully created rubric with {rubric_dimensions} dimensions")
+
+        if rubric_cache is not None:
+            rubric_cache.put(query, model_name_for(config.RUBRIC_MODEL_TIER), parsed_response["rubric"])
         logger.info("--- COMPLETED CREATE_RUBRIC NODE ---")
         
         return {"rubric": parsed_response["rubric"]}
@@ -1,43 +1,83 @@
+import bisect
 import logging
+from collections import Counter
+from concurrent.futures import as_completed
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.api.llm_client import model
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.config import get_stream_writer
+from src.api.llm_client import (
+    get_model, model_name_for, object_schema, structured_output, truncated_response_text,
+    MODEL_NAME, MODEL_CONTEXT_WINDOW, MODEL_MAX_OUTPUT_TOKENS,
+)
+from src.cache.evaluation_cache import EvaluationCache, get_evaluation_cache
+from src.core.metrics import count_evaluation_errors, count_llm_calls_avoided, observe_evaluation_batch
 from src.utils.parse_llm import parse_llm_json_response
+from src.utils.scoring import apply_scores, top_k_indices
+from src.utils.tokens import count_tokens, pack_batches
+from src.utils.serialize import EVALUATION_TEST_CASE_FIELDS, report_token_savings, serialize_rubric, serialize_test_cases
 from src.core.state import TestAgentState
+from src.core.test_case_store import get_test_case_store
+from src.core import config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Estimated response size per test case: name and explanation, plus a score with its
+# justification for every rubric dimension
+OUTPUT_TOKENS_PER_TEST = 80
+OUTPUT_TOKENS_PER_DIMENSION = 60
+# Room left for the instructions in the prompt
+PROMPT_OVERHEAD_TOKENS = 1000
 
-def evaluate_test_cases(state: TestAgentState):
-    logger.info("--- STARTING EVALUATE_TEST_CASES NODE ---")
-    
-    rubric = state["rubric"]
-    
-    # Determine which test cases to use for evaluation
-    if state.get("relevant_test_cases") is not None:
-        # Use filtered test cases from clustering
-        working_test_cases = state["relevant_test_cases"]
-        logger.info(f"Using {len(working_test_cases)} test cases from relevant clusters")
-    else:
-        # Use all test cases (no clustering was applied)
-        working_test_cases = state["test_cases"]
-        logger.info(f"Using all {len(working_test_cases)} test cases (no clustering applied)")
-    
-    evaluated_tc_num = len(state["evaluated_test_cases"])
-    tc_num = len(working_test_cases)
-    
-    # Check if all test cases are already evaluated
-    if evaluated_tc_num >= tc_num:
-        logger.info(f"All {tc_num} test cases already evaluated, nothing more to do")
-        return {"evaluated_test_cases": state["evaluated_test_cases"]}
-    
-    last_idx = min(evaluated_tc_num + 5, tc_num)
-    test_cases_to_evaluate = working_test_cases[evaluated_tc_num : last_idx]
 
-    logger.info(f"Evaluating test cases {evaluated_tc_num + 1} to {last_idx} out of {tc_num} total")
-    logger.info(f"Using rubric with {len(rubric)} dimensions")
+# Structured output has to be an object, the evaluations array is its only field
+EVALUATIONS_SCHEMA = object_schema(evaluations={"type": "array", "items": object_schema(
+    test_id={"type": "string"},
+    test_name={"type": "string"},
+    dimension_scores={"type": "array", "items": object_schema(
+        dimension_id={"type": "string"},
+        name={"type": "string"},
+        raw_score={"type": "integer"},
+        justification={"type": "string"},
+    )},
+    explanation={"type": "string"},
+    confidence={"type": "number"},
+)})
+
+
+class TruncatedResponseError(Exception):
+    """The model hit its output token limit before finishing the response."""
+
+    def __init__(self, message, results=None):
+        super().__init__(message)
+        # Complete evaluations received before the cut
+        self.results = results or []
+
+
+class InvalidResponseError(ValueError):
+    """The response holds no evaluations that can be read."""
+
 
+def _evaluations(parsed_response):
+    """The evaluations array of a parsed response, with or without the structured output wrapper."""
+    if isinstance(parsed_response, dict):
+        parsed_response = parsed_response.get("evaluations")
+    return parsed_response if isinstance(parsed_response, list) else None
+
+
+def _truncated(test_cases, response_text):
+    """Error for a response cut off at the output token limit, keeping the evaluations it completed."""
+    results = _evaluations(parse_llm_json_response(response_text, allow_partial=True)) or []
+    return TruncatedResponseError(
+        f"Response for {len(test_cases)} test cases was cut off at the output token limit after {len(results)} complete evaluations",
+        results,
+    )
+
+
+def _score_batch(test_cases_to_evaluate, rubric, tier="strong"):
+    """Score a single batch of test cases against the rubric with one LLM call to the tier's model."""
+    observe_evaluation_batch(len(test_cases_to_evaluate))
     system_prompt = """
     You are a test case scoring assistant.
 
@@ -49,53 +89,55 @@ def evaluate_test_cases(state: TestAgentState):
             2. Assign a raw score from 0 to 5, based on the rubric's scoring criteria
             3. Provide a concise justification for the score
 
-            Then calculate for each test case:
-            - Weighted score for each dimension (raw score × weight)
-            - Total weighted score (sum of all weighted scores)
-            - Normalized score: total weighted score / maximum possible weighted score
+            Only return raw scores. Weighted, total and normalized scores are calculated afterwards from the rubric weights.
 
             After scoring each test case:
             - Provide a 2–3 sentence explanation summarizing why this test case received its priority level, especially in relation to the user's original query and context.
+            - Rate your confidence in its scores from 0.0 (guessing) to 1.0 (certain), lower when the test case is ambiguous or its relation to the rubric is unclear.
 
             Output:
-            Return a clean JSON array with one object per test case. Each object should have the following structure:
+            Return a clean JSON array with one object per test case (or, when a response schema is given, an object whose "evaluations" field is that array). Each object should have the following structure:
 
             [
               {
+                "test_id": "ID_FROM_TEST_CASE",
                 "test_name": "NAME_FROM_TEST_CASE",
-                "overall_score": TOTAL_WEIGHTED_SCORE,
-                "normalized_score": NORMALIZED_SCORE,
                 "dimension_scores": [
                   {
                     "dimension_id": "1",
                     "name": "DIMENSION_NAME",
                     "raw_score": 0-5,
-                    "weighted_score": raw_score × weight,
                     "justification": "Brief explanation for this score"
                   },
                   ...
                 ],
-                "explanation": "Short summary of why this test received its priority level"
+                "explanation": "Short summary of why this test received its priority level",
+                "confidence": 0.0-1.0
               },
               ... more test case evaluations ...
             ]
 
             You will be provided:
-            - Multiple test cases (up to 5 test cases as JSON)
-            - A prioritization rubric (as a list of dimension objects, each with name, description, weight, and scoring criteria)
+            - Multiple test cases (as compact JSON, or as a | separated table with a header row)
+            - A prioritization rubric (as a list of dimension objects, each with id, name, description, and scoring criteria)
+
+            Every test case must get exactly one object, with the "id" of the test case as its "test_id".
 
             Use only the provided data. Do not generate anything beyond the expected JSON output.
         """
 
+    test_cases_text = serialize_test_cases(test_cases_to_evaluate, EVALUATION_TEST_CASE_FIELDS)
+    rubric_text = serialize_rubric(rubric)
+    report_token_savings("evaluate_test_cases", f"{test_cases_to_evaluate}{rubric}", test_cases_text + rubric_text, MODEL_NAME)
 
     user_prompt = f"""
             Score these test cases against the prioritization rubric.
 
             Test Cases:
-            {test_cases_to_evaluate}
+            {test_cases_text}
 
             Rubric:
-            {rubric}
+            {rubric_text}
         """
 
     messages = [
@@ -104,15 +146,429 @@ def evaluate_test_cases(state: TestAgentState):
     ]
 
     try:
+        response = get_model(tier).invoke(messages, **structured_output("evaluations", EVALUATIONS_SCHEMA))
+    except Exception as e:
+        # With structured output the SDK raises on truncation instead of returning the partial response
+        partial_text = truncated_response_text(e)
+        if partial_text is None:
+            raise
+        raise _truncated(test_cases_to_evaluate, partial_text) from e
+    if (getattr(response, "response_metadata", None) or {}).get("finish_reason") == "length":
+        raise _truncated(test_cases_to_evaluate, response.content)
+
+    results = _evaluations(parse_llm_json_response(response.content))
+    if results is None:
+        raise InvalidResponseError(f"The LLM response for {len(test_cases_to_evaluate)} test cases holds no evaluations")
+    return results
+
+
+def _match_results(batch, results, tier="strong"):
+    """
+    Evaluations of a response keyed by the id of the test case they belong to.
+
+    Results are matched by test_id, or by test_name when the id is missing and the name is
+    unique in the batch. Results without dimension scores, of unknown test cases, or second
+    results of a test case are dropped. Id and name are taken from the test case itself, and
+    the model tier that scored it is recorded.
+    """
+    by_id = {str(test_case["id"]): test_case for test_case in batch}
+    name_counts = Counter(test_case.get("test_name") for test_case in batch)
+    by_name = {test_case.get("test_name"): test_case for test_case in batch if name_counts[test_case.get("test_name")] == 1}
+
+    matched = {}
+    for result in results:
+        if not isinstance(result, dict) or not result.get("dimension_scores") or not isinstance(result["dimension_scores"], list):
+            continue
+        if result.get("test_id") is not None:
+            test_case = by_id.get(str(result["test_id"]))
+        else:
+            test_case = by_name.get(result.get("test_name"))
+        if test_case is None or str(test_case["id"]) in matched:
+            continue
+        matched[str(test_case["id"])] = {
+            **result, "test_id": test_case["id"], "test_name": test_case.get("test_name"), "model_tier": tier,
+        }
+    return matched
+
+
+def _error_record(test_case, reason, tier="strong"):
+    """Stands in for the evaluation of a test case that could not be scored; it ranks last."""
+    return {
+        "test_id": test_case["id"],
+        "test_name": test_case.get("test_name"),
+        "dimension_scores": [],
+        "explanation": "",
+        "error": reason,
+        "model_tier": tier,
+    }
+
+
+def _token_budgets(rubric):
+    """Input budget for the test cases of a batch, output budget and estimated output tokens per test case."""
+    output_budget = min(config.EVALUATION_OUTPUT_TOKEN_BUDGET, MODEL_MAX_OUTPUT_TOKENS)
+    # The rubric is sent along with every batch
+    rubric_tokens = count_tokens(serialize_rubric(rubric), MODEL_NAME)
+    input_budget = min(
+        config.EVALUATION_INPUT_TOKEN_BUDGET,
+        MODEL_CONTEXT_WINDOW - output_budget - rubric_tokens - PROMPT_OVERHEAD_TOKENS,
+    )
+    output_tokens_per_test = OUTPUT_TOKENS_PER_TEST + OUTPUT_TOKENS_PER_DIMENSION * len(rubric)
+    return input_budget, output_budget, output_tokens_per_test
+
+
+def _pack_into_batches(items, rubric):
+    """Pack (test case, key) pairs into batches that fit the token budgets, in order."""
+    input_budget, output_budget, output_tokens_per_test = _token_budgets(rubric)
+    token_counts = (count_tokens(serialize_test_cases([test_case], EVALUATION_TEST_CASE_FIELDS), MODEL_NAME) for test_case, _ in items)
+    return pack_batches(items, token_counts, config.EVALUATION_BATCH_SIZE, input_budget, output_budget, output_tokens_per_test)
+
+
+def _score_and_cache_batch(batch, batch_keys, rubric, cache, tier="strong", retries=None):
+    """
+    Score a batch with the tier's model and store the results, so finished batches survive a later failure.
+
+    Returns an evaluation for every test case of the batch, keyed by test id. When the response
+    is truncated, malformed or misses test cases, only the test cases without a valid result are
+    scored again: together if some of the batch succeeded, otherwise split in halves, down to
+    single test cases. A batch gets at most EVALUATION_RETRY_BUDGET extra calls; test cases
+    still without a result then get an error record instead of failing the run.
+    """
+    if retries is None:
+        retries = {"left": config.EVALUATION_RETRY_BUDGET}
+
+    try:
+        results, failure = _score_batch(batch, rubric, tier), None
+    except TruncatedResponseError as e:
+        results, failure = e.results, str(e)
+    except InvalidResponseError as e:
+        results, failure = [], str(e)
+
+    scored = _match_results(batch, results, tier)
+    _cache_results(cache, {key: scored[str(test_case["id"])] for test_case, key in zip(batch, batch_keys) if str(test_case["id"]) in scored})
+
+    failed = [(test_case, key) for test_case, key in zip(batch, batch_keys) if str(test_case["id"]) not in scored]
+    if not failed:
+        return scored
+
+    reason = failure or f"No valid result for {len(failed)} of {len(batch)} test cases"
+    if len(batch) == 1:
+        parts = []
+    elif len(failed) < len(batch):
+        parts = [failed]
+    else:
+        middle = len(failed) // 2
+        parts = [failed[:middle], failed[middle:]]
+    logger.warning(f"{reason}; retrying {len(failed)} test case(s) in {len(parts)} call(s), {retries['left']} retries left")
+
+    for part in parts:
+        if retries["left"] <= 0:
+            break
+        retries["left"] -= 1
+        scored.update(_score_and_cache_batch(
+            [test_case for test_case, _ in part], [key for _, key in part], rubric, cache, tier, retries
+        ))
+
+    errors = {str(test_case["id"]): _error_record(test_case, reason, tier) for test_case, _ in failed if str(test_case["id"]) not in scored}
+    if errors:
+        logger.error(f"Giving up on {len(errors)} test case(s): {reason}")
+        count_evaluation_errors(len(errors))
+        scored.update(errors)
+    return scored
+
+
+def _cache_results(cache, results_by_key):
+    if cache is not None and results_by_key:
+        cache.put_many(results_by_key)
+
+
+def _cache_keys(test_cases, rubric, tier):
+    # Raw scores do not depend on the weights, so re-weighted rubrics keep hitting the cache
+    unweighted_rubric = [{key: value for key, value in dimension.items() if key != "weight"} for dimension in rubric]
+    model_name = model_name_for(tier)
+    return [EvaluationCache.make_key(test_case, unweighted_rubric, model_name) for test_case in test_cases]
+
+
+def _cached_evaluations(test_cases, keys, cached_results, tier):
+    """
+    Cache hits by test id. Keys hash the whole test case, id included, so a hit is always an
+    evaluation of this very test case; its id and name are still taken from the test case, as
+    the cached copy spells them the way the model returned them.
+    """
+    return {
+        str(test_case["id"]): {**cached_results[key], "test_id": test_case["id"], "test_name": test_case.get("test_name"), "model_tier": tier}
+        for test_case, key in zip(test_cases, keys) if key in cached_results
+    }
+
+
+def _confidence(evaluation):
+    """Confidence the model reported for an evaluation; one that did not report any is taken at its word."""
+    try:
+        return float(evaluation.get("confidence", 1.0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _cascade_candidates(evaluations, rubric, k):
+    """
+    Positions of the fast model evaluations the strong model should score again.
+
+    Those are the test cases the fast model could not score, the ones it is not confident about
+    (below CASCADE_MIN_CONFIDENCE) and, when there are more than k, the ones whose normalized
+    score is within CASCADE_MARGIN of the k-th best, where a small scoring error moves a test
+    case into or out of the top k.
+    """
+    scored = apply_scores(evaluations, rubric)
+    boundary = scored[top_k_indices(scored, k)[-1]]["normalized_score"] if len(scored) > k else None
+    return [
+        position for position, evaluation in enumerate(scored)
+        if evaluation.get("model_tier") == "fast" and (
+            evaluation.get("error")
+            or _confidence(evaluation) < config.CASCADE_MIN_CONFIDENCE
+            or (boundary is not None and abs(evaluation["normalized_score"] - boundary) <= config.CASCADE_MARGIN)
+        )
+    ]
+
+
+def _rescore_uncertain(evaluations, rubric, store, cache, k):
+    """
+    Second stage of the cascade: score the uncertain fast model evaluations again with the strong model.
+
+    Returns the evaluations in the same order with those replaced; a test case the strong model
+    cannot score either keeps its fast model evaluation.
+    """
+    positions = _cascade_candidates(evaluations, rubric, k)
+    if not positions:
+        logger.info(f"Cascade: all {len(evaluations)} fast model evaluations are settled")
+        return evaluations
+
+    test_cases = store.to_dicts([evaluations[position]["test_id"] for position in positions])
+    keys = _cache_keys(test_cases, rubric, "strong")
+    cached_results = cache.get_many(keys) if cache is not None else {}
+    rescored = _cached_evaluations(test_cases, keys, cached_results, "strong")
+    batches = list(_pack_into_batches([(test_case, key) for test_case, key in zip(test_cases, keys) if key not in cached_results], rubric))
+    logger.info(
+        f"Cascade: re-scoring {len(positions)} of {len(evaluations)} test cases with the strong model "
+        f"({len(rescored)} cached, {len(batches)} LLM call(s))"
+    )
+
+    def run_batch(batch):
+        return _score_and_cache_batch([test_case for test_case, _ in batch], [key for _, key in batch], rubric, cache, "strong")
+
+    for batch_result in _score_batches(batches, run_batch, lambda result: None):
+        rescored.update(batch_result)
+
+    updated = list(evaluations)
+    for position in positions:
+        evaluation = rescored.get(str(evaluations[position]["test_id"]))
+        if evaluation is not None and not evaluation.get("error"):
+            updated[position] = evaluation
+    return apply_scores(updated, rubric)
+
+
+def _settled_length(evaluations, rubric, k):
+    """
+    Length of the shortest prefix of `evaluations` (in pre-ranked, best-first order) after which
+    the remaining candidates can be skipped, or None while the top k is not settled.
+
+    That is certain once the k-th best test case has the maximum score, as later candidates
+    can at best tie and ties keep the earlier one. Otherwise it is assumed once the last
+    TOP_K_PATIENCE scored candidates all failed to make it into the top k.
+    """
+    scored = apply_scores(evaluations, rubric)
+    # (overall score, -position) of the k best so far, worst first; ties keep the earlier one
+    top = []
+    for position, evaluation in enumerate(scored):
+        bisect.insort(top, (evaluation["overall_score"], -position))
+        if len(top) > k:
+            top.pop(0)
+        if len(top) < k:
+            continue
+        kth_best = scored[-top[0][1]]
+        if kth_best["normalized_score"] >= 1.0 or position - max(-index for _, index in top) >= config.TOP_K_PATIENCE:
+            return position + 1
+    return None
+
+
+def _top_k_settled(evaluations, rubric, k):
+    """Whether the candidates after `evaluations` can be skipped, see _settled_length."""
+    return _settled_length(evaluations, rubric, k) is not None
+
+
+def _score_batches(batches, run_batch, on_done, should_stop=None):
+    """
+    Score the batches, at most EVALUATION_MAX_CONCURRENCY at a time; results are stored by batch index.
+
+    With `should_stop`, the batches are scored in waves of that size in their order and the
+    remaining waves are skipped once should_stop(results so far) is true; their results stay None.
+    """
+    results = [None] * len(batches)
+    if len(batches) == 1:
         logger.info("Calling LLM to evaluate test cases...")
-        response = model.invoke(messages)
-        parsed_response = parse_llm_json_response(response.content)
+        results[0] = run_batch(batches[0])
+        on_done(results[0])
+    elif batches:
+        max_workers = max(1, min(config.EVALUATION_MAX_CONCURRENCY, len(batches)))
+        wave_size = max_workers if should_stop is not None else len(batches)
+        logger.info(f"Calling LLM to evaluate {len(batches)} batches with max concurrency {max_workers}...")
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            for wave_start in range(0, len(batches), wave_size):
+                futures = {executor.submit(run_batch, batches[i]): i for i in range(wave_start, min(wave_start + wave_size, len(batches)))}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    on_done(results[futures[future]])
+                if should_stop is not None and wave_start + wave_size < len(batches) and should_stop(results):
+                    logger.info(f"Top {config.TOP_K} settled after {wave_start + wave_size} of {len(batches)} batches")
+                    break
+    return results
+
+
+def _get_progress_writer():
+    """Custom stream writer of the running graph, or a no-op when the node is called directly."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
+
+
+def evaluate_test_cases(state: TestAgentState):
+    logger.info("--- STARTING EVALUATE_TEST_CASES NODE ---")
+    
+    rubric = state["rubric"]
+    
+    store = get_test_case_store(state["test_cases"])
+
+    # Determine which test cases to use for evaluation
+    if state.get("relevant_test_ids") is not None:
+        # Use filtered test cases from clustering, without ids the suite does not contain
+        working_test_ids = [test_id for test_id in state["relevant_test_ids"] if test_id in store]
+        logger.info(f"Using {len(working_test_ids)} test cases from relevant clusters")
+    else:
+        # Use all test cases (no clustering was applied)
+        working_test_ids = store.ids()
+        logger.info(f"Using all {len(working_test_ids)} test cases (no clustering applied)")
+    
+    evaluated_tc_num = len(state["evaluated_test_cases"])
+    tc_num = len(working_test_ids)
+    
+    # Check if all test cases are already evaluated
+    if evaluated_tc_num >= tc_num:
+        logger.info(f"All {tc_num} test cases already evaluated, nothing more to do")
+        return {"evaluated_test_cases": state["evaluated_test_cases"]}
+    
+    # Only the remaining part of the working set is materialized as dicts for the prompts
+    remaining_test_cases = store.to_dicts(working_test_ids[evaluated_tc_num:])
+    top_k = config.TOP_K
+    # In cascade mode the fast model scores everything first
+    cascade = config.EVALUATION_MODEL_TIER == "cascade"
+    tier = "fast" if cascade else config.EVALUATION_MODEL_TIER
+
+    cache = get_evaluation_cache()
+    keys = _cache_keys(remaining_test_cases, rubric, tier)
+    cached_results = cache.get_many(keys) if cache is not None else {}
+    # Candidates left after this run are only packed (to count the calls avoided) if top-K stops early
+    candidates = list(zip(remaining_test_cases, keys))
+
+    if config.EVALUATION_MODE == "sequential":
+        # One batch of cache misses per node run, the graph loops back until everything is evaluated.
+        # Cache hits in front of and between those misses are taken along so the evaluated prefix stays contiguous.
+        misses = [(i, (test_case, key)) for i, (test_case, key) in enumerate(zip(remaining_test_cases, keys)) if key not in cached_results]
+        first_batch = next(_pack_into_batches([miss for _, miss in misses], rubric), [])
+        end_idx = len(remaining_test_cases)
+        if len(first_batch) < len(misses):
+            end_idx = misses[len(first_batch) - 1][0] + 1
+        remaining_test_cases = remaining_test_cases[:end_idx]
+        keys = keys[:end_idx]
+
+    to_score = [(test_case, key) for test_case, key in zip(remaining_test_cases, keys) if key not in cached_results]
+    # Pack the cache misses up front so the batches can be scored concurrently
+    batches = list(_pack_into_batches(to_score, rubric))
+
+    last_idx = evaluated_tc_num + len(remaining_test_cases)
+    logger.info(f"Evaluating test cases {evaluated_tc_num + 1} to {last_idx} out of {tc_num} total")
+    logger.info(f"Evaluation cache: {len(remaining_test_cases) - len(to_score)} hits, {len(to_score)} misses in {len(batches)} batch(es) of up to {max(map(len, batches), default=0)} test cases")
+    logger.info(f"Using rubric with {len(rubric)} dimensions and the {config.EVALUATION_MODEL_TIER} model tier")
+
+    def run_batch(batch):
+        return _score_and_cache_batch([test_case for test_case, _ in batch], [key for _, key in batch], rubric, cache, tier)
+
+    # Lets streaming clients (see /run_agent_stream) show a provisional ranking after every batch
+    write_progress = _get_progress_writer()
+    progress = {"evaluated": evaluated_tc_num}
+
+    def report_progress(results):
+        progress["evaluated"] += len(results)
+        write_progress({
+            "type": "evaluation_progress",
+            "evaluated": progress["evaluated"],
+            "total": tc_num,
+            "results": results,
+        })
+
+    # Position of each batch's first test case, where the evaluated prefix ends while that batch is not scored yet
+    positions = {str(test_case["id"]): i for i, test_case in enumerate(remaining_test_cases)}
+    batch_starts = [positions[str(batch[0][0]["id"])] for batch in batches]
+
+    try:
+        hits = _cached_evaluations(remaining_test_cases, keys, cached_results, tier)
+        if hits:
+            report_progress(list(hits.values()))
+
+        def merge(batch_results):
+            # Every scored test case has an evaluation (or error record) by id, so they are merged
+            # back in working set order and the evaluated prefix always matches the ids that were scored.
+            # Cache hits after the first unscored batch are left out, like in sequential mode, so where
+            # top-K stops does not depend on how warm the cache is
+            cut_off = next((start for start, result in zip(batch_starts, batch_results) if result is None), len(remaining_test_cases))
+            evaluations = dict(hits)
+            for batch_result in batch_results:
+                evaluations.update(batch_result or {})
+            return [
+                evaluations[str(test_case["id"])]
+                for test_case in remaining_test_cases[:cut_off]
+                if str(test_case["id"]) in evaluations
+            ]
+
+        should_stop = None
+        if top_k:
+            should_stop = lambda batch_results: _top_k_settled(state["evaluated_test_cases"] + merge(batch_results), rubric, top_k)
+        batch_results = _score_batches(batches, run_batch, lambda result: report_progress(list(result.values())), should_stop)
+        parsed_response = merge(batch_results)
         
-        logger.info(f"Successfully evaluated {len(parsed_response)} test cases")
+        # Weighted, overall and normalized scores are computed here instead of trusting the LLM's arithmetic
+        parsed_response = apply_scores(parsed_response, rubric)
+
+        failed = sum(1 for evaluation in parsed_response if evaluation.get("error"))
+        logger.info(f"Successfully evaluated {len(parsed_response) - failed} test cases, {failed} failed")
+        if cache is not None:
+            logger.info(f"Evaluation cache stats: {cache.stats()}")
+        evaluated_test_cases = state["evaluated_test_cases"] + parsed_response
+        settled_length = _settled_length(evaluated_test_cases, rubric, top_k) if top_k else None
+        settled = settled_length is not None and settled_length < tc_num
+        if settled:
+            # A wave (or a node run) can end past the point where the top K settled, cut back to it
+            evaluated_test_cases = evaluated_test_cases[:settled_length]
+        if cascade and (settled or len(evaluated_test_cases) >= tc_num):
+            # The top-K boundary is only known once scoring is done, so the cascade runs in the last node run
+            evaluated_test_cases = _rescore_uncertain(evaluated_test_cases, rubric, store, cache, top_k or config.CASCADE_TOP_K)
+        if settled:
+            # The working set shrinks to what was evaluated, so the graph moves on to sorting
+            evaluated_ids = {str(evaluation["test_id"]) for evaluation in evaluated_test_cases[evaluated_tc_num:]}
+            skipped = [(test_case, key) for test_case, key in candidates if str(test_case["id"]) not in evaluated_ids]
+            calls_avoided = sum(1 for _ in _pack_into_batches([item for item in skipped if item[1] not in cached_results], rubric))
+            count_llm_calls_avoided(calls_avoided)
+            logger.info(f"Top {top_k} settled after {len(evaluated_test_cases)} of {tc_num} test cases, skipping {len(skipped)} ({calls_avoided} LLM calls avoided)")
+            logger.info("--- COMPLETED EVALUATE_TEST_CASES NODE ---")
+            return {
+                "evaluated_test_cases": evaluated_test_cases,
+                "relevant_test_ids": working_test_ids[:evaluated_tc_num] + [
+                    test_id for test_id in working_test_ids[evaluated_tc_num:] if str(test_id) in evaluated_ids
+                ],
+            }
+
         logger.info("--- COMPLETED EVALUATE_TEST_CASES NODE ---")
         
-        return {"evaluated_test_cases" : state["evaluated_test_cases"] + parsed_response}
+        return {"evaluated_test_cases" : evaluated_test_cases}
     
     except Exception as e:
         logger.error(f"ERROR in evaluate_test_cases: {str(e)}")
-        raise
\ No newline at end of file
+        raise
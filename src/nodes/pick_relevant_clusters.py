@@ -1,13 +1,29 @@
 import logging
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.api.llm_client import model
+from src.api.llm_client import get_model, object_schema, structured_output, MODEL_NAME
 from src.utils.parse_llm import parse_llm_json_response
+from src.utils.serialize import report_token_savings, serialize_clusters
 from src.core.state import TestAgentState
+from src.core import config
+from src.core.test_case_store import get_test_case_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+RELEVANT_CLUSTERS_SCHEMA = object_schema(
+    selected_clusters={
+        "type": "array",
+        "items": object_schema(
+            cluster_id={"type": "string"},
+            relevance_level={"type": "string", "enum": ["high", "medium"]},
+            justification={"type": "string"},
+        ),
+    },
+    excluded_count={"type": "integer"},
+    selection_summary={"type": "string"},
+)
+
 def pick_relevant_clusters(state: TestAgentState):
     logger.info("--- STARTING PICK_RELEVANT_CLUSTERS NODE ---")
     
@@ -49,13 +65,16 @@ def pick_relevant_clusters(state: TestAgentState):
     - Avoid both over-inclusion (too many irrelevant clusters) and under-inclusion (missing relevant clusters)
     """
 
+    clusters_text = serialize_clusters(clusters.get("clusters", []))
+    report_token_savings("pick_relevant_clusters", clusters, clusters_text, MODEL_NAME)
+
     user_prompt = f"""
     Analyze the following user query and select the most relevant test case clusters for evaluation.
 
     User Query: "{query}"
 
     Available Clusters:
-    {clusters}
+    {clusters_text}
 
     Instructions:
     1. Determine the main focus and intent of the user query
@@ -90,8 +109,10 @@ def pick_relevant_clusters(state: TestAgentState):
 
     try:
         logger.info("Calling LLM to pick relevant clusters...")
-        response = model.invoke(messages)
+        response = get_model(config.CLUSTER_PICK_MODEL_TIER).invoke(messages, **structured_output("relevant_clusters", RELEVANT_CLUSTERS_SCHEMA))
         res = parse_llm_json_response(response.content)
+        if not isinstance(res, dict) or not isinstance(res.get("selected_clusters"), list):
+            raise ValueError("The LLM response holds no cluster selection")
         
         selected_count = len(res.get("selected_clusters", []))
         excluded_count = res.get("excluded_count", 0)
@@ -105,26 +126,20 @@ def pick_relevant_clusters(state: TestAgentState):
         relevant_cluster_ids = [str(cluster["cluster_id"]) for cluster in relevant_clusters]
         logger.info(f"Extracting test cases from relevant clusters: {relevant_cluster_ids}")
         
-        # Find test IDs from relevant clusters
-        relevant_test_ids = []
         for cluster in clusters_data["clusters"]:
             if str(cluster["cluster_id"]) in relevant_cluster_ids:
-                relevant_test_ids.extend(cluster["test_ids"])
                 logger.info(f"Cluster {cluster['cluster_id']} ({cluster['name']}) contributed {len(cluster['test_ids'])} test cases")
+
+        # Resolve the member ids through the store's id index (ids compared as strings)
+        store = get_test_case_store(state["test_cases"])
+        relevant_test_ids = store.ids_in_clusters(clusters_data["clusters"], relevant_cluster_ids)
         
-        # Convert test IDs to actual test cases
-        relevant_test_cases = []
-        all_test_cases = state["test_cases"]
-        for test_case in all_test_cases:
-            if test_case["id"] in relevant_test_ids:
-                relevant_test_cases.append(test_case)
-        
-        logger.info(f"Extracted {len(relevant_test_cases)} test cases from {len(relevant_cluster_ids)} relevant clusters")
+        logger.info(f"Extracted {len(relevant_test_ids)} test cases from {len(relevant_cluster_ids)} relevant clusters")
         logger.info("--- COMPLETED PICK_RELEVANT_CLUSTERS NODE ---")
         
         return {
             "relevant_clusters": res["selected_clusters"],
-            "relevant_test_cases": relevant_test_cases
+            "relevant_test_ids": relevant_test_ids
         }
     
     except Exception as e:
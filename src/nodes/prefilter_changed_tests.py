@@ -0,0 +1,37 @@
+import logging
+from collections import Counter
+from src.core.state import TestAgentState
+from src.core import config
+from src.retrieval.impact import get_impact_index
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def prefilter_changed_tests(state: TestAgentState):
+    logger.info("--- STARTING PREFILTER_CHANGED_TESTS NODE ---")
+
+    changed_files = state.get("changed_files") or []
+    changed_symbols = (state.get("changed_symbols") or []) if config.IMPACT_MATCH_SYMBOLS else []
+    if not changed_files and not changed_symbols:
+        logger.info("No changed files given, keeping the whole suite")
+        logger.info("--- COMPLETED PREFILTER_CHANGED_TESTS NODE ---")
+        return {}
+
+    # Like the BM25 index, the impact index is built once per suite version and shared by all runs
+    index = get_impact_index(state["test_cases"], config.IMPACT_MAP_PATH, config.IMPACT_MIN_SYMBOL_LENGTH)
+    affected = index.affected(changed_files, changed_symbols)
+    logger.info(f"Changes: {len(changed_files)} file(s), {len(changed_symbols)} symbol(s)")
+
+    if not affected:
+        logger.info("No test case is directly affected by the changes, falling back to the whole suite")
+        logger.info("--- COMPLETED PREFILTER_CHANGED_TESTS NODE ---")
+        return {}
+
+    rules = Counter(reason.split(":", 1)[0] for reasons in affected.values() for reason in reasons)
+    logger.info(f"{len(affected)} of {len(index)} test cases are affected by the changes (matches by rule: {dict(rules)})")
+    logger.info("--- COMPLETED PREFILTER_CHANGED_TESTS NODE ---")
+
+    # The affected test cases are the working set, in suite order; clustering is skipped
+    return {"relevant_test_ids": list(affected)}
@@ -0,0 +1,61 @@
+import logging
+from src.core.state import TestAgentState
+from src.core import config
+from src.core.test_case_store import get_test_case_store
+from src.retrieval.bm25 import get_bm25_index
+from src.utils.text import analyze, QUERY_NOISE_WORDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def shortlist_query_terms(query, rubric):
+    """Query terms count twice, rubric dimension names and descriptions once."""
+    terms = analyze(query, QUERY_NOISE_WORDS) * 2
+    for dimension in rubric or []:
+        terms.extend(analyze(f"{dimension.get('name', '')} {dimension.get('description', '')}", QUERY_NOISE_WORDS))
+    return terms
+
+
+def shortlist_test_cases(state: TestAgentState):
+    logger.info("--- STARTING SHORTLIST_TEST_CASES NODE ---")
+
+    limit = config.SHORTLIST_SIZE
+    min_score = config.SHORTLIST_MIN_SCORE
+    # Top-K mode needs the working set in best-first order, even when nothing is cut
+    pre_rank = config.TOP_K > 0
+    if not limit and not min_score and not pre_rank:
+        logger.info("Shortlisting is disabled, keeping the working set as is")
+        logger.info("--- COMPLETED SHORTLIST_TEST_CASES NODE ---")
+        return {}
+
+    store = get_test_case_store(state["test_cases"])
+    # Works on the clustered working set when there is one, otherwise on the whole suite
+    if state.get("relevant_test_ids") is not None:
+        working_test_ids = state["relevant_test_ids"]
+    else:
+        working_test_ids = store.ids()
+
+    if limit and len(working_test_ids) <= limit and not min_score and not pre_rank:
+        logger.info(f"Working set of {len(working_test_ids)} test cases already fits the shortlist size {limit}")
+        logger.info("--- COMPLETED SHORTLIST_TEST_CASES NODE ---")
+        return {}
+
+    # The index covers the whole suite, so it is built once per suite version and shared by all queries
+    index = get_bm25_index(state["test_cases"])
+    query_terms = shortlist_query_terms(state["query"], state.get("rubric"))
+
+    working_set = set(working_test_ids)
+    ranked = [(str(test_id), score) for test_id, score in index.rank(query_terms, min_score=min_score) if str(test_id) in working_set]
+    if limit:
+        ranked = ranked[:limit]
+
+    shortlisted = [test_id for test_id, _ in ranked]
+    logger.info(f"Shortlisted {len(shortlisted)} of {len(working_test_ids)} test cases with BM25 (limit {limit or 'none'}, min score {min_score})")
+    if ranked:
+        logger.info(f"Top lexical match: {store.get(ranked[0][0]).test_name} (score {ranked[0][1]:.2f})")
+    logger.info("--- COMPLETED SHORTLIST_TEST_CASES NODE ---")
+
+    # Best lexical matches first
+    return {"relevant_test_ids": shortlisted}
@@ -1,5 +1,7 @@
 import logging
 from src.core.state import TestAgentState
+from src.core import config
+from src.utils.scoring import rank_test_cases
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -11,7 +13,9 @@ def sort_test_cases(state: TestAgentState):
     evaluated_test_cases = state["evaluated_test_cases"]
     logger.info(f"Sorting {len(evaluated_test_cases)} evaluated test cases by overall score")
 
-    sorted_test_cases_desc = sorted(evaluated_test_cases, key=lambda x: x['overall_score'], reverse=True)
+    # Scores are (re)computed from the raw dimension scores and the current rubric weights;
+    # in top-K mode only the K best are kept
+    sorted_test_cases_desc = rank_test_cases(evaluated_test_cases, state["rubric"], limit=config.TOP_K or None)
 
     logger.info("=== SORTED BY OVERALL SCORE (HIGHEST TO LOWEST) ===")
     for i, test_case in enumerate(sorted_test_cases_desc, 1):
@@ -0,0 +1,105 @@
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.cache.evaluation_cache import stable_hash
+from src.utils.text import analyze
+
+INDEXED_FIELDS = ("test_name", "file_path", "summary", "steps", "notes")
+
+_NOISE_WORDS = frozenset({"test", "tests", "py", "arrange", "act", "assert"})
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return str(value or "")
+
+
+def index_terms(test_case: Dict[str, Any]) -> List[str]:
+    """Analyzed terms of a test case; name and path count twice as they are the most specific fields."""
+    terms = []
+    for field in INDEXED_FIELDS:
+        field_terms = analyze(_field_text(test_case.get(field)), _NOISE_WORDS)
+        terms.extend(field_terms * 2 if field in ("test_name", "file_path") else field_terms)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index of the test suite.
+
+    Postings are stored per term as NumPy arrays (document indices and term frequencies),
+    so scoring a query only touches the documents that contain its terms.
+    """
+
+    def __init__(self, test_cases: List[Dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.test_ids = [test_case["id"] for test_case in test_cases]
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(test_cases), dtype=np.float32)
+        for doc, test_case in enumerate(test_cases):
+            terms = index_terms(test_case)
+            lengths[doc] = len(terms)
+            for term, count in Counter(terms).items():
+                docs, counts = postings[term]
+                docs.append(doc)
+                counts.append(count)
+
+        n_documents = max(len(test_cases), 1)
+        average_length = float(lengths.mean()) if len(test_cases) else 0.0
+        # Per-document part of the BM25 denominator, computed once
+        self._length_norm = k1 * (1 - b + b * lengths / average_length) if average_length else np.full(len(test_cases), k1, dtype=np.float32)
+
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, (docs, counts) in postings.items():
+            df = len(docs)
+            idf = float(np.log(1 + (n_documents - df + 0.5) / (df + 0.5)))
+            self._postings[term] = (np.asarray(docs, dtype=np.int32), np.asarray(counts, dtype=np.float32), idf)
+
+    def __len__(self) -> int:
+        return len(self.test_ids)
+
+    def score(self, query_terms: List[str]) -> np.ndarray:
+        """BM25 score of every indexed test case for the given analyzed query terms."""
+        scores = np.zeros(len(self.test_ids), dtype=np.float32)
+        for term, query_count in Counter(query_terms).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            docs, counts, idf = posting
+            scores[docs] += query_count * idf * counts * (self.k1 + 1) / (counts + self._length_norm[docs])
+        return scores
+
+    def rank(self, query_terms: List[str], limit: int = 0, min_score: float = 0.0) -> List[Tuple[Any, float]]:
+        """(test id, score) pairs, best first, cut to `limit` results and/or `min_score`."""
+        scores = self.score(query_terms)
+        order = np.argsort(-scores, kind="stable")
+        if limit:
+            order = order[:limit]
+        return [(self.test_ids[doc], float(scores[doc])) for doc in order if scores[doc] >= min_score]
+
+
+_index_cache: "OrderedDict[str, BM25Index]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_bm25_index(test_cases: List[Dict[str, Any]], max_cached: int = 4) -> BM25Index:
+    """Return the index for this exact suite version, building it only the first time it is seen."""
+    key = stable_hash(test_cases)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = BM25Index(test_cases)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > max_cached:
+            _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.cache.evaluation_cache import stable_hash
+
+# Functions, classes and the like whose definition a diff line or hunk header shows
+_DEFINITION_RE = re.compile(r"\b(?:def|class|function|func|fn|interface|struct)\s+([A-Za-z_][A-Za-z0-9_]*)")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_HUNK_RE = re.compile(r"^@@ [^@]* @@(.*)$")
+_DIFF_MARKERS = ("diff --git ", "--- ", "+++ ", "@@ ")
+TEXT_FIELDS = ("test_name", "summary", "steps", "notes")
+
+
+def _normalize_path(path: str) -> str:
+    path = path.strip().strip('"').replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+
+def _diff_path(line: str) -> Optional[str]:
+    """File of a ---/+++ line, without the a/ b/ prefixes and the timestamp some tools append."""
+    path = line[4:].split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return _normalize_path(path)
+
+
+def parse_changes(changes: Union[str, Iterable[str], None]) -> Tuple[List[str], List[str]]:
+    """
+    Changed files and changed symbols of a unified diff, or of a plain list of files.
+
+    A diff is recognized by its ---/+++/@@ lines. Its symbols are the functions and classes
+    whose definition lines were added or removed, or which enclose a hunk (the context git
+    shows after the @@ marker). A list is one file per line (or separated by commas or
+    spaces), and gives no symbols. Both lists keep their first-seen order without duplicates.
+    """
+    if not changes:
+        return [], []
+    if not isinstance(changes, str):
+        return list(dict.fromkeys(_normalize_path(str(path)) for path in changes if str(path).strip())), []
+
+    lines = changes.splitlines()
+    if not any(line.startswith(_DIFF_MARKERS) for line in lines):
+        paths = re.split(r"[\s,]+", changes)
+        return list(dict.fromkeys(_normalize_path(path) for path in paths if path.strip())), []
+
+    files: Dict[str, None] = {}
+    symbols: Dict[str, None] = {}
+    for line in lines:
+        if line.startswith(("--- ", "+++ ")):
+            path = _diff_path(line)
+            if path:
+                files[path] = None
+            continue
+        hunk = _HUNK_RE.match(line)
+        if hunk:
+            text = hunk.group(1)
+        elif line.startswith(("+", "-")):
+            text = line[1:]
+        else:
+            continue
+        for match in _DEFINITION_RE.finditer(text):
+            symbols[match.group(1)] = None
+    return list(files), list(symbols)
+
+
+def _module_name(path: str) -> str:
+    """Module a file stands for: its name without extension, or the package of an __init__ file."""
+    directory, file_name = os.path.split(path)
+    name = file_name.split(".", 1)[0].lower()
+    if name in ("__init__", "index", "mod") and directory:
+        name = os.path.basename(directory).lower()
+    return name
+
+
+def _tested_module(test_file: str) -> str:
+    """Module a test file is named after: tests/test_helpers.py, helpers_test.go and helpers.test.js all test helpers."""
+    stem = os.path.basename(test_file).lower().split(".", 1)[0]
+    if stem.startswith("test_"):
+        return stem[5:]
+    for suffix in ("_test", "_spec"):
+        if stem.endswith(suffix):
+            return stem[: -len(suffix)]
+    return stem
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return str(value or "")
+
+
+def load_impact_map(path: str) -> Dict[str, List[str]]:
+    """
+    Precomputed impact map: a JSON object from source files or symbols to the test files,
+    test ids or pytest node ids (file::test_name) they affect, e.g. derived from per-test coverage.
+    """
+    with open(path, encoding="utf-8") as f:
+        impact_map = json.load(f)
+    if not isinstance(impact_map, dict):
+        raise ValueError(f"Impact map {path} must be a JSON object of source file or symbol -> list of tests")
+    return {
+        _normalize_path(str(source)).lower(): [str(test) for test in (tests if isinstance(tests, list) else [tests])]
+        for source, tests in impact_map.items()
+    }
+
+
+class ImpactIndex:
+    """
+    Deterministic map from changed source files and symbols to the test cases they affect.
+
+    A test case is affected when
+    - its test file was changed itself,
+    - its test file is named after a changed module (src/pkg/helpers.py -> tests/test_helpers.py),
+    - its name, summary, steps or notes mention a changed function or class by name, or
+    - the precomputed impact map lists it (or its file) for a changed file or symbol.
+    """
+
+    def __init__(self, test_cases: List[Dict[str, Any]], impact_map: Optional[Dict[str, List[str]]] = None,
+                 min_symbol_length: int = 3):
+        self.test_ids: List[str] = []
+        self.min_symbol_length = min_symbol_length
+        self._by_id: Dict[str, int] = {}
+        self._by_file: Dict[str, List[int]] = {}
+        self._by_node_id: Dict[str, int] = {}
+        self._by_module: Dict[str, List[str]] = {}
+        self._by_identifier: Dict[str, List[int]] = {}
+        self._impact_map = impact_map or {}
+
+        for test_case in test_cases:
+            test_id = str(test_case["id"])
+            if test_id in self._by_id:
+                # Same rule as the test case store: the first definition wins
+                continue
+            position = len(self.test_ids)
+            self.test_ids.append(test_id)
+            self._by_id[test_id] = position
+            file_path = _normalize_path(test_case.get("file_path") or "")
+            if file_path:
+                if file_path not in self._by_file:
+                    self._by_module.setdefault(_tested_module(file_path), []).append(file_path)
+                self._by_file.setdefault(file_path, []).append(position)
+                if test_case.get("test_name"):
+                    self._by_node_id[f"{file_path}::{test_case['test_name']}"] = position
+            identifiers = set()
+            for field in TEXT_FIELDS:
+                identifiers.update(identifier.lower() for identifier in _IDENTIFIER_RE.findall(_text(test_case.get(field))))
+            for identifier in identifiers:
+                self._by_identifier.setdefault(identifier, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.test_ids)
+
+    def _tests(self, reference: str) -> List[int]:
+        """Test cases an impact map entry refers to: a test file, a pytest node id or a test id."""
+        reference = _normalize_path(reference)
+        if reference in self._by_file:
+            return self._by_file[reference]
+        if reference in self._by_node_id:
+            return [self._by_node_id[reference]]
+        position = self._by_id.get(reference)
+        return [position] if position is not None else []
+
+    def affected(self, changed_files: Iterable[str], changed_symbols: Iterable[str] = ()) -> Dict[str, List[str]]:
+        """
+        Ids of the affected test cases in suite order, each with the reasons it was selected,
+        as "<rule>: <changed file or symbol>" with rule test_file, module, symbol or impact_map.
+        """
+        reasons: Dict[int, List[str]] = {}
+
+        def select(positions: Iterable[int], reason: str):
+            for position in positions:
+                reasons.setdefault(position, [])
+                if reason not in reasons[position]:
+                    reasons[position].append(reason)
+
+        for changed_file in (_normalize_path(path) for path in changed_files):
+            if changed_file in self._by_file:
+                select(self._by_file[changed_file], f"test_file: {changed_file}")
+                continue
+            for test_file in self._by_module.get(_module_name(changed_file), []):
+                select(self._by_file[test_file], f"module: {changed_file}")
+            for test in self._impact_map.get(changed_file.lower(), []):
+                select(self._tests(test), f"impact_map: {changed_file}")
+
+        for symbol in changed_symbols:
+            if len(symbol) < self.min_symbol_length or symbol.startswith("__"):
+                continue
+            select(self._by_identifier.get(symbol.lower(), []), f"symbol: {symbol}")
+            for test in self._impact_map.get(symbol.lower(), []):
+                select(self._tests(test), f"impact_map: {symbol}")
+
+        return {self.test_ids[position]: reasons[position] for position in sorted(reasons)}
+
+
+_index_cache: "OrderedDict[str, ImpactIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_impact_index(
+    test_cases: List[Dict[str, Any]], impact_map_path: str = "", min_symbol_length: int = 3, max_cached: int = 4
+) -> ImpactIndex:
+    """Return the index for this exact suite version and impact map, building it only the first time it is seen."""
+    map_version = (impact_map_path, os.path.getmtime(impact_map_path)) if impact_map_path else None
+    key = stable_hash([test_cases, map_version, min_symbol_length])
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = ImpactIndex(test_cases, load_impact_map(impact_map_path) if impact_map_path else None, min_symbol_length)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > max_cached:
+            _index_cache.popitem(last=False)
+    return index
@@ -1,47 +1,155 @@
 import json
+import logging
 import re
+from typing import Any, Optional, Tuple
+from src.core.metrics import count_parse_failure
 
-def parse_llm_json_response(response_content):
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_OPENING = re.compile(r"[\[{]")
+_CLOSING = {"{": "}", "[": "]"}
+# What may stand between an opening bracket and the next one inside JSON: keys and scalars with their separators
+_JSON_SCALAR = r'(?:"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)'
+_JSON_GAP = re.compile(rf"\s*(?:{_JSON_SCALAR}\s*[,:]\s*)*(?:{_JSON_SCALAR}\s*)?")
+
+
+def _scan_value(text: str, start: int) -> Tuple[Optional[int], Optional[Tuple[int, str]]]:
+    """
+    Follow the brackets of the JSON value opening at text[start], skipping over strings.
+
+    Returns the end of the value when its brackets balance, otherwise (the text ends inside it)
+    None and the last cut point that keeps only complete records: the position after the last
+    complete object of the outermost array of objects, with the brackets that close it there.
+    """
+    expected = []
+    in_string = escaped = False
+    records_depth = None
+    last_record = None
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSING:
+            if char == "{" and records_depth is None and expected and expected[-1] == "]":
+                records_depth = len(expected)
+            expected.append(_CLOSING[char])
+        elif char in "}]":
+            if expected.pop() != char:
+                # Mismatched brackets, this is not JSON
+                return i + 1, None
+            if not expected:
+                return i + 1, None
+            if char == "}" and len(expected) == records_depth:
+                last_record = (i + 1, "".join(reversed(expected)))
+    return None, last_record
+
+
+def _is_prose_bracket(text: str, start: int) -> bool:
+    """Whether the text between the bracket at text[start] and the next one cannot be part of JSON."""
+    next_opening = _OPENING.search(text, start + 1)
+    gap = text[start + 1 : next_opening.start() if next_opening else len(text)]
+    return _JSON_GAP.fullmatch(gap) is None
+
+
+def extract_json(text: str, allow_partial: bool = False) -> Any:
+    """
+    Largest JSON object or array in `text`, in a single pass over it.
+
+    Candidates start at a { or [ and end where their brackets balance; prose around them and
+    candidates that are not valid JSON are skipped, and of the valid ones the longest wins, so
+    a short [1] quoted in the prose does not hide the answer. When the text ends inside a value
+    (a response cut off at the token limit) and `allow_partial` is set, the complete records of
+    its outermost array of objects are taken, e.g. the finished test case evaluations. A bracket
+    that is never closed and is followed by prose, e.g. "[0, 5)", is skipped.
+    """
+    best, best_length = None, 0
+    position = 0
+    while True:
+        match = _OPENING.search(text, position)
+        if match is None:
+            return best
+        start = match.start()
+        end, last_record = _scan_value(text, start)
+        if end is None:
+            if _is_prose_bracket(text, start):
+                position = start + 1
+                continue
+            # The text ends inside this value, nothing after it is a candidate of its own
+            if allow_partial and last_record is not None:
+                cut, closing = last_record
+                try:
+                    partial = json.loads(text[start:cut] + closing)
+                except json.JSONDecodeError:
+                    return best
+                return partial if cut - start > best_length else best
+            return best
+        try:
+            value = json.loads(text[start:end])
+        except json.JSONDecodeError:
+            position = end
+            continue
+        if end - start > best_length:
+            best, best_length = value, end - start
+        position = end
+
+
+def _fenced_block(content: str) -> Optional[str]:
+    """Body of the first ``` code block, if it is closed."""
+    fence = content.find("```")
+    if fence == -1:
+        return None
+    body_start = content.find("\n", fence)
+    if body_start == -1:
+        return None
+    body_end = content.find("```", body_start)
+    return content[body_start:body_end] if body_end != -1 else None
+
+
+def parse_llm_json_response(response_content, allow_partial=False):
     """
     Parse JSON from LLM response with comprehensive error handling.
-    
+
     Args:
         response_content (str): The content string from the LLM response
-        
+        allow_partial (bool): For a truncated response, return the complete records it holds
+
     Returns:
-        dict or None: Parsed JSON dictionary or None if parsing fails
+        dict, list or None: Parsed JSON object or array, or None if parsing fails
     """
     if not response_content:
-        print("Empty response content")
+        logger.warning("Empty response content")
+        count_parse_failure()
         return None
-    
+
     # Clean the content
     content = response_content.strip()
-    
-    # Try different extraction methods in order of preference
-    extraction_methods = [
-        # Method 1: Extract from ```json code blocks
-        lambda x: re.search(r'```json\s*\n(.*?)\n```', x, re.DOTALL),
-        # Method 2: Extract from ``` code blocks
-        lambda x: re.search(r'```\s*\n(.*?)\n```', x, re.DOTALL),
-        # Method 3: Look for JSON object starting with {
-        lambda x: re.search(r'(\{.*\})', x, re.DOTALL),
-    ]
-    
-    for method in extraction_methods:
+
+    # Structured output is the JSON document itself
+    if content[:1] in "{[":
         try:
-            match = method(content)
-            if match:
-                json_str = match.group(1).strip()
-                parsed_json = json.loads(json_str)
-                return parsed_json
-        except (json.JSONDecodeError, AttributeError) as e:
-            continue
-    
-    # If all methods fail, try parsing the entire content
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON from response: {e}")
-        print(f"Content preview: {content[:200]}...")
-        return None
+            return json.loads(content)
+        except json.JSONDecodeError:
+            pass
+
+    # A code block is preferred, prose before it may hold brackets of its own
+    fenced = _fenced_block(content)
+    if fenced is not None:
+        parsed_json = extract_json(fenced)
+        if parsed_json is not None:
+            return parsed_json
+
+    parsed_json = extract_json(content, allow_partial)
+    if parsed_json is None:
+        logger.warning("Failed to parse JSON from response")
+        logger.debug(f"Content preview: {content[:200]}...")
+        count_parse_failure()
+    return parsed_json
@@ -0,0 +1,97 @@
+import heapq
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MAX_RAW_SCORE = 5
+
+
+def rubric_weights(rubric: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([float(dimension.get("weight", 1)) for dimension in rubric], dtype=np.float64)
+
+
+def raw_score_matrix(evaluated_test_cases: List[Dict[str, Any]], rubric: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    tests x dimensions matrix of the raw 0-5 scores returned by the LLM.
+
+    Dimension scores are matched to the rubric by dimension_id; scores that are missing or
+    not numeric count as 0.
+    """
+    columns = {str(dimension["id"]): column for column, dimension in enumerate(rubric)}
+    matrix = np.zeros((len(evaluated_test_cases), len(rubric)), dtype=np.float64)
+
+    for row, evaluation in enumerate(evaluated_test_cases):
+        for dimension_score in evaluation.get("dimension_scores") or []:
+            column = columns.get(str(dimension_score.get("dimension_id")))
+            if column is None:
+                continue
+            try:
+                matrix[row, column] = float(dimension_score.get("raw_score", 0))
+            except (TypeError, ValueError):
+                pass
+
+    return np.clip(matrix, 0, MAX_RAW_SCORE)
+
+
+def apply_scores(evaluated_test_cases: List[Dict[str, Any]], rubric: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compute weighted, overall and normalized scores from the raw scores in one vectorized pass.
+
+    Returns new evaluation dicts; the inputs are left untouched so the same raw scores can be
+    re-weighted any number of times.
+    """
+    if not evaluated_test_cases:
+        return []
+
+    weights = rubric_weights(rubric)
+    raw_scores = raw_score_matrix(evaluated_test_cases, rubric)
+    weighted_scores = raw_scores * weights
+    overall_scores = weighted_scores.sum(axis=1)
+    max_overall_score = MAX_RAW_SCORE * weights.sum()
+    normalized_scores = overall_scores / max_overall_score if max_overall_score > 0 else np.zeros_like(overall_scores)
+
+    columns = {str(dimension["id"]): column for column, dimension in enumerate(rubric)}
+    scored = []
+    for row, evaluation in enumerate(evaluated_test_cases):
+        dimension_scores = []
+        for dimension_score in evaluation.get("dimension_scores") or []:
+            column = columns.get(str(dimension_score.get("dimension_id")))
+            weighted_score = float(weighted_scores[row, column]) if column is not None else 0.0
+            dimension_scores.append({**dimension_score, "weighted_score": weighted_score})
+
+        scored.append({
+            **evaluation,
+            "overall_score": float(overall_scores[row]),
+            "normalized_score": round(float(normalized_scores[row]), 4),
+            "dimension_scores": dimension_scores,
+        })
+
+    return scored
+
+
+def reweight_rubric(rubric: List[Dict[str, Any]], weights: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of the rubric with the weights of the given dimension ids replaced."""
+    weights = {str(dimension_id): weight for dimension_id, weight in (weights or {}).items()}
+    return [
+        {**dimension, "weight": float(weights[str(dimension["id"])])} if str(dimension["id"]) in weights else dict(dimension)
+        for dimension in rubric
+    ]
+
+
+def top_k_indices(scored: List[Dict[str, Any]], k: int) -> List[int]:
+    """Positions of the k highest overall scores, best first; ties keep the earlier one. O(n log k)."""
+    return heapq.nlargest(k, range(len(scored)), key=lambda index: (scored[index]["overall_score"], -index))
+
+
+def rank_test_cases(
+    evaluated_test_cases: List[Dict[str, Any]], rubric: List[Dict[str, Any]], limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score evaluations against the rubric and order them by overall score, highest first.
+    With a limit only that many are returned, selected with a bounded heap instead of a full sort.
+    """
+    scored = apply_scores(evaluated_test_cases, rubric)
+    if limit:
+        return [scored[index] for index in top_k_indices(scored, limit)]
+    order = np.argsort([-evaluation["overall_score"] for evaluation in scored], kind="stable")
+    return [scored[index] for index in order]
@@ -0,0 +1,123 @@
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from src.core import config
+from src.utils.tokens import count_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+JSON = "json"
+TABLE = "table"
+
+# Fields each prompt actually needs
+CLUSTERING_TEST_CASE_FIELDS = ("id", "file_path", "test_name", "summary", "steps")
+EVALUATION_TEST_CASE_FIELDS = ("id", "file_path", "test_name", "summary", "steps", "notes")
+# Raw scores do not depend on the weights, so they are left out of the scoring prompt
+SCORING_RUBRIC_FIELDS = ("id", "name", "description", "scoring_criteria")
+# Member ids are not needed to judge relevance, the size is enough
+RELEVANCE_CLUSTER_FIELDS = ("cluster_id", "name", "description", "keywords", "size")
+
+
+def _select(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    selected = {}
+    for field in fields:
+        if field == "size" and "size" not in record and "test_ids" in record:
+            selected["size"] = len(record["test_ids"])
+        elif record.get(field) not in (None, "", [], {}):
+            selected[field] = record[field]
+    return selected
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        text = "; ".join(str(item) for item in value)
+    elif isinstance(value, dict):
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = str(value)
+    # One row per record, so the separators must not appear inside a cell
+    return text.replace("\n", " ").replace("|", "/")
+
+
+def serialize_records(records: Iterable[Dict[str, Any]], fields: Sequence[str], fmt: Optional[str] = None) -> str:
+    """
+    Render records with only the given fields, as compact JSON or as a terse table.
+
+    The table has a header row and one `|` separated row per record; list values are joined
+    with `; `. Empty fields are left out of JSON and left blank in the table.
+    """
+    fmt = fmt or config.PROMPT_FORMAT
+    selected = [_select(record, fields) for record in records]
+    if fmt == TABLE:
+        lines = [" | ".join(fields)]
+        lines.extend("|".join(_cell(record[field]) if field in record else "" for field in fields) for record in selected)
+        return "\n".join(lines)
+    return json.dumps(selected, ensure_ascii=False, separators=(",", ":"))
+
+
+def serialize_test_cases(test_cases: Iterable[Dict[str, Any]], fields: Sequence[str] = EVALUATION_TEST_CASE_FIELDS, fmt: Optional[str] = None) -> str:
+    return serialize_records(test_cases, fields, fmt)
+
+
+def serialize_rubric(rubric: Iterable[Dict[str, Any]], fields: Sequence[str] = SCORING_RUBRIC_FIELDS, fmt: Optional[str] = None) -> str:
+    # Scoring criteria are nested, they read better as JSON than squeezed into a table cell
+    return serialize_records(rubric, fields, JSON if fmt is None else fmt)
+
+
+def serialize_clusters(clusters: Iterable[Dict[str, Any]], fields: Sequence[str] = RELEVANCE_CLUSTER_FIELDS, fmt: Optional[str] = None) -> str:
+    return serialize_records(clusters, fields, fmt)
+
+
+class TokenSavingsReport:
+    """Tokens sent per prompt compared to the plain Python repr the prompts used to embed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prompts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, prompt_name: str, original: Any, serialized: str, model_name: str) -> int:
+        """Count both renderings of one prompt payload; returns the tokens saved."""
+        original_tokens = count_tokens(str(original), model_name)
+        serialized_tokens = count_tokens(serialized, model_name)
+        with self._lock:
+            totals = self._prompts.setdefault(prompt_name, {"calls": 0, "repr_tokens": 0, "serialized_tokens": 0})
+            totals["calls"] += 1
+            totals["repr_tokens"] += original_tokens
+            totals["serialized_tokens"] += serialized_tokens
+        saved = original_tokens - serialized_tokens
+        logger.info(f"Prompt {prompt_name}: {serialized_tokens} payload tokens, {saved} saved vs repr ({original_tokens})")
+        return saved
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            prompts = {name: dict(totals) for name, totals in self._prompts.items()}
+        for totals in prompts.values():
+            totals["saved_tokens"] = totals["repr_tokens"] - totals["serialized_tokens"]
+            totals["saved_percent"] = round(100 * totals["saved_tokens"] / totals["repr_tokens"], 1) if totals["repr_tokens"] else 0.0
+        return prompts
+
+    def reset(self):
+        with self._lock:
+            self._prompts.clear()
+
+
+_token_savings: Optional[TokenSavingsReport] = None
+_token_savings_lock = threading.Lock()
+
+
+def get_token_savings_report() -> TokenSavingsReport:
+    global _token_savings
+    with _token_savings_lock:
+        if _token_savings is None:
+            _token_savings = TokenSavingsReport()
+        return _token_savings
+
+
+def report_token_savings(prompt_name: str, original: Any, serialized: str, model_name: str):
+    """Record the savings of one prompt payload when PROMPT_TOKEN_REPORT is on."""
+    if config.PROMPT_TOKEN_REPORT:
+        get_token_savings_report().record(prompt_name, original, serialized, model_name)
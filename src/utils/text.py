@@ -0,0 +1,96 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Negations ("no", "not", "nor") are kept: "not logged in" and "logged in" must not match
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how i
+if in into is it its itself just me more most my now of off on once only or other our ours out over own same
+she should so some such than that the their them then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours
+""".split())
+
+# Words that appear in almost every prioritization query and carry no meaning for matching them
+QUERY_NOISE_WORDS = frozenset("""
+test tests testing tested run check verify make sure need want please which first priority prioritize
+change changed changes update updated updates modify modified refactor refactored new latest recent recently
+""".split())
+
+_TOKEN_RE = re.compile(r"[A-Za-z][a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, splitting snake_case, camelCase and punctuation."""
+    return [token.lower() for token in _TOKEN_RE.findall(text or "")]
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Very small suffix stripper so that "generation"/"generating"/"generated" land on similar stems."""
+    for suffix in ("ations", "ation", "ings", "ing", "ied", "ies", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+@lru_cache(maxsize=32)
+def _stopwords_with(extra_stopwords: frozenset) -> frozenset:
+    return STOPWORDS | extra_stopwords
+
+
+def analyze(text: str, extra_stopwords: frozenset = frozenset()) -> List[str]:
+    """Tokenize, drop stopwords and stem."""
+    stopwords = _stopwords_with(extra_stopwords) if extra_stopwords else STOPWORDS
+    return [stem(token) for token in tokenize(text) if token not in stopwords and len(token) > 1]
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a user query, used for exact and fuzzy query matching."""
+    return " ".join(analyze(query, QUERY_NOISE_WORDS))
+
+
+def build_tfidf(
+    documents: List[List[str]], max_features: Optional[int] = None
+) -> Tuple[np.ndarray, Dict[str, int], np.ndarray]:
+    """
+    Build an L2-normalized TF-IDF matrix from already analyzed documents.
+
+    Returns:
+        (matrix, vocabulary, idf) where matrix has one row per document and vocabulary maps term -> column
+    """
+    document_frequency = Counter()
+    for tokens in documents:
+        document_frequency.update(set(tokens))
+
+    terms = sorted(document_frequency, key=lambda term: (-document_frequency[term], term))
+    if max_features is not None:
+        terms = terms[:max_features]
+    vocabulary = {term: column for column, term in enumerate(sorted(terms))}
+
+    n_documents = len(documents)
+    idf = np.zeros(len(vocabulary), dtype=np.float32)
+    for term, column in vocabulary.items():
+        # Smoothed idf, same formula as scikit-learn
+        idf[column] = math.log((1 + n_documents) / (1 + document_frequency[term])) + 1
+
+    return transform_tfidf(documents, vocabulary, idf), vocabulary, idf
+
+
+def transform_tfidf(documents: List[List[str]], vocabulary: Dict[str, int], idf: np.ndarray) -> np.ndarray:
+    """Project analyzed documents onto an existing vocabulary/idf, L2-normalized row-wise."""
+    matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    for row, tokens in enumerate(documents):
+        for term, count in Counter(tokens).items():
+            column = vocabulary.get(term)
+            if column is not None:
+                matrix[row, column] = count
+
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
@@ -0,0 +1,63 @@
+import logging
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Rough average for English text and JSON, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str) -> Optional[Any]:
+    """tiktoken encoding of the model, loaded once; None when tiktoken or its data is unavailable."""
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # e.g. tiktoken not installed, or no network access to download the encoding
+        logger.warning(f"No tokenizer for {model_name} ({type(e).__name__}), estimating tokens from text length")
+        return None
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def pack_batches(
+    items: Iterable[Any],
+    token_counts: Iterable[int],
+    max_items: int,
+    input_budget: int,
+    output_budget: int,
+    output_tokens_per_item: int,
+) -> Iterator[List[Any]]:
+    """
+    Greedily pack consecutive items into batches within the item limit and both token budgets.
+
+    `token_counts` is consumed alongside `items`, so it can be a generator and only the items
+    actually packed get counted. An item larger than the input budget still gets a batch of
+    its own. A max_items of 0 means no item limit.
+    """
+    batch, batch_tokens = [], 0
+    for item, tokens in zip(items, token_counts):
+        if batch and (
+            (max_items and len(batch) >= max_items)
+            or batch_tokens + tokens > input_budget
+            or (len(batch) + 1) * output_tokens_per_item > output_budget
+        ):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
@@ -0,0 +1,96 @@
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import app as app_module
+from src.core import config
+from src.jobs import batch
+from src.jobs.batch import load_queries, run_query_batch, write_batch_results
+
+TEST_CASES = [{"id": str(i), "test_name": f"test_{i}", "summary": "s", "steps": []} for i in range(3)]
+
+
+class StubGraph:
+    def __init__(self, failing_query=None):
+        self.failing_query = failing_query
+        self.queries = []
+
+    def invoke(self, state, config=None):
+        self.queries.append(state["query"])
+        if state["query"] == self.failing_query:
+            raise RuntimeError("provider down")
+        return {**state, "sorted_test_cases": state["test_cases"][:2]}
+
+
+def stub_rubrics(monkeypatch, rubric_by_query):
+    monkeypatch.setattr(batch, "create_rubric", lambda state: {"rubric": rubric_by_query[state["query"]]})
+
+
+def test_load_queries_reads_lines_and_json(tmp_path):
+    lines = tmp_path / "queries.txt"
+    lines.write_text("# release 1.2\nFirst query\n\n  Second query  \n")
+    array = tmp_path / "queries.json"
+    array.write_text(json.dumps(["First query", {"query": "Second query"}]))
+
+    assert load_queries(str(lines)) == ["First query", "Second query"]
+    assert load_queries(str(array)) == ["First query", "Second query"]
+
+
+def test_identical_queries_run_once_and_share_the_result(monkeypatch):
+    stub_rubrics(monkeypatch, {"Auth changed": [{"id": "1"}]})
+    graph = StubGraph()
+
+    summary, results = run_query_batch(["Auth changed", "auth  CHANGED"], TEST_CASES, graph=graph)
+
+    assert graph.queries == ["Auth changed"]
+    assert summary["distinct_queries"] == 1
+    assert summary["results"][1]["duplicate_of"] == 0
+    assert results[0] is results[1]
+
+
+def test_queries_are_grouped_by_rubric_and_failures_are_isolated(monkeypatch):
+    rubric_a, rubric_b = [{"id": "1", "name": "a"}], [{"id": "1", "name": "b"}]
+    stub_rubrics(monkeypatch, {"q1": rubric_a, "q2": rubric_b, "q3": rubric_a})
+    graph = StubGraph(failing_query="q2")
+
+    summary, results = run_query_batch(["q1", "q2", "q3"], TEST_CASES, max_concurrency=1, graph=graph)
+
+    assert summary["distinct_rubrics"] == 2
+    assert summary["results"][0]["rubric_group"] == summary["results"][2]["rubric_group"]
+    # Queries sharing a rubric run one after the other, so the second one reuses cached scores
+    assert graph.queries.index("q3") == graph.queries.index("q1") + 1
+    assert (summary["succeeded"], summary["failed"]) == (2, 1)
+    assert summary["results"][1]["error"] == "provider down"
+    assert results[1] is None and len(results[2]["sorted_test_cases"]) == 2
+
+
+def test_results_and_summary_are_written_per_query(monkeypatch, tmp_path):
+    stub_rubrics(monkeypatch, {"q1": [{"id": "1"}], "q2": [{"id": "2"}]})
+    summary, results = run_query_batch(["q1", "q2"], TEST_CASES, graph=StubGraph())
+
+    summary_path = write_batch_results(str(tmp_path), summary, results)
+
+    assert sorted(os.listdir(tmp_path)) == ["query_001.json", "query_002.json", "summary.json"]
+    written = json.loads((tmp_path / "query_002.json").read_text())
+    assert written["query"] == "q2" and written["result"]["query"] == "q2"
+    assert json.loads(open(summary_path).read())["results"][0]["result_file"] == "query_001.json"
+
+
+def test_the_batch_endpoint_rejects_bad_concurrency_and_reports_errors_as_json(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MAX_CONCURRENCY", 4)
+    client = app_module.app.test_client()
+    body = {"queries": ["q1"], "test_cases": TEST_CASES}
+
+    for max_concurrency in (0, 5, "many", 2.5, True):
+        response = client.post("/batch", json={**body, "max_concurrency": max_concurrency})
+        assert response.status_code == 400
+        assert "max_concurrency" in response.get_json()["error"]
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("checkpoint database locked")
+
+    monkeypatch.setattr(app_module, "run_query_batch", unavailable)
+    response = client.post("/batch", json={**body, "max_concurrency": 2})
+    assert response.status_code == 500
+    assert response.get_json()["error"] == "Error running batch: checkpoint database locked"
@@ -0,0 +1,26 @@
+from src.retrieval.bm25 import BM25Index, get_bm25_index
+from src.api.tc_file import nl_test_cases
+from src.utils.text import analyze
+
+
+def test_url_query_ranks_url_generation_tests_first():
+    index = BM25Index(nl_test_cases)
+
+    ranked = index.rank(analyze("We updated the url_for URL generation algorithm"), limit=3)
+
+    assert {test_id for test_id, _ in ranked} == {"1", "2", "3"}
+    assert all(score > 0 for _, score in ranked)
+
+
+def test_min_score_drops_unrelated_test_cases():
+    index = BM25Index(nl_test_cases)
+
+    ranked = index.rank(analyze("teardown exception"), min_score=0.01)
+
+    assert ranked
+    assert len(ranked) < len(nl_test_cases)
+
+
+def test_index_is_built_once_per_suite_version():
+    assert get_bm25_index(nl_test_cases) is get_bm25_index(list(nl_test_cases))
+    assert get_bm25_index(nl_test_cases) is not get_bm25_index(nl_test_cases[:5])
@@ -0,0 +1,100 @@
+import importlib
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.api import llm_client
+from src.core import config
+
+# src.nodes re-exports the node function under the module's name
+evaluation = importlib.import_module("src.nodes.evaluate_test_cases")
+
+RUBRIC = [{"id": "1", "name": "relevance", "weight": 1}]
+
+
+def evaluation_of(test_id, raw_score, tier="fast", confidence=0.9):
+    return {
+        "test_id": test_id,
+        "test_name": f"t{test_id}",
+        "dimension_scores": [{"dimension_id": "1", "raw_score": raw_score}],
+        "confidence": confidence,
+        "model_tier": tier,
+    }
+
+
+def test_cascade_candidates_are_uncertain_or_near_the_top_k_boundary(monkeypatch):
+    monkeypatch.setattr(config, "CASCADE_MARGIN", 0.1)
+    monkeypatch.setattr(config, "CASCADE_MIN_CONFIDENCE", 0.6)
+    evaluations = [
+        evaluation_of("0", 5),
+        evaluation_of("1", 3),
+        evaluation_of("2", 3, tier="strong"),
+        evaluation_of("3", 0, confidence=0.3),
+        {**evaluation_of("4", 0), "dimension_scores": [], "error": "No valid result"},
+        evaluation_of("5", 1),
+    ]
+
+    # The second best scores 3, so the other 3 is at the boundary; the strong model's score is kept
+    assert evaluation._cascade_candidates(evaluations, RUBRIC, 2) == [1, 3, 4]
+    # With no more than k test cases everything is in the top k, only uncertain scores are escalated
+    assert evaluation._cascade_candidates(evaluations, RUBRIC, 6) == [3, 4]
+
+
+class TieredModel:
+    """The strong model scores test case i with i % 6; the fast one is off by one for odd ids."""
+
+    def __init__(self, tier):
+        self.tier = tier
+        self.scored = []
+
+    def invoke(self, messages, **kwargs):
+        test_ids = [record["id"] for record in json.loads(messages[-1].content.split("Test Cases:")[1].split("Rubric:")[0])]
+        self.scored.extend(test_ids)
+        evaluations = []
+        for test_id in test_ids:
+            raw_score = int(test_id) % 6
+            if self.tier == "fast" and int(test_id) % 2:
+                raw_score = max(0, raw_score - 1)
+            evaluations.append(evaluation_of(test_id, raw_score, tier=None))
+        return AIMessage(content=json.dumps({"evaluations": evaluations}), response_metadata={"finish_reason": "stop"})
+
+
+def test_cascade_rescores_the_boundary_with_the_strong_model(monkeypatch):
+    models = {"fast": TieredModel("fast"), "strong": TieredModel("strong")}
+    monkeypatch.setattr(evaluation, "get_model", lambda tier="strong": models[tier])
+    monkeypatch.setattr(evaluation, "get_evaluation_cache", lambda: None)
+    for setting, value in [("EVALUATION_MODEL_TIER", "cascade"), ("CASCADE_TOP_K", 3), ("CASCADE_MARGIN", 0.1),
+                           ("CASCADE_MIN_CONFIDENCE", 0.6), ("TOP_K", 0), ("EVALUATION_BATCH_SIZE", 20),
+                           ("PROMPT_FORMAT", "json")]:
+        monkeypatch.setattr(config, setting, value)
+    test_cases = [{"id": str(i), "test_name": f"t{i}", "summary": "", "steps": []} for i in range(12)]
+    state = {"query": "q", "rubric": RUBRIC, "test_cases": test_cases, "evaluated_test_cases": []}
+
+    result = evaluation.evaluate_test_cases(state)
+
+    assert sorted(models["fast"].scored, key=int) == [str(i) for i in range(12)]
+    # The fast model puts 4 and 10 (score 4) in the top 3; 5 and 11 (4 by the fast model, 5 in truth)
+    # tie with them at the boundary, so the strong model re-scores those four
+    assert sorted(models["strong"].scored, key=int) == ["4", "5", "10", "11"]
+    by_id = {e["test_id"]: e for e in result["evaluated_test_cases"]}
+    assert by_id["5"]["model_tier"] == "strong" and by_id["5"]["dimension_scores"][0]["raw_score"] == 5
+    assert by_id["3"]["model_tier"] == "fast"
+    assert [e["test_id"] for e in result["evaluated_test_cases"]] == [str(i) for i in range(12)]
+
+
+def test_fake_fast_tier_is_faster_and_noisier(monkeypatch):
+    monkeypatch.setattr(config, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(config, "FAKE_LLM_LATENCY_SECONDS", 0.4)
+    monkeypatch.setattr(config, "FAKE_LLM_FAST_SPEEDUP", 4.0)
+
+    strong = llm_client.create_llm_client(llm_client.model_name_for("strong")).chat_model
+    fast = llm_client.create_llm_client(llm_client.model_name_for("fast")).chat_model
+
+    assert (strong.latency_seconds, strong.score_noise) == (0.4, 0)
+    assert (fast.latency_seconds, fast.score_noise) == (0.1, 1)
+    with pytest.raises(ValueError):
+        llm_client.model_name_for("cascade")
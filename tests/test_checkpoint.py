@@ -0,0 +1,127 @@
+import importlib
+import os
+import sqlite3
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+from benchmarks.synthetic import generate_suite
+from src.api import llm_client
+from src.api.fake_llm import FakeChatModel
+from src.api.llm_client import LLMClient
+from src.core import checkpoint, config
+from src.core.checkpoint import (
+    ThreadInUseError, UnknownRunError, ensure_new_thread, get_checkpointed_graph, resume_run, run_config, run_status
+)
+from src.core.graph import are_all_tc_evaluated
+
+# src.nodes re-exports the node function under the module's name
+sort_node = importlib.import_module("src.nodes.sort_test_cases")
+
+
+@pytest.fixture
+def graph(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_client, "_models", {"strong": LLMClient(FakeChatModel(), "gpt-4o")})
+    for setting in ("EVALUATION_CACHE_ENABLED", "RUBRIC_CACHE_ENABLED", "CLUSTERING_INCREMENTAL"):
+        monkeypatch.setattr(config, setting, False)
+    monkeypatch.setattr(config, "CHECKPOINT_ENABLED", True)
+    monkeypatch.setattr(config, "CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(checkpoint, "_checkpointed_graph", None)
+    return get_checkpointed_graph()
+
+
+def count_llm_calls(monkeypatch):
+    calls = []
+    generate = FakeChatModel._generate
+
+    def counting_generate(self, *args, **kwargs):
+        calls.append(1)
+        return generate(self, *args, **kwargs)
+
+    monkeypatch.setattr(FakeChatModel, "_generate", counting_generate)
+    return calls
+
+
+def initial_state(query, test_cases):
+    return {
+        "query": query,
+        "changed_files": [],
+        "changed_symbols": [],
+        "test_cases": test_cases,
+        "suite_id": None,
+        "clusters": None,
+        "relevant_clusters": [],
+        "relevant_test_ids": None,
+        "rubric": [],
+        "evaluated_test_cases": [],
+        "sorted_test_cases": [],
+    }
+
+
+def test_ids_missing_from_the_suite_are_not_waited_for():
+    test_cases = [{"id": str(i), "test_name": f"t{i}"} for i in range(3)]
+    state = {"test_cases": test_cases, "relevant_test_ids": ["0", "2", "stale-7"], "evaluated_test_cases": [{}, {}]}
+
+    assert are_all_tc_evaluated(state) == "all_evaluated"
+
+
+def test_a_new_run_cannot_reuse_the_thread_id_of_an_earlier_run(graph):
+    ensure_new_thread(graph, "run-1")
+    graph.invoke(initial_state("We changed URL generation", generate_suite(10)), config=run_config("run-1"))
+
+    assert run_status(graph, "run-1") == "finished"
+    with pytest.raises(ThreadInUseError):
+        ensure_new_thread(graph, "run-1")
+    ensure_new_thread(graph, "run-2")
+
+
+def test_a_crashed_run_resumes_after_a_restart_without_repeating_finished_steps(graph, monkeypatch, tmp_path):
+    calls = count_llm_calls(monkeypatch)
+    suite = generate_suite(40)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr(sort_node, "rank_test_cases", crash)
+    with pytest.raises(RuntimeError):
+        graph.invoke(initial_state("We changed URL generation", suite), config=run_config("run-1"))
+    assert run_status(graph, "run-1") == "interrupted"
+    assert graph.get_state(run_config("run-1")).next == ("sort_test_cases",)
+    calls_before_crash = len(calls)
+
+    monkeypatch.undo()
+    calls = count_llm_calls(monkeypatch)
+    monkeypatch.setattr(config, "CHECKPOINT_ENABLED", True)
+    monkeypatch.setattr(config, "CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    # A new process starts with a new saver on the same database
+    monkeypatch.setattr(checkpoint, "_checkpointed_graph", None)
+    restarted = get_checkpointed_graph()
+    result = resume_run(restarted, "run-1")
+
+    assert calls_before_crash > 0 and calls == []
+    assert result["test_cases"] == suite
+    assert len(result["sorted_test_cases"]) == len(result["evaluated_test_cases"]) > 0
+    assert run_status(restarted, "run-1") == "finished"
+    # Resuming a finished run only returns its final state
+    assert resume_run(restarted, "run-1")["sorted_test_cases"] == result["sorted_test_cases"]
+    with pytest.raises(UnknownRunError):
+        resume_run(restarted, "run-2")
+
+
+def test_the_suite_is_stored_once_and_old_threads_are_pruned(graph, tmp_path):
+    suite = generate_suite(40)
+    for thread_id in ("run-1", "run-2"):
+        graph.invoke(initial_state("We changed URL generation", suite), config=run_config(thread_id))
+    db = sqlite3.connect(tmp_path / "checkpoints.sqlite")
+
+    assert db.execute("SELECT COUNT(*) FROM suites").fetchone() == (1,)
+    suite_size = db.execute("SELECT LENGTH(test_cases) FROM suites").fetchone()[0]
+    (largest_checkpoint,) = db.execute("SELECT MAX(LENGTH(checkpoint)) FROM checkpoints").fetchone()
+    (largest_write,) = db.execute("SELECT MAX(LENGTH(value)) FROM writes").fetchone()
+    assert largest_checkpoint < suite_size and largest_write < suite_size
+
+    graph.checkpointer.max_age_seconds = -1
+    assert graph.checkpointer.prune() == 2
+    assert run_status(graph, "run-1") is None
+    assert db.execute("SELECT COUNT(*) FROM suites").fetchone() == (0,)
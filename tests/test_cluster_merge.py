@@ -0,0 +1,54 @@
+import pytest
+
+from src.clustering.merge import apply_merges, clean_clusters, coverage_errors, finalize_clusters, UNCLUSTERED_NAME
+
+
+def test_clean_clusters_drops_unknown_and_repeated_ids():
+    assigned = set()
+    groups = clean_clusters(
+        [
+            {"name": "A", "test_ids": [1, "2", "nope"]},
+            {"name": "B", "test_ids": ["2", 3]},
+            {"name": "C", "test_ids": ["1"]},
+        ],
+        ["1", "2", "3"],
+        assigned,
+    )
+
+    assert [(group["name"], group["test_ids"]) for group in groups] == [("A", ["1", "2"]), ("B", ["3"])]
+    assert assigned == {"1", "2", "3"}
+
+
+def test_apply_merges_keeps_groups_the_llm_skipped():
+    groups = [
+        {"key": "0", "name": "URLs", "description": "", "keywords": ["url"], "test_ids": ["1"]},
+        {"key": "1", "name": "URL building", "description": "", "keywords": ["build"], "test_ids": ["2"]},
+        {"key": "2", "name": "Sessions", "description": "", "keywords": [], "test_ids": ["3"]},
+    ]
+
+    merged = apply_merges(groups, [{"name": "URL generation", "merged_keys": ["0", "1", "0"]}])
+
+    assert [(group["name"], group["test_ids"], group["keywords"]) for group in merged] == [
+        ("URL generation", ["1", "2"], ["url", "build"]),
+        ("Sessions", ["3"], []),
+    ]
+
+
+def test_finalize_collects_unclustered_test_cases_and_numbers_clusters():
+    test_cases = [{"id": "1"}, {"id": "2"}, {"id": 3}]
+    groups = [{"name": "A", "description": "", "keywords": [], "test_ids": ["1"]}]
+
+    clusters = finalize_clusters(groups, test_cases)["clusters"]
+
+    assert [(cluster["cluster_id"], cluster["name"], cluster["test_ids"]) for cluster in clusters] == [
+        (1, "A", ["1"]),
+        (2, UNCLUSTERED_NAME, ["2", 3]),
+    ]
+
+
+def test_coverage_violations_are_reported():
+    clusters = [{"test_ids": ["1", "2"]}, {"test_ids": ["2", "9"]}]
+
+    assert coverage_errors(clusters, ["1", "2", "3"]) == (["3"], ["2"], ["9"])
+    with pytest.raises(ValueError):
+        finalize_clusters([{"name": "A", "description": "", "keywords": [], "test_ids": ["1", "1"]}], [{"id": "1"}])
@@ -0,0 +1,67 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.cache import evaluation_cache
+from src.cache.evaluation_cache import EvaluationCache
+
+
+test_case = {"id": "1", "test_name": "test_basic_url_generation", "summary": "url_for builds https URLs", "steps": [], "notes": []}
+rubric = [{"id": "1", "name": "URL Generation", "weight": 5}]
+
+
+def test_key_is_stable_and_content_sensitive():
+    key = EvaluationCache.make_key(test_case, rubric, "gpt-4o")
+
+    assert key == EvaluationCache.make_key(dict(reversed(list(test_case.items()))), rubric, "gpt-4o")
+    assert key != EvaluationCache.make_key({**test_case, "summary": "changed"}, rubric, "gpt-4o")
+    assert key != EvaluationCache.make_key(test_case, rubric, "gpt-4o-mini")
+
+
+def test_hits_misses_and_size_eviction(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "evaluations.sqlite"), max_entries=2, max_age_seconds=3600)
+
+    cache.put_many({"a": {"test_name": "a"}})
+    time.sleep(0.01)
+    cache.put_many({"b": {"test_name": "b"}})
+    time.sleep(0.01)
+    cache.put_many({"c": {"test_name": "c"}})
+
+    found = cache.get_many(["a", "b", "c"])
+
+    assert set(found) == {"b", "c"}
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = EvaluationCache(str(tmp_path / "evaluations.sqlite"), max_entries=10, max_age_seconds=0)
+
+    cache.put_many({"a": {"test_name": "a"}})
+    time.sleep(0.01)
+
+    assert cache.get_many(["a"]) == {}
+
+
+def test_every_connection_is_closed_and_writes_are_committed(tmp_path, monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        connections.append(connect(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(evaluation_cache.sqlite3, "connect", tracking_connect)
+    path = str(tmp_path / "evaluations.sqlite")
+    cache = EvaluationCache(path, max_entries=10, max_age_seconds=3600)
+    cache.put_many({"a": {"test_name": "a"}})
+    cache.get_many(["a", "b"])
+    cache.stats()
+
+    assert len(connections) == 4
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    assert set(EvaluationCache(path, max_entries=10, max_age_seconds=3600).get_many(["a"])) == {"a"}
@@ -0,0 +1,99 @@
+import importlib
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from langchain_core.messages import AIMessage
+
+from src.core import config
+
+# src.nodes re-exports the node function under the module's name
+evaluation = importlib.import_module("src.nodes.evaluate_test_cases")
+
+BATCH = [{"id": str(i), "test_name": f"t{i}", "summary": "", "steps": []} for i in range(5)]
+KEYS = [f"k{i}" for i in range(5)]
+RUBRIC = [{"id": "1", "name": "d"}]
+
+
+def evaluation_of(test_id):
+    return {
+        "test_id": test_id,
+        "test_name": f"t{test_id}",
+        "dimension_scores": [{"dimension_id": "1", "raw_score": 3}],
+        "explanation": "",
+    }
+
+
+class ScriptedModel:
+    """Answers every call with respond(ids of the test cases in the prompt, call number)."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.batches = []
+
+    def invoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        test_ids = [test_case["id"] for test_case in BATCH if f'"test_name":"{test_case["test_name"]}"' in prompt]
+        self.batches.append(test_ids)
+        content, finish_reason = self.respond(test_ids, len(self.batches))
+        return AIMessage(content=content, response_metadata={"finish_reason": finish_reason})
+
+
+def score(monkeypatch, respond):
+    model = ScriptedModel(respond)
+    monkeypatch.setattr(evaluation, "get_model", lambda tier="strong": model)
+    return model, evaluation._score_and_cache_batch(BATCH, KEYS, RUBRIC, None)
+
+
+def answer(test_ids):
+    return json.dumps({"evaluations": [evaluation_of(test_id) for test_id in test_ids]})
+
+
+def test_results_are_matched_by_id_and_only_missing_test_cases_are_retried(monkeypatch):
+    def respond(test_ids, call):
+        # The first response skips a test case and lists the others out of order
+        if call == 1:
+            return answer(["4", "2", "0", "1"]), "stop"
+        return answer(test_ids), "stop"
+
+    model, results = score(monkeypatch, respond)
+
+    assert model.batches == [["0", "1", "2", "3", "4"], ["3"]]
+    assert sorted(results) == ["0", "1", "2", "3", "4"]
+    assert all(results[test_id]["test_id"] == test_id for test_id in results)
+
+
+def test_truncated_batch_only_scores_the_unfinished_test_cases_again(monkeypatch):
+    def respond(test_ids, call):
+        content = answer(test_ids)
+        if call == 1:
+            return content[:content.index('{"test_id": "2"')], "length"
+        return content, "stop"
+
+    model, results = score(monkeypatch, respond)
+
+    assert model.batches == [["0", "1", "2", "3", "4"], ["2", "3", "4"]]
+    assert not any("error" in result for result in results.values())
+
+
+def test_malformed_batch_is_bisected_and_bad_test_cases_get_an_error_record(monkeypatch):
+    def respond(test_ids, call):
+        # Test case 3 always breaks the response
+        return ("not json", "stop") if "3" in test_ids else (answer(test_ids), "stop")
+
+    model, results = score(monkeypatch, respond)
+
+    assert model.batches == [["0", "1", "2", "3", "4"], ["0", "1"], ["2", "3", "4"], ["2"], ["3", "4"], ["3"], ["4"]]
+    assert "error" in results["3"] and results["3"]["test_name"] == "t3"
+    assert sorted(test_id for test_id, result in results.items() if "error" not in result) == ["0", "1", "2", "4"]
+
+
+def test_retries_stop_at_the_budget(monkeypatch):
+    monkeypatch.setattr(config, "EVALUATION_RETRY_BUDGET", 2)
+
+    model, results = score(monkeypatch, lambda test_ids, call: ("not json", "stop"))
+
+    assert len(model.batches) == 3
+    assert sorted(results) == ["0", "1", "2", "3", "4"]
+    assert all("error" in result for result in results.values())
@@ -0,0 +1,61 @@
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from benchmarks.pipeline import run_once
+from benchmarks.synthetic import generate_suite
+from src.api.fake_llm import FakeChatModel
+from src.api import llm_client
+from src.api.llm_client import LLMClient
+from src.core import config
+from src.utils.parse_llm import parse_llm_json_response
+from src.utils.serialize import serialize_rubric, serialize_test_cases
+
+
+def ask(model, system_prompt, user_prompt):
+    response = model.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+    return response, parse_llm_json_response(response.content)
+
+
+def test_answers_are_deterministic_and_report_usage():
+    model = FakeChatModel()
+    prompt = "Create a test prioritization rubric based on this query:\nURL generation changed"
+
+    first, rubric = ask(model, "You are a test rubric generation assistant.", prompt)
+    second, _ = ask(model, "You are a test rubric generation assistant.", prompt)
+
+    assert first.content == second.content
+    assert [dimension["id"] for dimension in rubric["rubric"]] == ["1", "2", "3"]
+    assert first.usage_metadata["input_tokens"] > 0 and first.usage_metadata["output_tokens"] > 0
+
+
+def test_scores_every_test_case_of_either_prompt_format():
+    model = FakeChatModel()
+    _, rubric = ask(model, "You are a test rubric generation assistant.", "based on this query: url routing")
+    test_cases = generate_suite(10)
+
+    for fmt in ("json", "table"):
+        prompt = f"Test Cases:\n{serialize_test_cases(test_cases, fmt=fmt)}\nRubric:\n{serialize_rubric(rubric['rubric'])}"
+        _, scores = ask(model, "You are a test case scoring assistant.", prompt)
+
+        assert [score["test_name"] for score in scores] == [test_case["test_name"] for test_case in test_cases]
+        by_area = {score["test_name"].split("_")[1]: score["dimension_scores"][0]["raw_score"] for score in scores}
+        assert by_area["url"] > by_area["payment"]
+
+
+def test_benchmark_run_profiles_every_node(monkeypatch):
+    monkeypatch.setattr(llm_client, "_models", {"strong": LLMClient(FakeChatModel(), "gpt-4o")})
+    for setting in ("EVALUATION_CACHE_ENABLED", "RUBRIC_CACHE_ENABLED", "CLUSTERING_INCREMENTAL"):
+        monkeypatch.setattr(config, setting, False)
+    from src.core.graph import get_compiled_graph
+
+    result = run_once(get_compiled_graph(), "We changed URL generation", generate_suite(60))
+
+    assert result["sorted_test_cases"] > 0
+    assert result["nodes"]["evaluate_test_cases"]["llm_calls"] >= 1
+    assert result["llm_calls"] == sum(node["llm_calls"] for node in result["nodes"].values())
+    assert set(result["nodes"]) >= {"create_clusters", "pick_relevant_clusters", "create_rubric", "sort_test_cases"}
+    json.dumps(result)
@@ -0,0 +1,88 @@
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from benchmarks.pipeline import run_once
+from benchmarks.synthetic import generate_suite
+from src.api import llm_client
+from src.api.fake_llm import FakeChatModel
+from src.api.llm_client import LLMClient
+from src.core import config
+from src.retrieval.impact import ImpactIndex, get_impact_index, parse_changes
+
+DIFF = """diff --git a/src/flask/helpers.py b/src/flask/helpers.py
+index 1a2b3c4..5d6e7f8 100644
+--- a/src/flask/helpers.py
++++ b/src/flask/helpers.py
+@@ -180,7 +180,8 @@ def url_for(
+-    return current_app.url_for(endpoint, **values)
++    values.setdefault("_scheme", None)
++    return current_app.url_for(endpoint, **values)
+@@ -300,3 +301,6 @@ class Config:
++def _split_blueprint_path(name):
++    return name.split(".")
+diff --git a/src/flask/old.py b/src/flask/old.py
+deleted file mode 100644
+--- a/src/flask/old.py
++++ /dev/null
+"""
+
+SUITE = [
+    {"id": "1", "file_path": "tests/test_helpers.py", "test_name": "test_send_file", "summary": "Sends a file"},
+    {"id": "2", "file_path": "tests/test_appctx.py", "test_name": "test_url_generation", "summary": "Calls flask.url_for('index')"},
+    {"id": "3", "file_path": "tests/test_appctx.py", "test_name": "test_teardown", "summary": "Runs teardown callbacks"},
+    {"id": "4", "file_path": "tests/test_blueprints.py", "test_name": "test_nesting", "summary": "Nested blueprints"},
+    {"id": "5", "file_path": "tests/test_config.py", "test_name": "test_from_object", "summary": "Loads a Config object"},
+]
+
+
+def test_diffs_give_files_and_symbols_lists_give_files():
+    assert parse_changes(DIFF) == (
+        ["src/flask/helpers.py", "src/flask/old.py"],
+        ["url_for", "Config", "_split_blueprint_path"],
+    )
+    assert parse_changes("src/flask/app.py\n./src/flask/ctx.py, src/flask/app.py") == (["src/flask/app.py", "src/flask/ctx.py"], [])
+    assert parse_changes(["src/flask/app.py"]) == (["src/flask/app.py"], [])
+    assert parse_changes(None) == ([], [])
+
+
+def test_affected_test_cases_by_test_file_module_and_symbol():
+    index = ImpactIndex(SUITE)
+
+    affected = index.affected(["src/flask/helpers.py", "tests/test_blueprints.py"], ["url_for", "Config", "id"])
+
+    assert affected == {
+        "1": ["module: src/flask/helpers.py"],
+        "2": ["symbol: url_for"],
+        "4": ["test_file: tests/test_blueprints.py"],
+        "5": ["symbol: Config"],
+    }
+    assert index.affected(["README.md"], ["__init__"]) == {}
+
+
+def test_impact_map_entries_select_files_node_ids_and_test_ids(tmp_path):
+    impact_map = tmp_path / "impact.json"
+    impact_map.write_text(json.dumps({
+        "src/flask/ctx.py": ["tests/test_appctx.py::test_teardown", "4"],
+        "render_template": "tests/test_helpers.py",
+    }))
+
+    index = get_impact_index(SUITE, str(impact_map))
+
+    assert list(index.affected(["src/flask/ctx.py"], ["render_template"])) == ["1", "3", "4"]
+    assert get_impact_index(list(SUITE), str(impact_map)) is index
+
+
+def test_changes_skip_clustering_and_narrow_the_working_set(monkeypatch):
+    monkeypatch.setattr(llm_client, "_models", {"strong": LLMClient(FakeChatModel(), "gpt-4o")})
+    for setting in ("EVALUATION_CACHE_ENABLED", "RUBRIC_CACHE_ENABLED", "CLUSTERING_INCREMENTAL"):
+        monkeypatch.setattr(config, setting, False)
+    from src.core.graph import get_compiled_graph
+    suite = generate_suite(100)
+    changed = [test_case["file_path"] for test_case in suite if test_case["file_path"].startswith("tests/url/")][:1]
+
+    result = run_once(get_compiled_graph(), "We changed URL generation", suite, changes="\n".join(changed))
+
+    assert "create_clusters" not in result["nodes"] and "pick_relevant_clusters" not in result["nodes"]
+    assert set(result["ranking"]) == {test_case["id"] for test_case in suite if test_case["file_path"] in changed}
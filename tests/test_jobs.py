@@ -0,0 +1,131 @@
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+
+import app as app_module
+from src.core import config
+from src.jobs.runner import JobRunner
+from src.jobs.store import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobStore, QueueFullError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"), stale_after_seconds=60, retention_seconds=3600)
+
+
+class FakeGraph:
+    """Streams one update per node like the compiled graph; fails or waits where told to."""
+
+    def __init__(self, nodes=("create_rubric", "sort_test_cases"), error=None, before_node=None):
+        self.nodes = nodes
+        self.error = error
+        self.before_node = before_node or (lambda node, job_id: None)
+
+    def stream(self, input, config, stream_mode):
+        for node in self.nodes:
+            # The runner uses the job id as thread id
+            self.before_node(node, config["configurable"]["thread_id"])
+            if self.error is not None and node == self.nodes[-1]:
+                raise self.error
+            update = {"sorted_test_cases": [{"test_id": "1"}]} if node == "sort_test_cases" else {"rubric": []}
+            yield "updates", {node: update}
+
+
+def test_a_job_is_submitted_claimed_and_finished(store):
+    job_id = store.submit({"query": "q", "test_cases": []}, max_queued=2)
+    assert store.get(job_id)["status"] == QUEUED
+
+    job = store.claim_next("worker-1")
+    assert job == {"job_id": job_id, "input": {"query": "q", "test_cases": []}}
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.claim_next("worker-2") is None
+
+    store.finish(job_id, SUCCEEDED, result={"sorted_test_cases": []})
+    finished = store.get(job_id)
+    assert finished["status"] == SUCCEEDED and finished["result"] == {"sorted_test_cases": []}
+    assert store.queue_depth() == {QUEUED: 0, RUNNING: 0}
+
+
+def test_queued_jobs_are_cancelled_at_once_running_jobs_at_their_next_step(store):
+    queued = store.submit({"query": "a"}, max_queued=3)
+    running = store.submit({"query": "b"}, max_queued=3)
+    assert store.claim_next("worker-1")["job_id"] == queued
+    store.claim_next("worker-1")
+
+    assert store.cancel(queued) == RUNNING
+    assert store.update_progress(queued, {"node": "create_rubric"}) is True
+    third = store.submit({"query": "c"}, max_queued=3)
+    assert store.cancel(third) == CANCELLED
+    assert store.claim_next("worker-1") is None
+    assert store.update_progress(running, {"node": "create_rubric"}) is False
+    assert store.cancel("unknown") is None
+
+
+def test_a_full_queue_is_rejected_with_429(store, monkeypatch):
+    store.submit({"query": "a"}, max_queued=1)
+    with pytest.raises(QueueFullError):
+        store.submit({"query": "b"}, max_queued=1)
+
+    # An idle runner, so nothing is executed in the background
+    monkeypatch.setattr(app_module, "_job_runner", JobRunner(store, graph=None, max_workers=0))
+    monkeypatch.setattr(config, "JOBS_MAX_QUEUED", 1)
+    test_cases = [{"id": "1", "test_name": "t", "summary": "", "steps": []}]
+    response = app_module.app.test_client().post("/jobs", json={"query": "q", "test_cases": test_cases})
+
+    assert response.status_code == 429
+
+
+def test_jobs_without_a_heartbeat_are_failed_and_finished_jobs_expire(store):
+    stale = store.submit({"query": "a"}, max_queued=5)
+    store.claim_next("worker-1")
+    store.stale_after_seconds = -1
+
+    store.submit({"query": "b"}, max_queued=5)
+    assert store.get(stale)["status"] == FAILED and store.get(stale)["error"] == "Worker stopped responding"
+
+    # The worker that lost its job to the stale check cannot overwrite the failure
+    assert not store.finish(stale, SUCCEEDED, result={"sorted_test_cases": []})
+    assert store.get(stale)["status"] == FAILED
+
+    store.retention_seconds = -1
+    queued = store.submit({"query": "c"}, max_queued=5)
+    assert store.get(stale) is None
+    assert store.get(queued)["status"] == QUEUED
+
+
+def test_the_runner_moves_jobs_to_succeeded_failed_or_cancelled(store):
+    def run(graph):
+        job_id = store.submit({"query": "q", "test_cases": [{"id": "1"}]}, max_queued=5)
+        JobRunner(store, graph, max_workers=1)._run(store.claim_next("worker-1"))
+        return store.get(job_id)
+
+    succeeded = run(FakeGraph())
+    assert succeeded["status"] == SUCCEEDED
+    assert succeeded["progress"]["node"] == "sort_test_cases"
+    assert succeeded["result"]["total_test_cases"] == 1 and succeeded["result"]["sorted_test_cases_count"] == 1
+
+    failed = run(FakeGraph(error=RuntimeError("LLM unavailable")))
+    assert failed["status"] == FAILED and failed["error"] == "LLM unavailable"
+
+    def cancel_job(node, job_id):
+        store.cancel(job_id)
+
+    cancelled = run(FakeGraph(before_node=cancel_job))
+    assert cancelled["status"] == CANCELLED and cancelled["progress"]["node"] == "create_rubric"
+
+
+def test_a_long_graph_step_keeps_its_job_alive(store):
+    job_id = store.submit({"query": "q", "test_cases": [{"id": "1"}]}, max_queued=5)
+    store.stale_after_seconds = 0.2
+
+    def slow_step(node, job_id):
+        time.sleep(0.5)
+        # Another process submitting a job fails the stale ones
+        store.submit({"query": "other"}, max_queued=5)
+
+    graph = FakeGraph(nodes=("create_rubric",), before_node=slow_step)
+    JobRunner(store, graph, max_workers=1, heartbeat_interval=0.05)._run(store.claim_next("worker-1"))
+    assert store.get(job_id)["status"] == SUCCEEDED
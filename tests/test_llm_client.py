@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.api.llm_client import LLMClient, get_http_clients
+from src.api.rate_limit import TokenBucket
+
+
+def _completion(content):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+    }
+
+
+@pytest.fixture
+def stub_server():
+    """Local OpenAI-compatible endpoint answering with the scripted (status, body) responses in order."""
+    responses = []
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            status, body = responses.pop(0)
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1", responses, requests
+    server.shutdown()
+
+
+def _client(base_url, max_retries=3):
+    chat_model = ChatOpenAI(model="gpt-4o", base_url=base_url, api_key="test", max_retries=0, http_client=get_http_clients()[0])
+    return LLMClient(chat_model, "gpt-4o", requests_per_minute=600, tokens_per_minute=100000, max_retries=max_retries, backoff_base=0.01)
+
+
+def test_throttling_and_server_errors_are_retried(stub_server):
+    base_url, responses, requests = stub_server
+    responses.extend([
+        (429, {"error": {"message": "rate limited"}}),
+        (503, {"error": {"message": "overloaded"}}),
+        (200, _completion("hello")),
+    ])
+
+    response = _client(base_url).invoke([HumanMessage(content="hi")])
+
+    assert response.content == "hello"
+    assert len(requests) == 3
+
+
+def test_client_errors_are_not_retried(stub_server):
+    base_url, responses, requests = stub_server
+    responses.extend([(400, {"error": {"message": "bad request"}}), (200, _completion("unused"))])
+
+    with pytest.raises(openai.BadRequestError):
+        _client(base_url).invoke([HumanMessage(content="hi")])
+    assert len(requests) == 1
+
+
+def test_retries_give_up_after_max_retries(stub_server):
+    base_url, responses, requests = stub_server
+    responses.extend([(500, {"error": {"message": "boom"}})] * 3)
+
+    with pytest.raises(openai.InternalServerError):
+        _client(base_url, max_retries=2).invoke([HumanMessage(content="hi")])
+    assert len(requests) == 3
+
+
+def test_token_bucket_waits_for_refill():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+
+    assert bucket.try_acquire(60) == 0
+    assert bucket.try_acquire(30) == pytest.approx(30)
+    now[0] = 30.0
+    assert bucket.try_acquire(30) == 0
+
+    # Usage above the estimate is taken afterwards and delays the next request
+    bucket.adjust(30)
+    assert bucket.try_acquire(1) == pytest.approx(31)
@@ -0,0 +1,54 @@
+from src.clustering.engine import fit_clusters, build_clusters
+from src.clustering.store import ClusterSnapshot, ClusterStore, default_suite_id
+from src.api.tc_file import nl_test_cases
+
+
+def test_every_test_case_lands_in_exactly_one_cluster():
+    cluster_model, labels = fit_clusters(nl_test_cases, num_clusters=3)
+    clusters = build_clusters(nl_test_cases, cluster_model, labels)
+
+    clustered_ids = [test_id for cluster in clusters for test_id in cluster["test_ids"]]
+    assert sorted(clustered_ids) == sorted(test_case["id"] for test_case in nl_test_cases)
+    assert all(cluster["keywords"] for cluster in clusters)
+
+
+def test_url_generation_tests_are_grouped_together():
+    cluster_model, labels = fit_clusters(nl_test_cases, num_clusters=2)
+    clusters = build_clusters(nl_test_cases, cluster_model, labels)
+
+    url_cluster = next(cluster for cluster in clusters if "1" in cluster["test_ids"])
+    assert {"1", "2", "3"} <= set(url_cluster["test_ids"])
+    assert "url" in url_cluster["keywords"]
+
+
+def test_clustering_is_deterministic():
+    _, first_labels = fit_clusters(nl_test_cases, num_clusters=3)
+    _, second_labels = fit_clusters(nl_test_cases, num_clusters=3)
+
+    assert list(first_labels) == list(second_labels)
+
+
+def test_suites_without_a_suite_id_get_their_own_snapshot_id():
+    edited = [{**test_case, "summary": "edited"} for test_case in reversed(nl_test_cases)]
+
+    # Edits and reordering keep the suite, other test ids make another suite
+    assert default_suite_id(edited) == default_suite_id(nl_test_cases)
+    assert default_suite_id(nl_test_cases[:-1]) != default_suite_id(nl_test_cases)
+
+
+def test_least_recently_used_snapshots_are_dropped(tmp_path):
+    cluster_model, labels = fit_clusters(nl_test_cases, num_clusters=2)
+    clusters = build_clusters(nl_test_cases, cluster_model, labels)
+    snapshot = ClusterSnapshot(cluster_model, clusters, {"1": ("hash", 1)}, len(nl_test_cases), 0)
+    store = ClusterStore(str(tmp_path / "clusters.sqlite"), max_suites=2)
+
+    store.save("first", snapshot)
+    store.save("second", snapshot)
+    assert store.load("first") is not None
+    store.save("third", snapshot)
+
+    assert store.load("second") is None
+    assert store.load("first").assignments == {"1": ("hash", 1)}
+    store.max_age_seconds = -1
+    assert store.prune() == 2
+    assert store.load("third") is None
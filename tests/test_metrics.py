@@ -0,0 +1,59 @@
+from langchain_core.messages import AIMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from prometheus_client import REGISTRY
+
+from src.core.metrics import (
+    collect_run_metrics,
+    count_cache_lookups,
+    count_parse_failure,
+    instrument_node,
+    metrics_exposition,
+    observe_evaluation_batch,
+    observe_llm_call,
+)
+
+
+def fake_response(prompt_tokens, completion_tokens):
+    return AIMessage(content="{}", usage_metadata={
+        "input_tokens": prompt_tokens, "output_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens,
+    })
+
+
+def test_llm_calls_are_attributed_to_the_running_node_also_in_worker_threads():
+    def node(state):
+        observe_evaluation_batch(5)
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: observe_llm_call(0.2, fake_response(100, 10)), range(2)))
+        observe_llm_call(0.5, error=RuntimeError("timeout"))
+        count_parse_failure()
+        return {}
+
+    before = REGISTRY.get_sample_value("test_agent_llm_tokens_total", {"node": "metrics_test_node", "kind": "prompt"}) or 0
+    with collect_run_metrics() as run_metrics:
+        instrument_node("metrics_test_node", node)({})
+
+    stats = run_metrics.summary()["nodes"]["metrics_test_node"]
+    assert stats["runs"]["count"] == 1
+    assert stats["llm_calls"]["count"] == 3 and stats["llm_errors"] == 1
+    assert (stats["prompt_tokens"], stats["completion_tokens"]) == (200, 20)
+    assert stats["parse_failures"] == 1
+    assert run_metrics.summary()["evaluation_batches"] == {"count": 1, "mean_size": 5.0, "max_size": 5, "failed_test_cases": 0, "calls_avoided": 0}
+    assert REGISTRY.get_sample_value("test_agent_llm_tokens_total", {"node": "metrics_test_node", "kind": "prompt"}) == before + 200
+
+
+def test_cache_hit_rate_and_runs_are_kept_apart():
+    with collect_run_metrics() as first:
+        count_cache_lookups("evaluation", 3, 1)
+    with collect_run_metrics() as second:
+        count_cache_lookups("evaluation", 0, 2)
+
+    assert first.summary()["caches"]["evaluation"] == {"hit": 3, "miss": 1, "hit_rate": 0.75}
+    assert second.summary()["caches"]["evaluation"]["hit_rate"] == 0.0
+
+
+def test_exposition_is_prometheus_text():
+    observe_evaluation_batch(3)
+    body, content_type = metrics_exposition()
+
+    assert content_type.startswith("text/plain")
+    assert b"test_agent_evaluation_batch_size_bucket" in body
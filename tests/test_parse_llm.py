@@ -0,0 +1,37 @@
+from src.utils.parse_llm import extract_json, parse_llm_json_response
+
+
+def test_single_element_array_stays_an_array():
+    assert parse_llm_json_response('[{"test_name": "a"}]') == [{"test_name": "a"}]
+    assert parse_llm_json_response('Here you go:\n[{"test_name": "a"}]\nDone.') == [{"test_name": "a"}]
+
+
+def test_prose_brackets_and_code_blocks_are_skipped():
+    content = 'Scores use [0-5] and {weights} as told.\n```json\n{"rubric": [{"id": "1", "name": "a } ["}]}\n```'
+
+    assert parse_llm_json_response(content) == {"rubric": [{"id": "1", "name": "a } ["}]}
+    assert extract_json('no json [here] {at: all}') is None
+
+
+def test_truncated_array_keeps_only_complete_records():
+    truncated = '```json\n{"evaluations": [{"test_name": "a", "scores": [1, 2]}, {"test_name": "b", "scores": [3'
+
+    assert parse_llm_json_response(truncated) is None
+    assert parse_llm_json_response(truncated, allow_partial=True) == {"evaluations": [{"test_name": "a", "scores": [1, 2]}]}
+
+
+
+def test_a_bracket_left_open_in_the_prose_does_not_hide_the_json():
+    content = 'Scores in [0, 5) are allowed.\n{"rubric": [{"id": "1", "name": "a"}]}\nThat is all.'
+
+    assert parse_llm_json_response(content) == {"rubric": [{"id": "1", "name": "a"}]}
+    assert extract_json('See {the notes: [1, 2] then {"a": 1}') == {"a": 1}
+    # A short value quoted in the prose does not hide the answer after it
+    assert parse_llm_json_response('Results for tests [1] below: {"rubric": []}') == {"rubric": []}
+
+
+def test_bare_array_truncated_between_records_keeps_them_all():
+    truncated = '[{"a": 1}, {"b": 2},'
+
+    assert parse_llm_json_response(truncated, allow_partial=True) == [{"a": 1}, {"b": 2}]
+    assert parse_llm_json_response(truncated) is None
@@ -0,0 +1,21 @@
+from src.cache.rubric_cache import RubricCache
+from src.utils.text import normalize_query
+
+
+rubric = [{"id": "1", "name": "URL Generation", "weight": 5}]
+
+
+def test_normalize_query_drops_generic_words():
+    assert normalize_query("We UPDATED the URL generation algorithm. What should we test?") == "url gener algorithm"
+    # Negations change what a query asks for
+    assert normalize_query("Users that are not logged in") != normalize_query("Users that are logged in")
+
+
+def test_near_duplicate_query_reuses_rubric(tmp_path):
+    cache = RubricCache(str(tmp_path / "rubrics.sqlite"), similarity_threshold=0.65, max_entries=10, max_age_seconds=3600)
+    cache.put("We updated the URL generation algorithm. What should we test?", "gpt-4o", rubric)
+
+    assert cache.get("What should we test after the URL generation change?", "gpt-4o") == rubric
+    assert cache.get("We added MFA to the password reset flow. What should we test?", "gpt-4o") is None
+    assert cache.get("We updated the URL generation algorithm. What should we test?", "gpt-4o-mini") is None
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,49 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import app as app_module
+from src.utils.scoring import apply_scores, rank_test_cases, reweight_rubric
+
+
+rubric = [
+    {"id": "1", "name": "URL Generation", "weight": 5},
+    {"id": "2", "name": "Error Handling", "weight": 1},
+]
+
+evaluated_test_cases = [
+    {"test_name": "test_basic_url_generation", "dimension_scores": [
+        {"dimension_id": "1", "raw_score": 5}, {"dimension_id": "2", "raw_score": 0}]},
+    {"test_name": "test_url_generation_without_context_fails", "dimension_scores": [
+        {"dimension_id": 1, "raw_score": 2}, {"dimension_id": "2", "raw_score": 5}]},
+]
+
+
+def test_scores_are_computed_from_raw_scores_and_weights():
+    scored = apply_scores(evaluated_test_cases, rubric)
+
+    assert scored[0]["overall_score"] == 25
+    assert scored[0]["normalized_score"] == round(25 / 30, 4)
+    assert scored[1]["dimension_scores"][0]["weighted_score"] == 10
+    assert scored[1]["overall_score"] == 15
+    assert "overall_score" not in evaluated_test_cases[0]
+
+
+def test_new_weights_re_rank_without_new_scores():
+    assert rank_test_cases(evaluated_test_cases, rubric)[0]["test_name"] == "test_basic_url_generation"
+
+    reweighted = reweight_rubric(rubric, {"1": 1, "2": 5})
+
+    assert rank_test_cases(evaluated_test_cases, reweighted)[0]["test_name"] == "test_url_generation_without_context_fails"
+    assert rubric[1]["weight"] == 1
+
+
+def test_rerank_limit_must_be_a_non_negative_integer():
+    client = app_module.app.test_client()
+    body = {"evaluated_test_cases": evaluated_test_cases, "rubric": rubric}
+
+    assert len(client.post("/rerank", json={**body, "limit": 1}).get_json()["sorted_test_cases"]) == 1
+    for limit in (-1, "two", 1.5, [1]):
+        response = client.post("/rerank", json={**body, "limit": limit})
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "limit must be an integer of at least 0"
@@ -0,0 +1,62 @@
+import json
+
+from src.api.tc_file import nl_test_cases
+from src.utils import serialize
+from src.utils.serialize import (
+    CLUSTERING_TEST_CASE_FIELDS,
+    TokenSavingsReport,
+    report_token_savings,
+    serialize_clusters,
+    serialize_rubric,
+    serialize_test_cases,
+)
+
+
+def test_compact_json_keeps_only_the_selected_fields():
+    text = serialize_test_cases(nl_test_cases[:3], CLUSTERING_TEST_CASE_FIELDS, fmt="json")
+
+    records = json.loads(text)
+    assert [record["id"] for record in records] == ["1", "2", "3"]
+    assert all("notes" not in record for record in records)
+    assert len(text) < len(str(nl_test_cases[:3]))
+
+
+def test_table_has_a_header_and_one_row_per_test_case():
+    test_cases = [
+        {"id": 1, "test_name": "a|b", "summary": "line\nbreak", "steps": ["x", "y"]},
+        {"id": 2, "test_name": "c", "summary": "", "steps": []},
+    ]
+
+    lines = serialize_test_cases(test_cases, ("id", "test_name", "summary", "steps"), fmt="table").split("\n")
+
+    assert lines == ["id | test_name | summary | steps", "1|a/b|line break|x; y", "2|c||"]
+
+
+def test_rubric_leaves_out_weights_and_clusters_their_members():
+    rubric = [{"id": "1", "name": "Risk", "description": "d", "weight": 5, "scoring_criteria": {"5": "high"}}]
+    clusters = [{"cluster_id": 1, "name": "URLs", "description": "d", "test_ids": ["1", "2"], "keywords": ["url"]}]
+
+    assert json.loads(serialize_rubric(rubric)) == [{"id": "1", "name": "Risk", "description": "d", "scoring_criteria": {"5": "high"}}]
+    assert json.loads(serialize_clusters(clusters, fmt="json")) == [
+        {"cluster_id": 1, "name": "URLs", "description": "d", "keywords": ["url"], "size": 2}
+    ]
+
+
+def test_token_savings_are_totalled_per_prompt():
+    report = TokenSavingsReport()
+    for _ in range(2):
+        text = serialize_test_cases(nl_test_cases, fmt="json")
+        report.record("evaluate_test_cases", nl_test_cases, text, "gpt-4o")
+
+    summary = report.summary()["evaluate_test_cases"]
+    assert summary["calls"] == 2
+    assert summary["saved_tokens"] == summary["repr_tokens"] - summary["serialized_tokens"] > 0
+
+
+def test_prompts_are_not_tokenized_for_the_report_by_default(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("tokenized although the report is off")
+
+    monkeypatch.setattr(serialize, "count_tokens", fail)
+
+    report_token_savings("evaluate_test_cases", nl_test_cases, serialize_test_cases(nl_test_cases), "gpt-4o")
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_NOTHING_IS_CREATED = """
+import sys
+import app
+from src.api import llm_client
+from src.core import graph
+
+assert not llm_client._models, "a model was created at import"
+assert graph._compiled_graph is None, "the graph was compiled at import"
+for module in ("langchain_openai", "openai", "langfuse"):
+    assert module not in sys.modules, f"{module} was imported"
+"""
+
+
+def run_without_api_key(*arguments):
+    env = {name: value for name, value in os.environ.items() if name != "OPENAI_API_KEY"}
+    return subprocess.run([sys.executable, *arguments], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+
+
+def test_importing_the_app_creates_no_model_graph_or_tracer():
+    completed = run_without_api_key("-c", CHECK_NOTHING_IS_CREATED)
+
+    assert completed.returncode == 0, completed.stderr
+
+
+def test_cli_help_needs_no_credentials_and_runs_nothing():
+    completed = run_without_api_key("main.py", "--help")
+
+    assert completed.returncode == 0, completed.stderr
+    assert "--draw-graph" in completed.stdout
+    assert "STARTING TEST AGENT" not in completed.stderr
@@ -0,0 +1,34 @@
+import io
+import json
+import pytest
+from src.api.test_case_loader import load_test_cases, InvalidTestCaseError
+from src.api.tc_file import nl_test_cases
+
+
+def test_loads_json_array_in_small_chunks():
+    text = json.dumps(nl_test_cases, indent=2)
+
+    assert load_test_cases(io.StringIO(text), chunk_size=7) == nl_test_cases
+
+
+def test_loads_jsonl_from_binary_stream():
+    text = "\n".join(json.dumps(test_case) for test_case in nl_test_cases) + "\n"
+
+    assert load_test_cases(io.BytesIO(text.encode("utf-8")), chunk_size=13) == nl_test_cases
+
+
+def test_missing_field_reports_position():
+    test_cases = [nl_test_cases[0], {"id": "2", "test_name": "test_without_summary", "steps": []}]
+
+    with pytest.raises(InvalidTestCaseError, match="#2: missing required field"):
+        load_test_cases(io.StringIO(json.dumps(test_cases)))
+
+
+def test_duplicate_ids_are_rejected():
+    with pytest.raises(InvalidTestCaseError, match="duplicate id '1'"):
+        load_test_cases(io.StringIO(json.dumps([nl_test_cases[0], nl_test_cases[0]])))
+
+
+def test_truncated_input_fails():
+    with pytest.raises(json.JSONDecodeError):
+        load_test_cases(io.StringIO(json.dumps(nl_test_cases)[:-20]))
@@ -0,0 +1,54 @@
+from src.core.test_case_store import TestCaseStore, get_test_case_store
+from src.api.tc_file import nl_test_cases
+
+
+def test_ids_are_looked_up_as_strings():
+    store = TestCaseStore([
+        {"id": 7, "test_name": "a", "summary": "", "steps": []},
+        {"id": "8", "test_name": "b", "summary": "", "steps": []},
+    ])
+
+    assert store.get("7").test_name == "a"
+    assert store.get(8).test_name == "b"
+    assert 7 in store and "9" not in store
+    assert [record.test_name for record in store.get_many(["8", 9, 7])] == ["b", "a"]
+
+
+def test_records_round_trip_to_the_original_dict():
+    test_case = dict(nl_test_cases[0], priority="high")
+    store = TestCaseStore([test_case])
+
+    assert store.get(test_case["id"]).to_dict() == test_case
+
+
+def test_cluster_members_are_resolved_in_suite_order_without_duplicates():
+    store = TestCaseStore(nl_test_cases)
+    clusters = [
+        {"cluster_id": 1, "test_ids": [3, "1"]},
+        {"cluster_id": "2", "test_ids": ["2", "3", "unknown"]},
+        {"cluster_id": 3, "test_ids": ["4"]},
+    ]
+
+    assert store.ids_in_clusters(clusters, ["1", 2]) == ["1", "2", "3"]
+
+
+def test_file_path_index():
+    store = TestCaseStore(nl_test_cases)
+    file_path = nl_test_cases[0]["file_path"]
+    expected = [test_case["id"] for test_case in nl_test_cases if test_case["file_path"] == file_path]
+
+    assert store.ids_for_files([file_path, "does/not/exist.py"]) == expected
+
+
+def test_store_is_built_once_per_suite_version():
+    assert get_test_case_store(nl_test_cases) is get_test_case_store(nl_test_cases)
+    assert get_test_case_store(nl_test_cases) is get_test_case_store(list(nl_test_cases))
+    assert get_test_case_store(nl_test_cases) is not get_test_case_store(nl_test_cases[:5])
+
+
+def test_an_edited_copy_of_the_suite_gets_its_own_store():
+    edited = [dict(test_case) for test_case in nl_test_cases]
+    edited[0]["summary"] = "edited"
+
+    assert get_test_case_store(edited).get(edited[0]["id"]).summary == "edited"
+    assert get_test_case_store(nl_test_cases).get(edited[0]["id"]).summary != "edited"
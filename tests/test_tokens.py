@@ -0,0 +1,20 @@
+from src.utils.tokens import count_tokens, pack_batches
+
+
+def test_count_tokens_is_positive_and_grows_with_the_text():
+    assert 0 < count_tokens("hello world", "gpt-4o") < count_tokens("hello world " * 20, "gpt-4o")
+
+
+def test_batches_are_packed_up_to_the_input_budget():
+    batches = list(pack_batches(range(6), [40, 40, 40, 90, 10, 10], 10, 100, 10000, 1))
+
+    assert batches == [[0, 1], [2], [3, 4], [5]]
+
+
+def test_output_budget_and_item_limit_bound_the_batch_size():
+    assert list(pack_batches(range(5), [1] * 5, 0, 100, 250, 100)) == [[0, 1], [2, 3], [4]]
+    assert list(pack_batches(range(5), [1] * 5, 3, 100, 10000, 1)) == [[0, 1, 2], [3, 4]]
+
+
+def test_oversized_item_gets_its_own_batch():
+    assert list(pack_batches("abc", [5, 500, 5], 10, 100, 10000, 1)) == [["a"], ["b"], ["c"]]
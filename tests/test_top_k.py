@@ -0,0 +1,98 @@
+import importlib
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from langchain_core.messages import AIMessage
+
+from src.cache.evaluation_cache import EvaluationCache
+from src.core import config
+from src.core.metrics import collect_run_metrics
+from src.utils.scoring import rank_test_cases
+
+# src.nodes re-exports the node function under the module's name
+evaluation = importlib.import_module("src.nodes.evaluate_test_cases")
+
+RUBRIC = [{"id": "1", "name": "relevance", "weight": 1}]
+TEST_CASES = [{"id": str(i), "test_name": f"t{i}", "summary": "", "steps": []} for i in range(30)]
+
+
+def evaluation_of(test_id, raw_score):
+    return {"test_id": test_id, "test_name": f"t{test_id}", "dimension_scores": [{"dimension_id": "1", "raw_score": raw_score}]}
+
+
+def test_ranking_with_a_limit_is_the_prefix_of_the_full_ranking():
+    evaluations = [evaluation_of(str(i), raw_score) for i, raw_score in enumerate([2, 5, 0, 5, 3, 1, 4, 3])]
+
+    full = rank_test_cases(evaluations, RUBRIC)
+    top = rank_test_cases(evaluations, RUBRIC, limit=4)
+
+    assert [e["test_id"] for e in top] == [e["test_id"] for e in full[:4]] == ["1", "3", "6", "4"]
+
+
+def test_top_k_is_settled_by_maximum_scores_or_by_patience(monkeypatch):
+    monkeypatch.setattr(config, "TOP_K_PATIENCE", 3)
+
+    assert evaluation._top_k_settled([evaluation_of("0", 5), evaluation_of("1", 5)], RUBRIC, 2)
+    assert not evaluation._top_k_settled([evaluation_of(str(i), 4 - i) for i in range(4)], RUBRIC, 2)
+    assert evaluation._top_k_settled([evaluation_of(str(i), 4 - min(i, 3)) for i in range(6)], RUBRIC, 2)
+
+
+class DecliningModel:
+    """Scores test case i with max(0, 4 - i), so the pre-ranked order is also the best order."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        test_ids = [record["id"] for record in json.loads(messages[-1].content.split("Test Cases:")[1].split("Rubric:")[0])]
+        evaluations = [evaluation_of(test_id, max(0, 4 - int(test_id))) for test_id in test_ids]
+        return AIMessage(content=json.dumps({"evaluations": evaluations}), response_metadata={"finish_reason": "stop"})
+
+
+def run_top_k(monkeypatch, cache=None):
+    model = DecliningModel()
+    monkeypatch.setattr(evaluation, "get_model", lambda tier="strong": model)
+    monkeypatch.setattr(evaluation, "get_evaluation_cache", lambda: cache)
+    for setting, value in [("TOP_K", 2), ("TOP_K_PATIENCE", 4), ("EVALUATION_BATCH_SIZE", 3),
+                           ("EVALUATION_MAX_CONCURRENCY", 1), ("PROMPT_FORMAT", "json")]:
+        monkeypatch.setattr(config, setting, value)
+    state = {"query": "q", "rubric": RUBRIC, "test_cases": TEST_CASES, "evaluated_test_cases": [],
+             "relevant_test_ids": [str(i) for i in range(30)]}
+
+    with collect_run_metrics() as run_metrics:
+        result = evaluation.evaluate_test_cases(state)
+    return model, result, run_metrics
+
+
+def test_evaluation_stops_once_the_top_k_is_settled(monkeypatch):
+    model, result, run_metrics = run_top_k(monkeypatch)
+
+    # Test cases 2 to 5 are scored without entering the top 2, so two batches of three are enough
+    assert model.calls == 2
+    assert result["relevant_test_ids"] == [str(i) for i in range(6)]
+    assert len(result["evaluated_test_cases"]) == 6
+    assert run_metrics.summary()["evaluation_batches"]["calls_avoided"] == 8
+
+
+def test_a_warm_cache_does_not_move_the_stopping_point(monkeypatch, tmp_path):
+    cache = EvaluationCache(str(tmp_path / "evaluations.sqlite"), max_entries=100, max_age_seconds=3600)
+
+    def warm(test_ids):
+        test_cases = [TEST_CASES[int(test_id)] for test_id in test_ids]
+        keys = evaluation._cache_keys(test_cases, RUBRIC, config.EVALUATION_MODEL_TIER)
+        cache.put_many({key: evaluation_of(test_case["id"], max(0, 4 - int(test_case["id"]))) for test_case, key in zip(test_cases, keys)})
+
+    # Hits far behind the evaluated prefix must not count towards the patience
+    warm([3, 4, *range(10, 30)])
+    model, result, _ = run_top_k(monkeypatch, cache)
+    assert model.calls == 2
+    assert result["relevant_test_ids"] == [str(i) for i in range(6)]
+
+    warm(range(30))
+    model, result, _ = run_top_k(monkeypatch, cache)
+    assert model.calls == 0
+    assert result["relevant_test_ids"] == [str(i) for i in range(6)]
+    assert [e["test_id"] for e in result["evaluated_test_cases"]] == [str(i) for i in range(6)]